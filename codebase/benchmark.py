@@ -0,0 +1,208 @@
+"""
+codebase 的性能基准测试脚本。
+
+用法:
+    python -m codebase.benchmark parse <目录> [--language python] [--extension .py] [--repeat 3]
+    python -m codebase.benchmark walk <目录> [--language python] [--extension .py] [--scale 20] [--repeat 3]
+    python -m codebase.benchmark stress <目录> [<目录> ...] [--threads 8] [--rounds 4]
+    python -m codebase.benchmark layout [--sizes 100 500 1000 5000 20000] [--spring-max 2000]
+    python -m codebase.benchmark json [--sizes 1000 100000]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import networkx as nx
+from tree_sitter import Language, Parser
+
+from .edge_export import node_link_data, node_link_graph, write_node_link_json
+from .language_extract import extract_repository, get_extract_class, query_nodes, walk_tree
+from .layout import sampled_force_layout
+from .parser_pool import get_parser, language_library_path, parse_source
+
+
+def collect_files(directory, extension):
+    """收集目录下指定扩展名的所有文件，并预先读入内存，避免磁盘 IO 影响计时。"""
+    sources = []
+    for root, dirs, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith(extension):
+                with open(os.path.join(root, filename), "rb") as file:
+                    sources.append(file.read())
+    return sources
+
+
+def parse_uncached(sources, language):
+    # 旧的实现方式：每个文件都新建 Parser 并重新加载 Language 动态库
+    for source_code in sources:
+        parser = Parser()
+        parser.set_language(Language(language_library_path(language), language))
+        parser.parse(source_code)
+
+
+def parse_pooled(sources, language):
+    # 新的实现方式：使用进程级语言注册表和解析器池
+    for source_code in sources:
+        get_parser(language).parse(source_code)
+
+
+def bench_parse(args):
+    sources = collect_files(args.directory, args.extension)
+    if not sources:
+        print(f"没有找到 {args.extension} 文件: {args.directory}")
+        return
+    for name, func in [("uncached", parse_uncached), ("pooled", parse_pooled)]:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start_time = time.perf_counter()
+            func(sources, args.language)
+            best = min(best, time.perf_counter() - start_time)
+        print(f"{name:>10}: {len(sources)} files in {best:.3f}s, {len(sources) / best:.1f} files/s")
+
+
+def walk_recursive(node, handlers, context):
+    # 旧的实现方式：递归遍历 node.children，每个节点都会创建一个子节点列表
+    handler = handlers.get(node.type)
+    if handler is not None:
+        handler(node, context)
+    for child in node.children:
+        walk_recursive(child, handlers, context)
+
+
+def bench_walk(args):
+    sources = collect_files(args.directory, args.extension)
+    if not sources:
+        print(f"没有找到 {args.extension} 文件: {args.directory}")
+        return
+    extract = get_extract_class(args.language)(args.directory)
+    handlers = {node_type: getattr(extract, name) for node_type, name in extract.node_handlers.items()}
+    # 将每个文件的内容重复 scale 次，构造大文件
+    trees = [parse_source(source_code * args.scale, extract.language) for source_code in sources]
+    size = sum(len(source_code) for source_code in sources) * args.scale
+    print(f"{len(trees)} files, {size / 1e6:.1f} MB (scale={args.scale})")
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 100000))
+    try:
+        def walk_query(root_node, handlers, context):
+            # 预编译查询：匹配在 C 中完成，只对匹配到的节点调用处理函数
+            for node, node_type in query_nodes(root_node, extract.language, handlers):
+                handlers[node_type](node, context)
+
+        for name, func in [("recursive", walk_recursive), ("cursor", walk_tree), ("query", walk_query)]:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start_time = time.perf_counter()
+                for tree in trees:
+                    func(tree.root_node, handlers, extract.create_context(None))
+                best = min(best, time.perf_counter() - start_time)
+            print(f"{name:>10}: {best:.3f}s, {size / best / 1e6:.2f} MB/s")
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def bench_stress(args):
+    # 先串行分析每个仓库得到期望结果，再在线程池和进程池中交错地并发分析，检查结果互不干扰
+    original_directory = os.getcwd()
+    expected = {directory: extract_repository(directory) for directory in args.directories}
+    tasks = [directory for _ in range(args.rounds) for directory in args.directories]
+    for name, executor_class in [("threads", ThreadPoolExecutor), ("processes", ProcessPoolExecutor)]:
+        start_time = time.perf_counter()
+        with executor_class(max_workers=args.threads) as executor:
+            results = list(executor.map(extract_repository, tasks))
+        elapsed = time.perf_counter() - start_time
+        mismatches = [directory for directory, result in zip(tasks, results) if result != expected[directory]]
+        status = "ok" if not mismatches else f"{len(mismatches)} mismatches: {sorted(set(mismatches))}"
+        print(f"{name:>10}: {len(tasks)} analyses in {elapsed:.3f}s, {status}")
+        if mismatches:
+            raise SystemExit(1)
+    assert os.getcwd() == original_directory, "working directory changed during analysis"
+
+
+def bench_layout(args):
+    # 随机生成平均出度为 2 的有向图，比较 spring_layout 与基于采样的布局随节点数增长的耗时
+    print(f"{'nodes':>8} {'edges':>8} {'spring':>10} {'sampled':>10}")
+    for size in args.sizes:
+        G = nx.gnm_random_graph(size, size * 2, seed=0, directed=True)
+        spring = "-"
+        if size <= args.spring_max:
+            start_time = time.perf_counter()
+            nx.spring_layout(G, k=1.5, iterations=100, seed=0)
+            spring = f"{time.perf_counter() - start_time:.3f}s"
+        start_time = time.perf_counter()
+        sampled_force_layout(G)
+        sampled = f"{time.perf_counter() - start_time:.3f}s"
+        print(f"{size:>8} {G.number_of_edges():>8} {spring:>10} {sampled:>10}")
+
+
+def bench_json(args):
+    # 流式写出的 `{id}.json` 必须与 node_link_data 完全一致，并且能用同一个边列表键名读回原图
+    print(f"{'nodes':>8} {'edges':>8} {'write':>10} {'read':>10} status")
+    for size in args.sizes:
+        G = nx.gnm_random_graph(size, size * 2, seed=0, directed=True)
+        G = nx.relabel_nodes(G, {node: f"module.function_{node}" for node in G})
+        for node in G:
+            G.nodes[node].update({"class": None, "file_path": "module.py"})
+        for u, v in G.edges():
+            G.edges[u, v].update({"file_path": "module.py", "line": 1})
+        f = io.StringIO()
+        start_time = time.perf_counter()
+        write_node_link_json(G, f)
+        write_time = time.perf_counter() - start_time
+        text = f.getvalue()
+        start_time = time.perf_counter()
+        loaded = node_link_graph(json.loads(text))
+        read_time = time.perf_counter() - start_time
+        ok = (
+            text == json.dumps(node_link_data(G), ensure_ascii=False, indent=4)
+            and dict(loaded.nodes(data=True)) == dict(G.nodes(data=True))
+            and {(u, v): data for u, v, data in loaded.edges(data=True)} == {(u, v): data for u, v, data in G.edges(data=True)}
+        )
+        print(f"{size:>8} {G.number_of_edges():>8} {write_time:>9.3f}s {read_time:>9.3f}s {'ok' if ok else 'MISMATCH'}")
+        if not ok:
+            raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="codebase benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_parser = subparsers.add_parser("parse", help="parse throughput in files/second")
+    parse_parser.add_argument("directory")
+    parse_parser.add_argument("--language", default="python")
+    parse_parser.add_argument("--extension", default=".py")
+    parse_parser.add_argument("--repeat", type=int, default=3)
+    parse_parser.set_defaults(func=bench_parse)
+
+    walk_parser = subparsers.add_parser("walk", help="AST traversal throughput on large files")
+    walk_parser.add_argument("directory")
+    walk_parser.add_argument("--language", default="python")
+    walk_parser.add_argument("--extension", default=".py")
+    walk_parser.add_argument("--scale", type=int, default=20, help="repeat each file's content N times")
+    walk_parser.add_argument("--repeat", type=int, default=3)
+    walk_parser.set_defaults(func=bench_walk)
+
+    stress_parser = subparsers.add_parser("stress", help="concurrent analyses of several repositories must not interfere")
+    stress_parser.add_argument("directories", nargs="+")
+    stress_parser.add_argument("--threads", type=int, default=8)
+    stress_parser.add_argument("--rounds", type=int, default=4)
+    stress_parser.set_defaults(func=bench_stress)
+
+    layout_parser = subparsers.add_parser("layout", help="call graph layout cost as the node count grows")
+    layout_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000, 5000, 20000, 100000])
+    layout_parser.add_argument("--spring-max", type=int, default=2000, help="skip spring_layout above this node count")
+    layout_parser.set_defaults(func=bench_layout)
+
+    json_parser = subparsers.add_parser("json", help="node-link JSON written by GraphIndex must round-trip through the loader")
+    json_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000])
+    json_parser.set_defaults(func=bench_json)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,92 @@
 import asyncio
 import csv
-import uuid
+import hashlib
+import io
 import json
 import networkx as nx
 import os
 import re
-import matplotlib.pyplot as plt
-
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from enum import Enum
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from pathlib import Path
 from typing import Optional, Literal, TypeAlias
 
 from .language_extract import *
+from .extract_cache import ExtractCache, FileHashCache
+from .csr_graph import CSRCallGraph
+from .graph_store import SQLiteCallGraph
+from .centrality import compute_centrality, load_file_centrality, save_centrality
+from .file_chunks import split_source
+from .graph_partition import merge_file_descriptions, partition_graph_csv
+from .edge_export import Compression, EdgeFormat, edge_file_name, export_edges, node_link_graph, write_node_link_json
+from .manifest import get_manifest
+from .layout import ARROW_MAX_NODES, LABEL_MAX_NODES, graph_layout, write_dot, write_graphml
 from .openai.lc_openai import *
+from .openai.llm_cache import LLMCache
 from .prompt.few_shot_generate_file_descriptions import *
 
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，只在进程内对构建去重
+    fcntl = None
+
+
+LanguageType: TypeAlias = Literal["auto", "python", "java", "golang", "go", "js", "javascript", "cpp", "c++", "c", "php"]
+GraphFormat: TypeAlias = Literal["json", "csr"]
+RenderMode: TypeAlias = Literal["none", "png", "dot", "graphml"]
 
-LanguageType: TypeAlias = Literal["python", "java", "golang", "go", "js", "javascript", "cpp", "c++", "c", "php"]
+# 合并请求中最多包含的文件数，避免一次响应中的描述过多被截断
+PACK_MAX_FILES = 16
+# 合并请求的响应预计 token 数上限，低于模型单次生成的上限（gpt-4-1106-preview 为 4096）并留出余量
+PACK_OUTPUT_TOKENS = 3072
+# 合并请求中每个文件的描述段落预计的 token 数，不包括 JSON 中的文件路径和结构
+PACK_DESCRIPTION_TOKENS = 256
+
+# 正在构建的图索引：id -> Future，同一进程中对同一个 id 的并发请求只构建一次
+_builds = {}
+_builds_lock = threading.Lock()
 
 
 class GraphIndex:
-    def __init__(self, file_dir: Optional[str] = None, output_dir: str = "output") -> None:
+    def __init__(
+        self,
+        file_dir: Optional[str] = None,
+        output_dir: str = "output",
+        cache_dir: Optional[str] = None,
+        graph_format: GraphFormat = "json",
+        render: RenderMode = "none",
+        edge_format: Optional[EdgeFormat] = "csv",
+        edge_compression: Optional[Compression] = None,
+        sqlite_store: bool = False,
+    ) -> None:
         """
         Initializes a GraphIndex instance.
 
         Args:
             file_dir (str): The directory of files, required.
             output_dir (str, optional): The output directory. Defaults to 'output'.
+            cache_dir (str, optional): The directory of the per-file extraction cache.
+                Unchanged files are not reparsed when it is set. Defaults to None (no extraction cache;
+                the content hashes used by graph_id are then cached in output_dir).
+            graph_format (str, optional): 'json' saves a networkx node-link JSON. 'csr' builds a
+                CSRCallGraph without networkx and saves a memory-mappable `{id}.csrgraph` binary instead,
+                which is meant for very large repositories. Defaults to 'json'.
+            render (str, optional): How the call graph is rendered after analysis. 'none' skips rendering,
+                'png' draws `{id}.png` (with a sampled force-directed layout for large graphs), 'dot' and
+                'graphml' export `{id}.dot` / `{id}.graphml` for external tools. Defaults to 'none'.
+            edge_format (str, optional): Format of the lossless edge list written after analysis, one row per
+                call site: 'csv', 'parquet' or 'arrow' (the latter two require pyarrow). None disables it.
+                Defaults to 'csv'.
+            edge_compression (str, optional): 'gzip' to compress the CSV edge list (for parquet it is the
+                column codec). Defaults to None.
+            sqlite_store (bool, optional): Also write `{id}.sqlite`, an indexed SQLite store of functions, files
+                and call sites that can be queried (see SQLiteCallGraph) without loading the graph into memory
+                and read concurrently by several processes. Defaults to False.
         """
         if file_dir is None:
             raise ValueError("file_dir is none")
@@ -34,6 +94,14 @@ class GraphIndex:
             raise ValueError(f"The directory {file_dir} does not exist")
         self.file_dir = file_dir
         self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        if render not in ("none", "png", "dot", "graphml"):
+            raise ValueError(f"Unsupported render mode: {render}")
+        self.graph_format = graph_format
+        self.render = render
+        self.edge_format = edge_format
+        self.edge_compression = edge_compression
+        self.sqlite_store = sqlite_store
 
     def build_call_graph(self, functions: dict, calls: list):
         """
@@ -68,6 +136,7 @@ class GraphIndex:
         可视化调用图。
 
         接受一个调用图的有向图表示，并将其可视化输出为一张图片，保存到指定路径。
+        节点数较多时使用基于采样的力导向布局，并省略节点标签和箭头，绘制时间随节点数近似线性增长。
         此函数不返回任何值。
 
         Args:
@@ -77,96 +146,431 @@ class GraphIndex:
         Returns:
             None
         """
-        # 设置布局，增加节点间隔以确保节点之间有一定间隙，避免节点重合
-        pos = nx.spring_layout(G, k=1.5, iterations=100)
+        # 设置布局，小图增加节点间隔以确保节点之间有一定间隙，避免节点重合
+        pos = graph_layout(G)
+        number_of_nodes = G.number_of_nodes()
+        node_size = 500 if number_of_nodes <= LABEL_MAX_NODES else 20
         # 计算图的大小，确保所有节点都能在图内清楚地显示
-        plt.figure(figsize=(40, 40))
+        # 不使用 pyplot 的全局当前图，每次绘制都使用独立的 Figure，多个线程可以同时绘制
+        fig = Figure(figsize=(40, 40))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
         # 绘制节点
-        nx.draw_networkx_nodes(G, pos, node_size=500, node_color="lightblue", linewidths=0.25)
-        # 绘制边，使用箭头以区分方向，并设置合适的箭头大小
-        nx.draw_networkx_edges(G, pos, arrowstyle="->", arrowsize=5, node_size=500)
+        nx.draw_networkx_nodes(G, pos, ax=ax, node_size=node_size, node_color="lightblue", linewidths=0.25)
+        # 绘制边，使用箭头以区分方向，并设置合适的箭头大小；节点很多时不绘制箭头
+        if number_of_nodes <= ARROW_MAX_NODES:
+            nx.draw_networkx_edges(G, pos, ax=ax, arrowstyle="->", arrowsize=5, node_size=node_size)
+        else:
+            nx.draw_networkx_edges(G, pos, ax=ax, arrows=False, width=0.2, alpha=0.3)
         # 绘制节点标签，并调整字体大小以防止重叠
-        nx.draw_networkx_labels(G, pos, font_size=7, font_family="sans-serif")
+        if number_of_nodes <= LABEL_MAX_NODES:
+            nx.draw_networkx_labels(G, pos, ax=ax, font_size=7, font_family="sans-serif")
         # 保存图片，确保图片大小固定
-        plt.savefig(file_path, format="PNG", bbox_inches="tight")
+        fig.savefig(file_path, format="PNG", bbox_inches="tight")
+
+    def graph_id(self, language: LanguageType = "python"):
+        """
+        计算图索引的 id：由语言、提取器版本、输出格式以及参与分析的源文件（相对路径、内容哈希）的摘要决定。
+
+        源文件内容的修改、新增和删除都会改变 id；只改变修改时间（例如 touch、重新检出）时 id 不变，
+        已经生成的图索引可以直接复用。每次计算都会重新扫描文件清单，因此工作区中未暂存的修改也会被计入。
+        内容哈希与 git 的 blob 哈希相同；大小和修改时间没有变化的文件复用缓存的哈希（见 FileHashCache），
+        哈希缓存保存在 cache_dir 中，没有设置 cache_dir 时保存在输出目录中，因此只有变化的文件需要重新读取。
+
+        Args:
+            language (str): 指定的语言类型，'auto' 表示自动识别所有支持的语言。默认为 'python'。
 
-    def analyze_directory(self, language: LanguageType = "python"):
+        Returns:
+            str: 十六进制的 sha1 摘要。
+        """
+        if language.lower() == "auto":
+            language_name = "auto"
+            extensions = {extract_class.file_extension for extract_class in EXTRACT_CLASSES.values()}
+        else:
+            extract = get_extract_class(language)(self.file_dir)
+            language_name = extract.language
+            extensions = {extract.file_extension}
+        digest = hashlib.sha1()
+        digest.update(json.dumps([language_name, EXTRACTOR_VERSION, self.graph_format, self.edge_format, self.edge_compression]).encode("utf-8"))
+        manifest = get_manifest(self.file_dir, refresh=True)
+        hashes = FileHashCache(self.cache_dir or self.output_dir, self.file_dir)
+        for entry in manifest:
+            if entry.extension in extensions:
+                file_hash = hashes.hash(entry)
+                # 扫描之后被删除的文件不计入
+                if file_hash is not None:
+                    digest.update(f"\n{entry.path}\0{file_hash}".encode("utf-8"))
+        hashes.save(entry.path for entry in manifest)
+        return digest.hexdigest()
+
+    def _graph_file_path(self, id: str):
+        return os.path.join(self.output_dir, id + (".csrgraph" if self.graph_format == "csr" else ".json"))
+
+    def has_graph(self, id: str):
+        """
+        判断输出目录中是否已经有完整的图索引。
+
+        调用图文件（`{id}.json` 或 `{id}.csrgraph`）最后写入并且原子地替换，它存在时其它文件都已经写完。
+        启用 sqlite_store 时还要求 `{id}.sqlite` 存在。
+        """
+        if self.sqlite_store and not os.path.exists(os.path.join(self.output_dir, id + ".sqlite")):
+            return False
+        return os.path.exists(self._graph_file_path(id)) and os.path.exists(os.path.join(self.output_dir, id + ".csv"))
+
+    def analyze_directory(self, language: LanguageType = "python", workers: Optional[int] = 1, refresh: bool = False):
         """
         分析指定目录下的文件，构建调用图。
 
         此函数遍历指定目录下的所有文件，分析其中的函数定义和调用关系，
         并构建一个调用图。这有助于理解代码结构和函数间的依赖关系。
-        函数执行完毕后不返回任何值。
+        language 为 'auto' 时只遍历一次目录，按扩展名把文件分发给对应语言的提取器，
+        所有语言一起解析，生成一张统一的调用图。每个节点都带有 'language' 属性。
+
+        图索引的 id 由源文件的摘要决定（见 graph_id），输出目录中已经有同一个 id 的图索引时直接返回，不重新分析；
+        同一进程中对同一个 id 的并发请求共享一次构建，其余请求等待构建完成后返回同一个 id。
+        多个进程使用同一个输出目录时，通过输出目录中的 `{id}.lock` 文件锁依次进行，后获得锁的进程直接复用
+        已经完成的图索引（没有 fcntl 的平台上只在进程内去重），构建结束后删除锁文件。
 
         Args:
-            language (str): 指定的语言类型。默认为 'python'。
+            language (str): 指定的语言类型，'auto' 表示自动识别所有支持的语言。默认为 'python'。
+            workers (int, optional): 并行解析文件的进程数。默认为 1，即串行执行；为 None 时使用全部 CPU 核心。
+                并行模式的输出与串行模式完全一致。
+            refresh (bool, optional): 是否忽略已有的图索引重新分析。默认为 False。
 
         Returns:
-            None
+            str: 图索引的 id。
         """
+        id = self.graph_id(language)
+        if not refresh and self.has_graph(id):
+            self._render_missing(id)
+            return id
 
+        with _builds_lock:
+            future = _builds.get(id)
+            owner = future is None
+            if owner:
+                future = _builds[id] = Future()
+        if not owner:
+            # 等待同一个 id 的构建完成，构建失败时抛出同样的异常
+            future.result()
+            self._render_missing(id)
+            return id
+        try:
+            with self._build_lock(id):
+                if refresh or not self.has_graph(id):
+                    self._build_graph(language, workers, id)
+                else:
+                    self._render_missing(id)
+            future.set_result(id)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _builds_lock:
+                del _builds[id]
+        return id
+
+    @contextmanager
+    def _build_lock(self, id: str):
+        """
+        在输出目录的 `{id}.lock` 上加排他文件锁，进程退出时锁自动释放。
+
+        释放锁之前删除锁文件。等待锁的进程获得锁后检查锁文件是否仍是同一个文件，
+        锁文件已被删除或替换时重新打开并加锁，因此删除锁文件不会使两个进程同时持有锁。
+        """
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        lock_path = os.path.join(self.output_dir, id + ".lock")
+        while True:
+            lock_file = open(lock_path, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_path)):
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+        try:
+            yield
+        finally:
+            os.unlink(lock_path)
+            # 关闭文件时释放锁
+            lock_file.close()
+
+    def _render_missing(self, id: str):
+        # 复用已有的图索引时，按当前的 render 选项补充渲染结果
+        if self.render != "none" and not os.path.exists(os.path.join(self.output_dir, f"{id}.{self.render}")):
+            self.render_call_graph(self.load_call_graph(id), id)
+
+    def _build_graph(self, language: LanguageType, workers: Optional[int], id: str):
         directory = self.file_dir
-        out_path = self.output_dir
 
-        match language.lower():
-            case "python":
-                extract = python_extract(directory)
-                functions, calls = extract.python_extract_call_functions()
-            case "java":
-                extract = java_extract(directory)
-                functions, calls = extract.java_extract_call_functions()
-            case "golang" | "go":
-                extract = go_extract(directory)
-                functions, calls = extract.go_extract_call_functions()
-            case "js" | "javascript":
-                extract = js_extract(directory)
-                functions, calls = extract.js_extract_call_functions()
-            case "cpp" | "c++":
-                extract = cpp_extract(directory)
-                functions, calls = extract.cpp_extract_call_functions()
-            case "c":
-                extract = c_extract(directory)
-                functions, calls = extract.c_extract_call_functions()
-            case "php":
-                extract = php_extract(directory)
-                functions, calls = extract.php_extract_call_functions()
-            case _:
-                raise ValueError("Unsupported language types: {}".format(language))
-
-        id = str(uuid.uuid1())
+        if language.lower() == "auto":
+            caches = {}
+            if self.cache_dir:
+                for extract_class in dict.fromkeys(EXTRACT_CLASSES.values()):
+                    extract_language = extract_class(directory).language
+                    caches[extract_language] = ExtractCache(self.cache_dir, directory, extract_language)
+            functions, calls = merge_languages(extract_repository(directory, workers, caches, lazy=True))
+        else:
+            # 单一语言的调用图不合并语言，节点没有 'language' 属性
+            extract = get_extract_class(language)(directory)
+            cache = ExtractCache(self.cache_dir, directory, extract.language) if self.cache_dir else None
+            functions, calls = extract.extract_call_functions(workers, cache, lazy=True)
+        # calls 在每次迭代时按文件逐个解析，调用图、边文件和 SQLite 调用图依次读取，不生成完整的调用列表
+
+        if self.graph_format == "csr":
+            call_graph = CSRCallGraph.from_functions_calls(functions, calls)
+        else:
+            call_graph = self.build_call_graph(functions, calls)
+        # 调用图文件最后写入，作为图索引完整的标志
+        self.export_edges(calls, id)
+        if self.sqlite_store:
+            self.save_sqlite_store(functions, calls, id)
+        self.save_centrality(call_graph, id)
+        self.save_call_graph(call_graph, id)
+
+    def export_edges(self, calls, id: str):
+        """
+        按 edge_format 将所有调用点流式写入 `{id}.edges.csv`（或 .csv.gz、.parquet、.arrow）。
+
+        与 `{id}.csv` 中每对函数只有一行不同，边文件中每个调用点占一行，
+        同一对函数之间的多次调用都会保留，并带有调用点所在的文件和行号。
+        calls 可以是按文件逐个解析调用关系的可迭代对象（见 ResolvedCalls），此时内存占用不随调用数增长。
+
+        Args:
+            calls (Iterable[dict]): 调用关系。
+            id (str): 图索引的 id。
+
+        Returns:
+            str: 边文件的路径，edge_format 为 None 时返回 None。
+        """
+        if self.edge_format is None:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        file_path = os.path.join(self.output_dir, edge_file_name(id, self.edge_format, self.edge_compression))
+        export_edges(calls, file_path, self.edge_format, self.edge_compression)
+        return file_path
+
+    def save_sqlite_store(self, functions: dict, calls, id: str):
+        """
+        将函数、文件和所有调用点批量写入 `{id}.sqlite`，见 SQLiteCallGraph.create。
+
+        Args:
+            functions (dict): 包含函数信息的字典。
+            calls (Iterable[dict]): 调用关系，需要可以多次迭代。
+            id (str): 图索引的 id。
+
+        Returns:
+            SQLiteCallGraph: 打开的调用图。
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        return SQLiteCallGraph.create(os.path.join(self.output_dir, id + ".sqlite"), functions, calls)
+
+    def save_centrality(self, call_graph, id: str):
+        """
+        计算每个函数和每个文件的 PageRank 与入度，写入 `{id}.centrality.json`，见 compute_centrality。
+
+        PageRank 在稀疏邻接矩阵上幂迭代计算，开销与边数成正比。LLMIndex 按文件的中心性决定生成描述的顺序，
+        IndexStore 在检索时用它作为得分相近时的加权。
+
+        Args:
+            call_graph (DiGraph | CSRCallGraph): 调用图。
+            id (str): 图索引的 id。
+
+        Returns:
+            dict: compute_centrality 的结果。
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        centrality = compute_centrality(call_graph)
+        save_centrality(centrality, os.path.join(self.output_dir, id + ".centrality.json"))
+        return centrality
+
+    def save_call_graph(self, call_graph, id: str, visualize: bool = True):
+        """
+        将调用图保存到输出目录。
+
+        networkx 的调用图写入 `{id}.json`（node_link_data 格式）和 `{id}.csv`；
+        CSRCallGraph 写入可以内存映射的 `{id}.csrgraph` 和 `{id}.csv`。
+        `{id}.csv` 中每条调用边（一对函数）占一行，没有出边的函数占一行且 source、target 为空。
+        visualize 为 True 时还会按 render 选项渲染或导出调用图，见 render_call_graph。
+
+        Args:
+            call_graph (DiGraph | CSRCallGraph): 调用图。
+            id (str): 图索引的 id。
+            visualize (bool, optional): 是否按 render 选项渲染调用图。默认为 True。
+
+        Returns:
+            None
+        """
+        out_path = self.output_dir
         if not os.path.exists(out_path):
             os.makedirs(out_path)
+        csv_file_path = os.path.join(out_path, id + ".csv")
+
+        if isinstance(call_graph, CSRCallGraph):
+            # 出边的顺序与 networkx 调用图一致，生成的 CSV 也相同
+            indptr = call_graph.indptr
+
+            def csr_rows():
+                for index, node_id in enumerate(call_graph.node_ids):
+                    attributes = call_graph.node_attributes(index)
+                    row = [node_id, attributes.get("class", ""), attributes.get("file_path", "")]
+                    if indptr[index + 1] == indptr[index]:
+                        yield row + ["", ""]
+                    for target in call_graph.indices[indptr[index] : indptr[index + 1]]:
+                        yield row + [node_id, call_graph.node_id(target)]
+
+            self._write_csv(csv_file_path, csr_rows())
+            call_graph.save(os.path.join(out_path, id + ".csrgraph"))
+            if visualize:
+                self.render_call_graph(call_graph, id)
+            return
 
-        visualize_file_path = os.path.join(out_path, id + ".png")
         graph_json_file_path = os.path.join(out_path, id + ".json")
 
-        call_graph = self.build_call_graph(functions, calls)
-        self.visualize_call_graph(call_graph, visualize_file_path)
-        call_graph_data = nx.readwrite.json_graph.node_link_data(call_graph)
+        # 将图结构转换为CSV格式并逐行写出，每条调用边一行，每个调用点的文件和行号见 export_edges
+        def rows():
+            for node_id, attributes in call_graph.nodes(data=True):
+                row = [node_id, attributes.get("class", ""), attributes.get("file_path", "")]
+                successors = list(call_graph.successors(node_id))
+                if not successors:
+                    yield row + ["", ""]
+                for target in successors:
+                    yield row + [node_id, target]
 
-        # 将图结构转换为CSV格式并保存
-        csv_file_path = os.path.join(out_path, id + ".csv")
-        with open(csv_file_path, "w", encoding="utf-8", newline="") as csv_file:
+        self._write_csv(csv_file_path, rows())
+
+        # 逐个节点和边地写出 node_link_data 格式的 JSON，不在内存中构造整张图的 node_link_data；
+        # 先写入临时文件再替换，JSON 存在时图索引一定是完整的
+        tmp_path = f"{graph_json_file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            write_node_link_json(call_graph, f)
+        os.replace(tmp_path, graph_json_file_path)
+        if visualize:
+            self.render_call_graph(call_graph, id)
+
+    def render_call_graph(self, call_graph, id: str):
+        """
+        按 render 选项渲染或导出调用图。
+
+        - 'none'：不渲染，适合服务中使用；
+        - 'png'：绘制 `{id}.png`，大图使用基于采样的力导向布局；
+        - 'dot'：导出 `{id}.dot`，可以用 Graphviz（大图建议 sfdp）渲染；
+        - 'graphml'：导出 `{id}.graphml`，可以用 Gephi、Cytoscape 等工具打开。
+
+        Args:
+            call_graph (DiGraph | CSRCallGraph): 调用图。
+            id (str): 图索引的 id。
+
+        Returns:
+            str: 生成的文件路径，render 为 'none' 时返回 None。
+        """
+        if self.render == "none":
+            return None
+        if isinstance(call_graph, CSRCallGraph):
+            call_graph = call_graph.to_networkx()
+        file_path = os.path.join(self.output_dir, f"{id}.{self.render}")
+        if self.render == "png":
+            self.visualize_call_graph(call_graph, file_path)
+        elif self.render == "dot":
+            write_dot(call_graph, file_path)
+        else:
+            write_graphml(call_graph, file_path)
+        return file_path
+
+    def _write_csv(self, csv_file_path: str, rows):
+        # 先写入临时文件再替换，读取者不会看到不完整的 CSV
+        tmp_path = f"{csv_file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as csv_file:
             csv_writer = csv.writer(csv_file)
             csv_writer.writerow(["id", "class", "file_path", "source", "target"])
-            node_links = {edge["source"]: edge["target"] for edge in call_graph_data["links"]}
-            for node in call_graph_data["nodes"]:
-                class_name = node.get("class", "")
-                node_id = node.get("id", "")
-                file_path = node.get("file_path", "")
-                source = node_id if node_id in node_links else ""
-                target = node_links.get(node_id, "")
-                csv_writer.writerow([node_id, class_name, file_path, source, target])
-
-        with open(graph_json_file_path, "w", encoding="utf-8") as f:
-            json.dump(call_graph_data, f, ensure_ascii=False, indent=4)
+            csv_writer.writerows(rows)
+        os.replace(tmp_path, csv_file_path)
 
-        return id
+    def load_call_graph(self, id: str):
+        """
+        从输出目录加载调用图，返回 networkx 的 DiGraph。
+
+        优先读取 `{id}.csrgraph`（内存映射后转换为 networkx），否则读取 `{id}.json`。
+        只需要遍历邻接关系时，直接使用 CSRCallGraph.load 可以避免创建 networkx 对象。
+
+        Args:
+            id (str): 图索引的 id。
+
+        Returns:
+            DiGraph: 调用图。
+        """
+        csr_file_path = os.path.join(self.output_dir, id + ".csrgraph")
+        if os.path.exists(csr_file_path):
+            return CSRCallGraph.load(csr_file_path).to_networkx()
+        with open(os.path.join(self.output_dir, id + ".json"), "r", encoding="utf-8") as f:
+            return node_link_graph(json.load(f))
+
+
+def _analyze_directory_worker(task):
+    """
+    线程池或进程池中执行的单个仓库分析任务。
+
+    Args:
+        task (tuple): (file_dir, output_dir, cache_dir, language, workers)。
+
+    Returns:
+        str: 图索引的 id。
+    """
+    file_dir, output_dir, cache_dir, language, workers = task
+    return GraphIndex(file_dir, output_dir, cache_dir=cache_dir).analyze_directory(language, workers=workers)
+
+
+def analyze_directories(
+    file_dirs: list,
+    language: LanguageType = "python",
+    output_dir: str = "output",
+    cache_dir: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    use_processes: bool = False,
+):
+    """
+    并发分析多个仓库，为每个仓库构建调用图。
+
+    提取过程不会切换工作目录，也不依赖其它进程级的全局状态（解析器按线程复用，绘图使用独立的 Figure），
+    因此多个仓库可以在同一进程的线程池中同时分析，例如在 FastAPI 服务中处理并发请求；
+    CPU 密集的大仓库可以使用进程池。每个仓库的结果与单独分析时完全一致。
+
+    Args:
+        file_dirs (list): 需要分析的仓库目录列表。
+        language (str): 指定的语言类型，'auto' 表示自动识别。默认为 'python'。
+        output_dir (str, optional): 输出目录。默认为 'output'。
+        cache_dir (str, optional): 单文件提取缓存目录。默认为 None（不使用缓存）。
+        max_workers (int, optional): 同时分析的仓库数。默认为 None，由线程池或进程池决定。
+        use_processes (bool, optional): 是否使用进程池。默认为 False，即使用线程池。
+
+    Returns:
+        list: 与 file_dirs 一一对应的图索引 id 列表。
+    """
+    tasks = [(file_dir, output_dir, cache_dir, language, 1) for file_dir in file_dirs]
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        return list(executor.map(_analyze_directory_worker, tasks))
 
 
 class LLMIndex:
     def __init__(
-        self, openai_api_key: str, graphid: str, target_dir: str, output_dir: str = "output", model: str = "gpt-4-1106-preview", retry_count: int = 3
+        self,
+        openai_api_key: str,
+        graphid: str,
+        target_dir: str,
+        output_dir: str = "output",
+        model: str = "gpt-4-1106-preview",
+        retry_count: int = 3,
+        partition_tokens: int = 6000,
+        max_concurrency: int = 4,
+        cache_dir: Optional[str] = None,
+        pack_tokens: Optional[int] = None,
+        chunk_tokens: int = 4000,
+        max_chunks: int = 8,
     ) -> None:
         """
         初始化 LLMIndex 类的实例。
@@ -181,6 +585,15 @@ class LLMIndex:
             output_dir (str, optional): 输出目录的路径。默认为 'output'。
             model (str, optional): 使用的模型。默认为 'gpt-4-1106-preview'。
             retry_count (int, optional): index 调用 LLM 解析的最大重试次数。默认为 3。
+            partition_tokens (int, optional): llm_extract_index 中每部分调用图 CSV 的 token 上限。默认为 6000。
+            max_concurrency (int, optional): llm_extract_index 和 fast_generate_file_descriptions_json 同时进行的 LLM 请求数。默认为 4。
+            cache_dir (str, optional): LLM 响应缓存（LLMCache）的目录。设置后，内容、模型和提示词模板都没有变化的文件
+                不再请求 LLM，重新索引时只有变化的文件需要生成描述。默认为 None（不使用缓存）。
+            pack_tokens (int, optional): 生成文件描述时把小文件（不超过 pack_tokens / 4 个 token）合并到同一个请求中，
+                每个请求的提示词不超过 pack_tokens 个 token、预计的响应不超过 PACK_OUTPUT_TOKENS 个 token、
+                最多 PACK_MAX_FILES 个文件。默认为 None（每个文件一个请求）。
+            chunk_tokens (int, optional): 超过该 token 数的文件按语法边界切分为多个片段，并行生成片段描述后再合并。默认为 4000。
+            max_chunks (int, optional): 每个文件最多处理的片段数，超出的部分不生成描述（合并时会说明）。默认为 8。
         Returns:
             None
         """
@@ -188,8 +601,15 @@ class LLMIndex:
         self.output_dir = output_dir
         self.target_dir = Path(target_dir)
         self.csv_index = self._get_csv_content()
-        self.lc_llm = ChatLLM(openai_api_key=openai_api_key, model=model)
+        self.lc_llm = ChatLLM(openai_api_key=openai_api_key, model=model, cache=LLMCache(cache_dir) if cache_dir else None)
         self.retry_count = retry_count
+        self.partition_tokens = partition_tokens
+        self.max_concurrency = max_concurrency
+        self.pack_tokens = pack_tokens
+        self.chunk_tokens = chunk_tokens
+        self.max_chunks = max_chunks
+        # 文件相对路径 -> PageRank，图索引没有中心性文件时为空，此时按原有顺序处理
+        self.file_centrality = load_file_centrality(output_dir, graphid)
 
     def _get_csv_content(self):
         """
@@ -206,24 +626,57 @@ class LLMIndex:
         with open(csv_file_path, "r", encoding="utf-8") as csv_file:
             return csv_file.read()
 
-    def llm_extract_index(self):
+    def _file_centrality(self, file_path) -> float:
+        """返回文件（target_dir 下的路径）的中心性，不在调用图中的文件为 0。"""
+        return self.file_centrality.get(os.path.relpath(file_path, self.target_dir), 0.0)
+
+    def _partition_centrality(self, csv_text: str) -> float:
+        """返回一部分调用图 CSV 中所有文件的中心性之和。"""
+        reader = csv.reader(io.StringIO(csv_text))
+        header = next(reader, None)
+        if header is None or "file_path" not in header:
+            return 0.0
+        column = header.index("file_path")
+        return sum(self.file_centrality.get(file_path, 0.0) for file_path in {row[column] for row in reader if len(row) > column})
+
+    def _get_call_edges(self):
         """
-        使用 LLM 从 CSV 索引中提取并生成描述信息。
+        读取 `{id}.edges.csv` 中的完整调用边，用于划分调用图；文件不存在时返回 None。
+
+        Returns:
+            Iterator[tuple]: (调用者, 被调用者)。
+        """
+        edges_file_path = os.path.join(self.output_dir, self.graphid + ".edges.csv")
+        if not os.path.exists(edges_file_path):
+            return None
+
+        def edges():
+            with open(edges_file_path, "r", encoding="utf-8", newline="") as edges_file:
+                reader = csv.reader(edges_file)
+                next(reader, None)
+                for row in reader:
+                    yield row[0], row[1]
+
+        return edges()
+
+    def _llm_extract_partition(self, csv_text: str):
+        """
+        让 LLM 为一部分调用图 CSV 生成文件描述，解析失败时只重新发送这一部分。
 
-        此函数利用 LLM（大型语言模型）处理 CSV 文件中的数据，从中提取重要信息，
-        并生成相应的描述。这个过程依赖于 LLM 的解析能力来理解和描述 CSV 中的数据。
         Args:
-            None
+            csv_text (str): 带表头的 CSV 文本。
+
         Returns:
-            str: 从 CSV 索引中提取的描述信息。
+            list: [{'file_path': ..., 'descriptions': ...}] 列表。
         """
         # instructions = INDEX_FILE_DESCRIPTION_INSTRUCTION_PROMPT + INDEX_FILE_DESCRIPTION_LONG_EXAMPLE_PROMPT + INDEX_FILE_DESCRIPTION_HINT
         instructions = INDEX_FILE_DESCRIPTION_INSTRUCTION_PROMPT + INDEX_FILE_DESCRIPTION_HINT + INDEX_FILE_DESCRIPTION_SHORT_EXAMPLE_PROMPT
-        prompt = "Input:\n" + self.csv_index + "\n\nOutput:\n"
+        prompt = "Input:\n" + csv_text + "\n\nOutput:\n"
         retry_count = self.retry_count
         response = ""
         for attempt in range(retry_count):
-            chat_result = self.lc_llm.chat(prompt=prompt, instructions=instructions)
+            # 重试时不使用缓存，成功解析的新响应会替换缓存中无法解析的响应
+            chat_result = self.lc_llm.chat(prompt=prompt, instructions=instructions, refresh=attempt > 0)
             try:
                 # 使用正则表达式匹配字典部分
                 match = re.search(r"\[.*\]", chat_result, re.DOTALL)
@@ -239,6 +692,30 @@ class LLMIndex:
                     continue  # 如果不是最后一次尝试，继续下一次循环
                 else:
                     raise ValueError(f"llm_extract_index: {e}")  # 如果是最后一次尝试，抛出异常
+        return response
+
+    def llm_extract_index(self):
+        """
+        使用 LLM 从 CSV 索引中提取并生成描述信息。
+
+        此函数利用 LLM（大型语言模型）处理 CSV 文件中的数据，从中提取重要信息，
+        并生成相应的描述。这个过程依赖于 LLM 的解析能力来理解和描述 CSV 中的数据。
+        调用图较大时，先按文件和调用关系社区把 CSV 划分为不超过 partition_tokens 的多个部分，
+        在线程池中最多同时处理 max_concurrency 个部分（中心性高的部分先提交），再按原有顺序合并为同一个列表，
+        总耗时取决于最大的部分而不是整个仓库的大小。
+        Args:
+            None
+        Returns:
+            list: 从 CSV 索引中提取的文件描述列表。
+        """
+        partitions = partition_graph_csv(self.csv_index, self.lc_llm.count_tokenizer, self.partition_tokens, self._get_call_edges())
+        if len(partitions) == 1:
+            response = self._llm_extract_partition(partitions[0])
+        else:
+            order = sorted(range(len(partitions)), key=lambda index: -self._partition_centrality(partitions[index]))
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                futures = {index: executor.submit(self._llm_extract_partition, partitions[index]) for index in order}
+                response = merge_file_descriptions([futures[index].result() for index in range(len(partitions))])
 
         index_file_path = os.path.join(self.output_dir, self.graphid + "-onlyindexfile.json")
 
@@ -246,7 +723,54 @@ class LLMIndex:
             json.dump(response, f, ensure_ascii=False, indent=4)
         return response
 
-    def _llm_file_descriptions(self, file_path: Path) -> str:
+    def _read_file(self, file_path: Path) -> str:
+        """读取文件内容，不转义。"""
+        with open(file_path, "r", errors="ignore") as file:
+            return file.read()
+
+    @staticmethod
+    def _escape_braces(text: str) -> str:
+        """转义花括号，使文本可以直接放入提示词模板。"""
+        return text.replace("{", "{{").replace("}", "}}")
+
+    def _file_content(self, file_path: Path) -> str:
+        """读取文件内容并转义花括号。"""
+        return self._escape_braces(self._read_file(file_path))
+
+    def _file_description_prompt(self, file_path: Path, content: Optional[str] = None) -> str:
+        """返回为单个文件生成描述的提示词。"""
+        if content is None:
+            content = self._file_content(file_path)
+        return "This is the file path:\n" + str(file_path) + "\nThis is the contents of the file:\n" + content
+
+    def _chunk_prompts(self, file_path: Path, source: str):
+        """
+        把超过 chunk_tokens 的文件按语法边界切分（见 split_source），返回每个片段的提示词。
+
+        source 是未转义的文件内容：切分在原文上进行，再分别转义每个片段的花括号，
+        语法解析和 token 计数都基于原文，按字符切分时也不会把转义后的 `{{` 拆开。
+
+        Returns:
+            tuple: (提示词列表, 片段的 (起始行号, 结束行号) 列表, 超过 max_chunks 而未处理部分的起始行号或 None)。
+        """
+        chunks = split_source(source, str(file_path), self.lc_llm.count_tokenizer, self.chunk_tokens)
+        omitted_line = chunks[self.max_chunks][0] if len(chunks) > self.max_chunks else None
+        chunks = chunks[: self.max_chunks]
+        prompts = [
+            f"This is the file path:\n{file_path}\nThis is part {index} of {len(chunks)} of the file, lines {start_line}-{end_line}:\n{self._escape_braces(text)}"
+            for index, (start_line, end_line, text) in enumerate(chunks, 1)
+        ]
+        return prompts, [(start_line, end_line) for start_line, end_line, _ in chunks], omitted_line
+
+    def _reduce_prompt(self, file_path: Path, lines: list, partials: list, omitted_line: Optional[int]) -> str:
+        """返回合并片段描述的提示词。"""
+        parts = "\n\n".join(f"Part {index} (lines {start_line}-{end_line}):\n{partial}" for index, ((start_line, end_line), partial) in enumerate(zip(lines, partials), 1))
+        prompt = "This is the file path:\n" + str(file_path) + "\nThese are the summaries of consecutive parts of the file:\n" + parts
+        if omitted_line is not None:
+            prompt += f"\n\nThe file continues from line {omitted_line}, that part was not summarized and should be mentioned as omitted."
+        return prompt
+
+    def _llm_file_descriptions(self, file_path: Path, executor=None) -> str:
         """
         为给定文件生成描述。
 
@@ -254,41 +778,140 @@ class LLMIndex:
         - 对于代码文件，它会概括每个类和函数，并描述它们各自的功能。
         - 对于文本文件，它会直接转述文本内容。
         - 返回的是一个清晰、不含额外分析的段落式总结。
+        文件超过 chunk_tokens 时按语法边界切分，生成各片段的描述（map），再合并为整个文件的描述（reduce）；
+        传入 executor 时各片段在其中并行请求，耗时约为两次请求。
 
         Args:
             file_path (Path): 要概括的文件的路径。
+            executor (Executor, optional): 并行请求各片段的线程池，与其它请求共用它的并发上限。默认为 None，
+                在当前线程中依次请求。已经在该线程池的工作线程中运行时必须为 None，否则等待同一线程池中的任务可能死锁。
 
         Returns:
             str: 文件内容的总结。
         """
-
-        FILE_DESCRIPTIOMS_PROMPT = """
-    Your job is to summarize the contents of the document.
-    Follow these rules strictly:
-        - For code files, it summarizes each class and function, describing what each does.
-        - For text files, it directly intermediates the text content.
-        - The response is a clear, unambiguous paragraph summary without additional analysis.
-    """
         # 检查路径是否为文件
         if file_path.is_file():
-            with open(file_path, "r", errors="ignore") as file:
-                content = file.read()
-            content = content.replace("{", "{{").replace("}", "}}")
-            if self.lc_llm.count_tokenizer(content) > 4000:
-                content = self.lc_llm.split_text(content, 4000)
-            prompt = "This is the file path:\n" + str(file_path) + "\nThis is the contents of the file:\n" + content
-            chat_result = self.lc_llm.chat(prompt=prompt, instructions=FILE_DESCRIPTIOMS_PROMPT)
-            return chat_result
+            source = self._read_file(file_path)
+            content = self._escape_braces(source)
+            if not self.lc_llm.exceeds_tokens(content, self.chunk_tokens):
+                chat_result = self.lc_llm.chat(prompt=self._file_description_prompt(file_path, content), instructions=FILE_DESCRIPTIONS_PROMPT)
+                return chat_result
+            prompts, lines, omitted_line = self._chunk_prompts(file_path, source)
+            map_chunks = executor.map if executor is not None else map
+            partials = list(map_chunks(lambda prompt: self.lc_llm.chat(prompt=prompt, instructions=FILE_CHUNK_DESCRIPTIONS_PROMPT), prompts))
+            return self.lc_llm.chat(prompt=self._reduce_prompt(file_path, lines, partials, omitted_line), instructions=FILE_REDUCE_DESCRIPTIONS_PROMPT)
         else:
             # 如果路径是一个目录，返回一个错误信息或者忽略
             return f"Error: {file_path} is a directory, not a file."
 
+    def _llm_packed_descriptions(self, file_paths: list, executor=None) -> dict:
+        """
+        在一个请求中为多个小文件生成描述，要求 LLM 按文件返回 JSON 列表。
+
+        响应无法解析时把文件分成两半分别重新请求；响应中缺少或无法使用的文件单独请求。
+        拆分出的每个描述都按单个文件的提示词记录到缓存中，之后文件内容不变时无论是否合并都直接命中。
+
+        Args:
+            file_paths (list): 文件路径（Path）的列表。
+            executor (Executor, optional): 单独请求的大文件并行请求各片段的线程池，见 _llm_file_descriptions。默认为 None。
+
+        Returns:
+            dict: 文件路径字符串到描述的映射。
+        """
+        if len(file_paths) == 1:
+            return {str(file_paths[0]): self._llm_file_descriptions(file_paths[0], executor)}
+        prompts = {str(file_path): self._file_description_prompt(file_path) for file_path in file_paths}
+        prompt = "\n\n".join(f"----- Document {index} -----\n{file_prompt}" for index, file_prompt in enumerate(prompts.values(), 1))
+        chat_result = self.lc_llm.chat(prompt=prompt, instructions=PACKED_FILE_DESCRIPTIONS_PROMPT)
+        try:
+            match = re.search(r"\[.*\]", chat_result, re.DOTALL)
+            items = json.loads(match.group() if match else chat_result)
+            if not isinstance(items, list):
+                raise ValueError("response is not a list")
+        except (TypeError, ValueError):
+            middle = len(file_paths) // 2
+            return {**self._llm_packed_descriptions(file_paths[:middle], executor), **self._llm_packed_descriptions(file_paths[middle:], executor)}
+
+        descriptions = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            file_path, description = item.get("file_path"), item.get("descriptions")
+            if file_path in prompts and isinstance(description, str) and description.strip():
+                descriptions[file_path] = description
+                self.lc_llm.cache_response(prompts[file_path], FILE_DESCRIPTIONS_PROMPT, description)
+        for file_path in file_paths:
+            if str(file_path) not in descriptions:
+                descriptions[str(file_path)] = self._llm_file_descriptions(file_path, executor)
+        return descriptions
+
+    def _description_groups(self, file_paths: list) -> list:
+        """
+        把需要生成描述的文件分组，每组对应一个请求，组的顺序与 file_paths 一致。
+
+        未设置 pack_tokens 时每个文件单独一组；否则按顺序把缓存中没有描述的小文件装入同一组，
+        直到提示词超过 pack_tokens 个 token、预计的响应超过 PACK_OUTPUT_TOKENS 个 token 或达到 PACK_MAX_FILES 个文件。
+        每个文件预计的响应为 PACK_DESCRIPTION_TOKENS 加上 JSON 中文件路径和结构的 token 数。大文件和已经缓存的文件单独一组。
+
+        Args:
+            file_paths (list): 文件路径（Path）的列表。
+
+        Returns:
+            list: 文件路径列表的列表。
+        """
+        if not self.pack_tokens:
+            return [[file_path] for file_path in file_paths]
+        groups = []
+        pack = []
+        pack_tokens = 0
+        pack_output_tokens = 0
+        for file_path in file_paths:
+            if not file_path.is_file():
+                groups.append([file_path])
+                continue
+            prompt = self._file_description_prompt(file_path)
+            if self.lc_llm.exceeds_tokens(prompt, self.pack_tokens // 4) or self.lc_llm.cached_response(prompt, FILE_DESCRIPTIONS_PROMPT) is not None:
+                groups.append([file_path])
+                continue
+            tokens = self.lc_llm.count_tokenizer(prompt)
+            output_tokens = PACK_DESCRIPTION_TOKENS + self.lc_llm.count_tokenizer(json.dumps({"file_path": str(file_path), "descriptions": ""}))
+            if pack and (pack_tokens + tokens > self.pack_tokens or pack_output_tokens + output_tokens > PACK_OUTPUT_TOKENS or len(pack) >= PACK_MAX_FILES):
+                groups.append(pack)
+                pack = []
+                pack_tokens = 0
+                pack_output_tokens = 0
+            pack.append(file_path)
+            pack_tokens += tokens
+            pack_output_tokens += output_tokens
+        if pack:
+            groups.append(pack)
+        return groups
+
+    def _iter_files(self, dir_path: Path):
+        """
+        一个生成器函数，按遍历顺序生成目录中的文件路径。
+
+        Args:
+            dir_path (Path): 需要遍历的目录路径。
+
+        Returns:
+            Path: 文件路径。
+        """
+        contents = list(dir_path.iterdir())
+        for path in contents:
+            if path.is_file():  # 确保路径是一个文件
+                yield path
+            elif path.is_dir():  # 如果是目录，递归调用
+                yield from self._iter_files(path)
+
     def generate_file_descriptions_json(self):
         """
         生成包含目录中文件描述的 JSON 字符串。
 
         此函数遍历给定路径中的文件和目录。对于每个文件，它生成一个包含文件名和其描述的字典。
         如果遇到目录，则递归调用该函数处理该目录。然后将字典列表序列化为 JSON 格式的字符串。
+        需要 LLM 单独生成描述的文件按调用图中心性从高到低处理，结果仍按遍历顺序排列。
+        设置了 pack_tokens 时，多个小文件合并到同一个请求中，见 _description_groups。
 
         Args:
             directory_path (str): 要遍历的目录路径。
@@ -301,105 +924,122 @@ class LLMIndex:
         for i in json_file:
             dict_file[i["file_path"]] = i["descriptions"]  # type: ignore
 
-        def _descriptions_iter(dir_path: Path):
-            """
-            一个生成器函数，生成文件描述。
-
-            这个函数遍历指定目录路径中的文件，并逐个产生关于每个文件的描述。
-
-            Args:
-                dir_path (Path): 需要遍历的目录路径。
-
-            Returns:
-                dict: 一个包含 'file_name' 和 'descriptions' 键的字典。
-            """
-            contents = list(dir_path.iterdir())
-            for path in contents:
-                if path.is_file():  # 确保路径是一个文件
-                    if str(path) in dict_file:
-                        description = dict_file[str(path)]
-                    else:
-                        description = self._llm_file_descriptions(path)
-                    yield {"file_path": str(path), "descriptions": description}
-                elif path.is_dir():  # 如果是目录，递归调用
-                    yield from _descriptions_iter(path)
-
-        descriptions_list = list(_descriptions_iter(self.target_dir))
+        paths = list(self._iter_files(self.target_dir))
+        # 中心性高的文件先生成描述，时间有限时仓库中最重要的部分最先完成
+        pending = sorted((path for path in paths if str(path) not in dict_file), key=lambda path: -self._file_centrality(path))
+        # 所有大文件的片段共用一个线程池，同时进行的请求数不超过 max_concurrency
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for group in self._description_groups(pending):
+                dict_file.update(self._llm_packed_descriptions(group, executor))
+        descriptions_list = [{"file_path": str(path), "descriptions": dict_file[str(path)]} for path in paths]
         result_json = json.dumps(descriptions_list, indent=4)
         index_file_path = os.path.join(self.output_dir, self.graphid + "-indexfile.json")
         with open(index_file_path, "w", encoding="utf-8") as f:
             json.dump(descriptions_list, f, ensure_ascii=False, indent=4)
         return result_json
 
-    async def _fast_llm_file_descriptions(self, file_path: Path) -> str:
+    async def _fast_llm_file_descriptions(self, file_path: Path, executor=None) -> str:
         """
         异步地为给定文件生成描述。
 
         此函数异步地处理指定文件路径的文件，并生成该文件的描述。它利用了异步编程的优势，
-        在处理大型文件或多个文件时可以提高性能。
+        在处理大型文件或多个文件时可以提高性能。大文件的处理方式与 _llm_file_descriptions 相同（map-reduce）。
 
         Args:
             file_path (Path): 需要生成描述的文件路径。
+            executor (Executor, optional): 执行请求的线程池。默认为 None，使用事件循环默认的线程池。
 
         Returns:
             str: 给定文件的描述。
         """
-        FILE_DESCRIPTIOMS_PROMPT = """
-        Your job is to summarize the contents of the document.
-        Follow these rules strictly:
-            - For code files, it summarizes each class and function, describing what each does.
-            - For text files, it directly intermediates the text content.
-            - The response is a clear, unambiguous paragraph summary without additional analysis.
-        """
         if file_path.is_file():
-            with open(file_path, "r", errors="ignore") as file:
-                content = file.read()
-            content = content.replace("{", "{{").replace("}", "}}")
-            if self.lc_llm.count_tokenizer(content) > 4000:
-                content = self.lc_llm.split_text(content, 4000)
-            prompt = "This is the file path:\n" + str(file_path) + "\nThis is the contents of the file:\n" + content
-            # 使用异步调用 achat
-            chat_result = await self.lc_llm.achat(prompt=prompt, instructions=FILE_DESCRIPTIOMS_PROMPT)
-            return chat_result
+            source = self._read_file(file_path)
+            content = self._escape_braces(source)
+            if not self.lc_llm.exceeds_tokens(content, self.chunk_tokens):
+                # 使用异步调用 achat
+                chat_result = await self.lc_llm.achat(prompt=self._file_description_prompt(file_path, content), instructions=FILE_DESCRIPTIONS_PROMPT, executor=executor)
+                return chat_result
+            # 大文件的各个片段同时请求，与其它文件共用 executor 的并发上限
+            prompts, lines, omitted_line = self._chunk_prompts(file_path, source)
+            partials = await asyncio.gather(*(self.lc_llm.achat(prompt=prompt, instructions=FILE_CHUNK_DESCRIPTIONS_PROMPT, executor=executor) for prompt in prompts))
+            return await self.lc_llm.achat(prompt=self._reduce_prompt(file_path, lines, partials, omitted_line), instructions=FILE_REDUCE_DESCRIPTIONS_PROMPT, executor=executor)
         else:
             return f"Error: {file_path} is a directory, not a file."
 
     async def fast_generate_file_descriptions_json(self):
-        json_file = self.llm_extract_index()
+        """
+        异步地生成包含目录中文件描述的 JSON 字符串，结果与 generate_file_descriptions_json 相同。
+
+        生产者遍历整个目录树，把需要 LLM 单独生成描述的文件按中心性排序、分组（见 _description_groups）后放入队列；
+        max_concurrency 个消费者从队列中取出一组文件并发送请求，整个目录树同时进行的请求数不超过 max_concurrency。
+        每个描述完成后立即追加到 `{id}-indexfile.jsonl`，中断后再次运行时会跳过其中已经完成的文件；
+        全部完成后按遍历顺序写出 `{id}-indexfile.json` 并删除 `{id}-indexfile.jsonl`。
+
+        Returns:
+            str: 表示文件列表及其描述的 JSON 格式字符串。
+        """
+        json_file = await asyncio.to_thread(self.llm_extract_index)
         dict_file = {}
         for i in json_file:
             dict_file[i["file_path"]] = i["descriptions"]  # type: ignore
 
-        async def _descriptions_iter(dir_path: Path):
-            contents = list(dir_path.iterdir())
-            tasks = []
-            paths = []
-            for path in contents:
-                if path.is_file():
-                    if str(path) in dict_file:
-                        description = dict_file[str(path)]
-                        yield {"file_path": str(path), "descriptions": description}
-                    else:
-                        # 改为异步调用
-                        task = asyncio.create_task(self._fast_llm_file_descriptions(path))
-                        tasks.append(task)
-                        paths.append(path)
-                elif path.is_dir():
-                    # 递归调用需要同步到异步的转换
-                    async for desc in _descriptions_iter(path):
-                        yield desc
-            # 等待所有异步任务完成
-            descriptions = await asyncio.gather(*tasks)
-            for description, path in zip(descriptions, paths):
-                yield {"file_path": str(path), "descriptions": description}
-
-        # 异步生成器必须在异步环境中使用
-        async def collect_descriptions():
-            return [desc async for desc in _descriptions_iter(self.target_dir)]
-
-        descriptions_list = await collect_descriptions()
+        partial_file_path = os.path.join(self.output_dir, self.graphid + "-indexfile.jsonl")
+        if os.path.exists(partial_file_path):
+            with open(partial_file_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        # 上次中断时可能留下不完整的最后一行
+                        continue
+                    dict_file[item["file_path"]] = item["descriptions"]
+
+        paths = []
+        queue = asyncio.Queue()
+
+        async def produce():
+            for path in self._iter_files(self.target_dir):
+                paths.append(path)
+            # 中心性高的文件先处理，中心性相同时按遍历顺序
+            pending = sorted((path for path in paths if str(path) not in dict_file), key=lambda path: -self._file_centrality(path))
+            # 分组需要读取文件并计算 token 数，在线程中执行
+            for group in await asyncio.to_thread(self._description_groups, pending):
+                await queue.put(group)
+            for _ in range(self.max_concurrency):
+                await queue.put(None)
+
+        async def consume(executor, partial_file):
+            loop = asyncio.get_running_loop()
+            while True:
+                group = await queue.get()
+                if group is None:
+                    return
+                if len(group) == 1:
+                    descriptions = {str(group[0]): await self._fast_llm_file_descriptions(group[0], executor)}
+                else:
+                    # 在 executor 的工作线程中执行，不再传入 executor：回退为单独请求的大文件依次请求各片段，
+                    # 只占用当前工作线程，整个目录树同时进行的请求数仍不超过 max_concurrency
+                    descriptions = await loop.run_in_executor(executor, self._llm_packed_descriptions, group)
+                dict_file.update(descriptions)
+                for file_path, description in descriptions.items():
+                    partial_file.write(json.dumps({"file_path": file_path, "descriptions": description}, ensure_ascii=False) + "\n")
+                partial_file.flush()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor, open(partial_file_path, "a", encoding="utf-8") as partial_file:
+            tasks = [asyncio.create_task(produce())] + [asyncio.create_task(consume(executor, partial_file)) for _ in range(self.max_concurrency)]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # 某个请求失败时取消其余任务，已经完成的描述保留在 jsonl 中
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        descriptions_list = [{"file_path": str(path), "descriptions": dict_file[str(path)]} for path in paths]
         result_json = json.dumps(descriptions_list, indent=4)
         index_file_path = os.path.join(self.output_dir, self.graphid + "-indexfile.json")
         with open(index_file_path, "w", encoding="utf-8") as f:
             json.dump(descriptions_list, f, ensure_ascii=False, indent=4)
+        os.remove(partial_file_path)
         return result_json
@@ -0,0 +1,103 @@
+import json
+import os
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .csr_graph import CSRCallGraph
+
+
+def pagerank(graph: CSRCallGraph, alpha: float = 0.85, tol: float = 1e-12, max_iter: int = 100):
+    """
+    在 CSR 调用图上用稀疏矩阵的幂迭代计算 PageRank。
+
+    重要性沿调用方向传递：被很多函数（尤其是重要的函数）调用的函数得分高。没有出边的函数把得分均匀分给所有函数。
+    每次迭代是一次稀疏矩阵向量乘法，开销为 O(n + m)。结果与 networkx.pagerank 一致。
+
+    Args:
+        graph (CSRCallGraph): 调用图。
+        alpha (float, optional): 阻尼系数。默认为 0.85。
+        tol (float, optional): 收敛阈值，与 networkx 相同，按 n * tol 判断 L1 误差。默认为 1e-12。
+        max_iter (int, optional): 最大迭代次数。默认为 100。
+
+    Returns:
+        ndarray: 长度为 n 的得分数组，总和为 1。
+    """
+    n = graph.num_nodes
+    if n == 0:
+        return np.zeros(0)
+    indptr = np.asarray(graph.indptr, dtype=np.int64)
+    indices = np.asarray(graph.indices, dtype=np.int64)
+    out_degree = np.diff(indptr).astype(np.float64)
+    sources = np.repeat(np.arange(n), np.diff(indptr))
+    # M[callee, caller] = 1 / out_degree(caller)
+    M = csr_matrix((1.0 / out_degree[sources], (indices, sources)), shape=(n, n))
+    dangling = out_degree == 0
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = scores
+        scores = alpha * (M @ previous + previous[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(scores - previous).sum() < n * tol:
+            break
+    return scores / scores.sum()
+
+
+def compute_centrality(graph):
+    """
+    计算每个函数和每个文件的中心性。
+
+    函数的中心性为 PageRank 和入度（调用它的函数数）；文件的中心性为其中所有函数的 PageRank 之和与入度之和。
+
+    Args:
+        graph (CSRCallGraph | DiGraph): 调用图。
+
+    Returns:
+        dict: 'functions' 为按 PageRank 降序排列的 {'id', 'file_path', 'pagerank', 'in_degree'} 列表，
+        'files' 为按 PageRank 降序排列的 {'file_path', 'pagerank', 'in_degree', 'functions'} 列表（不包括没有文件路径的函数）。
+    """
+    if not isinstance(graph, CSRCallGraph):
+        graph = CSRCallGraph.from_networkx(graph)
+    scores = pagerank(graph)
+    in_degree = graph.in_degree()
+    functions = []
+    files = {}
+    for index, node_id in enumerate(graph.node_ids):
+        file_path = graph.node_attributes(index).get("file_path")
+        score = float(scores[index])
+        degree = int(in_degree[index])
+        functions.append({"id": node_id, "file_path": file_path, "pagerank": score, "in_degree": degree})
+        if file_path:
+            entry = files.setdefault(file_path, {"file_path": file_path, "pagerank": 0.0, "in_degree": 0, "functions": 0})
+            entry["pagerank"] += score
+            entry["in_degree"] += degree
+            entry["functions"] += 1
+    # 稳定排序，得分相同时保持原有顺序
+    functions.sort(key=lambda entry: (-entry["pagerank"], -entry["in_degree"]))
+    return {
+        "functions": functions,
+        "files": sorted(files.values(), key=lambda entry: (-entry["pagerank"], -entry["in_degree"])),
+    }
+
+
+def save_centrality(centrality: dict, file_path: str):
+    """将 compute_centrality 的结果写入 JSON 文件。"""
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(centrality, f, ensure_ascii=False)
+
+
+def load_file_centrality(output_dir: str, id: str):
+    """
+    读取 GraphIndex 保存的 `{id}.centrality.json`，返回每个文件的中心性。
+
+    Args:
+        output_dir (str): 输出目录。
+        id (str): 图索引的 id。
+
+    Returns:
+        dict: 文件相对路径到 PageRank 之和的映射，文件不存在时返回空字典。
+    """
+    file_path = os.path.join(output_dir, id + ".centrality.json")
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, "r", encoding="utf-8") as f:
+        return {entry["file_path"]: entry["pagerank"] for entry in json.load(f)["files"]}
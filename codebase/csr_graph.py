@@ -0,0 +1,308 @@
+import json
+import os
+
+import networkx as nx
+import numpy as np
+
+
+# 二进制文件格式：MAGIC + 头部长度（uint64）+ JSON 头部，之后是按 ALIGNMENT 对齐的各个数组
+MAGIC = b"CSRGRAPH"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# 节点属性编码中的特殊值：节点没有该属性 / 属性值为 None
+MISSING = -1
+NONE = -2
+
+
+def _align(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class CSRCallGraph:
+    def __init__(self, node_id_offsets, node_id_bytes, indptr, indices, in_indptr, in_indices, attribute_codes, attribute_categories) -> None:
+        """
+        以 CSR（压缩稀疏行）格式存储的调用图。
+
+        函数标识符被编号为 0..n-1，出边和入边分别用 (indptr, indices) 两个 numpy 数组表示，
+        节点 i 的被调用函数为 indices[indptr[i]:indptr[i + 1]]。函数标识符以 UTF-8 字节串拼接存储，
+        节点属性按列存储为整数编码和类别表。所有数组都可以直接来自内存映射的文件，
+        加载时不需要为每个节点和边创建 Python 对象。一般通过 from_functions_calls、from_networkx 或 load 创建。
+
+        Args:
+            node_id_offsets (ndarray): 长度为 n+1，节点 i 的标识符为 node_id_bytes[offsets[i]:offsets[i + 1]]。
+            node_id_bytes (ndarray): 所有函数标识符的 UTF-8 字节。
+            indptr (ndarray): 出边的行指针，长度为 n+1。
+            indices (ndarray): 出边的目标节点。
+            in_indptr (ndarray): 入边的行指针，长度为 n+1。
+            in_indices (ndarray): 入边的来源节点。
+            attribute_codes (dict): 属性名到长度为 n 的编码数组的映射。
+            attribute_categories (dict): 属性名到类别列表的映射，编码 k 表示 categories[k]。
+        """
+        self.node_id_offsets = node_id_offsets
+        self.node_id_bytes = node_id_bytes
+        self.indptr = indptr
+        self.indices = indices
+        self.in_indptr = in_indptr
+        self.in_indices = in_indices
+        self.attribute_codes = attribute_codes
+        self.attribute_categories = attribute_categories
+        self._node_ids = None
+        self._node_index = None
+
+    @property
+    def num_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    @classmethod
+    def from_functions_calls(cls, functions: dict, calls: list):
+        """
+        根据函数信息和调用关系构建 CSR 调用图，不经过 networkx。
+
+        节点和边的顺序与 GraphIndex.build_call_graph 构建的 DiGraph 一致：先按顺序加入所有函数，
+        再加入调用关系中未定义的端点；重复的调用只保留一条边。
+
+        Args:
+            functions (dict): 包含函数信息的字典，键是函数名称，值是相关信息。
+            calls (list): 包含函数调用关系的列表。
+
+        Returns:
+            CSRCallGraph: 调用图。
+        """
+        node_index = {}
+        nodes = []
+        for function, info in functions.items():
+            node_index[function] = len(nodes)
+            nodes.append((function, info))
+        successors = [{} for _ in nodes]
+        for call in calls:
+            endpoints = []
+            for function in (call["caller"], call["callee"]):
+                index = node_index.get(function)
+                if index is None:
+                    index = node_index[function] = len(nodes)
+                    nodes.append((function, functions.get(function, {})))
+                    successors.append({})
+                endpoints.append(index)
+            successors[endpoints[0]][endpoints[1]] = None
+        return cls._build(nodes, [list(targets) for targets in successors])
+
+    @classmethod
+    def from_networkx(cls, G: nx.DiGraph):
+        """
+        将 networkx 的有向图转换为 CSR 调用图，保留节点属性和边的顺序（不保留边属性）。
+
+        Args:
+            G (DiGraph): 调用图。
+
+        Returns:
+            CSRCallGraph: 调用图。
+        """
+        node_index = {node: index for index, node in enumerate(G)}
+        nodes = list(G.nodes(data=True))
+        successors = [[node_index[target] for target in G.successors(node)] for node in G]
+        return cls._build(nodes, successors)
+
+    @classmethod
+    def _build(cls, nodes, successors):
+        n = len(nodes)
+        index_dtype = np.int32 if n < 2**31 else np.int64
+        encoded = [str(node).encode("utf-8") for node, _ in nodes]
+        node_id_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(node_id) for node_id in encoded], out=node_id_offsets[1:])
+        node_id_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(targets) for targets in successors], out=indptr[1:])
+        indices = np.fromiter((target for targets in successors for target in targets), dtype=index_dtype, count=int(indptr[-1]))
+        # 入边：按目标节点对出边做稳定排序
+        sources = np.repeat(np.arange(n, dtype=index_dtype), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        in_indices = sources[order]
+        in_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=n), out=in_indptr[1:])
+
+        attribute_codes = {}
+        attribute_categories = {}
+        keys = list(dict.fromkeys(key for _, info in nodes for key in info))
+        for key in keys:
+            categories = {}
+            codes = np.full(n, MISSING, dtype=np.int32)
+            for index, (_, info) in enumerate(nodes):
+                if key in info:
+                    value = info[key]
+                    codes[index] = NONE if value is None else categories.setdefault(value, len(categories))
+            attribute_codes[key] = codes
+            attribute_categories[key] = list(categories)
+        return cls(node_id_offsets, node_id_bytes, indptr, indices, in_indptr, in_indices, attribute_codes, attribute_categories)
+
+    def node_id(self, index):
+        """返回节点编号对应的函数标识符。"""
+        return bytes(self.node_id_bytes[self.node_id_offsets[index] : self.node_id_offsets[index + 1]]).decode("utf-8")
+
+    @property
+    def node_ids(self):
+        """所有函数标识符的列表，第一次访问时解码。"""
+        if self._node_ids is None:
+            data = bytes(self.node_id_bytes)
+            offsets = self.node_id_offsets.tolist()
+            self._node_ids = [data[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(self.num_nodes)]
+        return self._node_ids
+
+    def node_index(self, node_id):
+        """
+        返回函数标识符对应的节点编号，不存在时返回 None。第一次调用时建立标识符到编号的索引。
+        """
+        if self._node_index is None:
+            self._node_index = {node: index for index, node in enumerate(self.node_ids)}
+        return self._node_index.get(node_id)
+
+    def node_attributes(self, index):
+        """返回节点的属性字典。"""
+        attributes = {}
+        for key, codes in self.attribute_codes.items():
+            code = int(codes[index])
+            if code == NONE:
+                attributes[key] = None
+            elif code != MISSING:
+                attributes[key] = self.attribute_categories[key][code]
+        return attributes
+
+    def successors(self, index):
+        """返回节点调用的函数的编号数组。"""
+        return self.indices[self.indptr[index] : self.indptr[index + 1]]
+
+    def predecessors(self, index):
+        """返回调用该节点的函数的编号数组。"""
+        return self.in_indices[self.in_indptr[index] : self.in_indptr[index + 1]]
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.diff(self.in_indptr)
+
+    def edges(self):
+        """
+        按顺序遍历所有边。
+
+        Returns:
+            Iterator[tuple]: (调用者编号, 被调用者编号)。
+        """
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        for source in range(self.num_nodes):
+            for position in range(indptr[source], indptr[source + 1]):
+                yield source, indices[position]
+
+    def to_networkx(self):
+        """
+        转换为 networkx 的 DiGraph，节点、属性和边的顺序与 GraphIndex.build_call_graph 的结果一致，
+        供仍然使用 networkx 接口的代码使用。
+
+        Returns:
+            DiGraph: 调用图。
+        """
+        G = nx.DiGraph()
+        node_ids = self.node_ids
+        for index, node_id in enumerate(node_ids):
+            G.add_node(node_id, **self.node_attributes(index))
+        G.add_edges_from((node_ids[source], node_ids[target]) for source, target in self.edges())
+        return G
+
+    def _arrays(self):
+        arrays = {
+            "node_id_offsets": self.node_id_offsets,
+            "node_id_bytes": self.node_id_bytes,
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "in_indptr": self.in_indptr,
+            "in_indices": self.in_indices,
+        }
+        for key, codes in self.attribute_codes.items():
+            arrays[f"attribute:{key}"] = codes
+        return arrays
+
+    def save(self, file_path):
+        """
+        将调用图保存为二进制文件。
+
+        先写入临时文件再替换，避免并发读取到不完整的文件。
+
+        Args:
+            file_path (str): 文件路径。
+        """
+        header = {
+            "version": FORMAT_VERSION,
+            "attributes": self.attribute_categories,
+            "arrays": {},
+        }
+        # 数组的偏移量相对于数据区的起始位置，数据区从头部之后的第一个对齐位置开始
+        offset = 0
+        layout = []
+        for name, array in self._arrays().items():
+            array = np.ascontiguousarray(array)
+            layout.append((offset, array))
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += _align(array.nbytes)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).tobytes())
+            f.write(header_bytes)
+            for offset, array in layout:
+                f.seek(data_start + offset)
+                f.write(array.tobytes())
+            f.truncate()
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path, mmap: bool = True):
+        """
+        加载二进制调用图。
+
+        Args:
+            file_path (str): 文件路径。
+            mmap (bool, optional): 是否以只读方式内存映射数组，默认为 True；为 False 时读入内存。
+
+        Returns:
+            CSRCallGraph: 调用图。
+        """
+        with open(file_path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{file_path} is not a CSR call graph file")
+            header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_length).decode("utf-8"))
+        data_start = _align(len(MAGIC) + 8 + header_length)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported CSR call graph version: {header.get('version')}")
+
+        arrays = {}
+        for name, info in header["arrays"].items():
+            dtype = np.dtype(info["dtype"])
+            shape = tuple(info["shape"])
+            count = int(np.prod(shape))
+            if count == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            elif mmap:
+                arrays[name] = np.memmap(file_path, dtype=dtype, mode="r", offset=data_start + info["offset"], shape=shape)
+            else:
+                arrays[name] = np.fromfile(file_path, dtype=dtype, count=count, offset=data_start + info["offset"]).reshape(shape)
+
+        attribute_codes = {name[len("attribute:") :]: array for name, array in arrays.items() if name.startswith("attribute:")}
+        return cls(
+            arrays["node_id_offsets"],
+            arrays["node_id_bytes"],
+            arrays["indptr"],
+            arrays["indices"],
+            arrays["in_indptr"],
+            arrays["in_indices"],
+            attribute_codes,
+            header["attributes"],
+        )
@@ -0,0 +1,209 @@
+import csv
+import gzip
+import inspect
+import json
+import os
+from itertools import chain
+from typing import Literal, Optional, TypeAlias
+
+from networkx.readwrite import json_graph
+
+
+EdgeFormat: TypeAlias = Literal["csv", "parquet", "arrow"]
+Compression: TypeAlias = Literal["gzip"]
+
+# 每条调用边（调用点）导出的列
+EDGE_COLUMNS = ["caller", "callee", "file_path", "line"]
+# 每次写出的行数，写出后缓冲区即被释放，内存占用与图的规模无关
+CHUNK_SIZE = 65536
+# `{id}.json` 中边列表的键名。networkx 3.4 起由 edges 参数指定且默认值改为 'edges'，之前由 link 参数指定（默认为 'links'）；
+# 读写时都显式传入该键名，不同版本的 networkx 保存的图可以互相读取
+NODE_LINK_EDGES = "links"
+_NODE_LINK_KEYWORD = "edges" if "edges" in inspect.signature(json_graph.node_link_graph).parameters else "link"
+
+
+def edge_file_name(id: str, format: EdgeFormat = "csv", compression: Optional[Compression] = None):
+    """
+    返回边文件的文件名：`{id}.edges.csv`、`{id}.edges.csv.gz`、`{id}.edges.parquet` 或 `{id}.edges.arrow`。
+    """
+    name = f"{id}.edges.{format}"
+    if format == "csv" and compression == "gzip":
+        name += ".gz"
+    return name
+
+
+class EdgeWriter:
+    def __init__(
+        self,
+        file_path: str,
+        format: EdgeFormat = "csv",
+        compression: Optional[Compression] = None,
+        columns: list = EDGE_COLUMNS,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        """
+        流式写出调用边，每个调用点一行，同一对函数之间的多次调用（多重边）都会保留。
+
+        行先按列转换为元组放入缓冲区（不保留边的字典），每满 chunk_size 行写出一次，写出的数据不会留在内存中。
+        csv 格式可以用 gzip 压缩；parquet（列式存储，每个块为一个 row group）和
+        arrow（Arrow IPC 文件，每个块为一个 record batch）格式需要安装 pyarrow，parquet 的 compression 为列压缩算法。
+        先写入临时文件，关闭时再替换为目标文件，避免读取到不完整的文件。一般作为上下文管理器使用。
+
+        Args:
+            file_path (str): 文件路径。
+            format (str, optional): 'csv'、'parquet' 或 'arrow'。默认为 'csv'。
+            compression (str, optional): 'gzip' 或 None。默认为 None。
+            columns (list, optional): 导出的列，边中缺少的列写为空值。默认为 EDGE_COLUMNS。
+            chunk_size (int, optional): 每次写出的行数。默认为 CHUNK_SIZE。
+        """
+        if format not in ("csv", "parquet", "arrow"):
+            raise ValueError(f"Unsupported edge format: {format}")
+        if compression not in (None, "gzip"):
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.file_path = file_path
+        self.format = format
+        self.compression = compression
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self._buffer = []
+        self._tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        if format == "csv":
+            if compression == "gzip":
+                self._file = gzip.open(self._tmp_path, "wt", encoding="utf-8", newline="")
+            else:
+                self._file = open(self._tmp_path, "w", encoding="utf-8", newline="")
+            self._csv_writer = csv.writer(self._file)
+            self._csv_writer.writerow(self.columns)
+        else:
+            try:
+                import pyarrow as pa
+            except ImportError as e:
+                raise ImportError(f"Exporting edges as {format} requires pyarrow, install it with `pip install pyarrow`") from e
+            self._pa = pa
+            # 行号为整数，其余列为字符串
+            self._schema = pa.schema([(column, pa.int64() if column == "line" else pa.string()) for column in self.columns])
+            if format == "parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self._tmp_path, self._schema, compression=compression or "none")
+            else:
+                self._writer = pa.ipc.new_file(self._tmp_path, self._schema)
+
+    def write(self, edge: dict):
+        """写入一条边。"""
+        self._buffer.append(tuple(edge.get(column) for column in self.columns))
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, edges):
+        """
+        写入多条边。
+
+        Args:
+            edges (Iterable[dict]): 边的可迭代对象，可以是生成器。
+        """
+        for edge in edges:
+            self.write(edge)
+
+    def flush(self):
+        """写出缓冲区中的边。"""
+        if not self._buffer:
+            return
+        if self.format == "csv":
+            self._csv_writer.writerows([["" if value is None else value for value in row] for row in self._buffer])
+        else:
+            batch = self._pa.record_batch([self._pa.array(list(values), type=field.type) for values, field in zip(zip(*self._buffer), self._schema)], schema=self._schema)
+            self._writer.write_batch(batch)
+        self.rows += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        """写出剩余的边，关闭并替换为目标文件。"""
+        self.flush()
+        if self.format == "csv":
+            self._file.close()
+        else:
+            self._writer.close()
+        os.replace(self._tmp_path, self.file_path)
+
+    def abort(self):
+        """放弃写入并删除临时文件。"""
+        if self.format == "csv":
+            self._file.close()
+        else:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def export_edges(edges, file_path: str, format: EdgeFormat = "csv", compression: Optional[Compression] = None, chunk_size: int = CHUNK_SIZE):
+    """
+    将调用边流式写入文件，见 EdgeWriter。
+
+    Args:
+        edges (Iterable[dict]): 调用边，包含 'caller'、'callee' 以及调用点的 'file_path'、'line'。
+        file_path (str): 文件路径。
+        format (str, optional): 'csv'、'parquet' 或 'arrow'。默认为 'csv'。
+        compression (str, optional): 'gzip' 或 None。默认为 None。
+        chunk_size (int, optional): 每次写出的行数。默认为 CHUNK_SIZE。
+
+    Returns:
+        int: 写出的边数。
+    """
+    with EdgeWriter(file_path, format, compression, chunk_size=chunk_size) as writer:
+        writer.write_many(edges)
+    return writer.rows
+
+
+def node_link_data(G):
+    """返回调用图的 node_link_data，边列表的键名为 NODE_LINK_EDGES。"""
+    return json_graph.node_link_data(G, **{_NODE_LINK_KEYWORD: NODE_LINK_EDGES})
+
+
+def node_link_graph(data):
+    """从 node_link_data（例如读取的 `{id}.json`）重建调用图，边列表的键名为 NODE_LINK_EDGES。"""
+    return json_graph.node_link_graph(data, **{_NODE_LINK_KEYWORD: NODE_LINK_EDGES})
+
+
+def write_node_link_json(G, f, indent: int = 4):
+    """
+    逐个节点和边地写出调用图的 node_link_data JSON，不在内存中构造整张图的 node_link_data。
+
+    输出与 `json.dump(node_link_data(G), f, ensure_ascii=False, indent=indent)` 完全一致，用 node_link_graph 读取。
+
+    Args:
+        G (DiGraph): 调用图。
+        f (TextIO): 以文本模式打开的文件。
+        indent (int, optional): 缩进的空格数。默认为 4。
+    """
+
+    def dump(value, level):
+        text = json.dumps(value, ensure_ascii=False, indent=indent)
+        return text.replace("\n", "\n" + " " * (indent * level))
+
+    def write_list(key, items, last):
+        f.write(" " * indent + json.dumps(key) + ": [")
+        first = True
+        for item in items:
+            f.write(("\n" if first else ",\n") + " " * (indent * 2) + dump(item, 2))
+            first = False
+        f.write("]" if first else "\n" + " " * indent + "]")
+        f.write("\n" if last else ",\n")
+
+    f.write("{\n")
+    f.write(" " * indent + '"directed": ' + json.dumps(G.is_directed()) + ",\n")
+    f.write(" " * indent + '"multigraph": ' + json.dumps(G.is_multigraph()) + ",\n")
+    f.write(" " * indent + '"graph": ' + dump(G.graph, 1) + ",\n")
+    write_list("nodes", (dict(chain(G.nodes[node].items(), [("id", node)])) for node in G), False)
+    write_list(NODE_LINK_EDGES, (dict(chain(data.items(), [("source", u), ("target", v)])) for u, v, data in G.edges(data=True)), True)
+    f.write("}")
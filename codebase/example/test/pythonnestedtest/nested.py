@@ -0,0 +1,11 @@
+def hello(word: str):
+    return word
+
+
+class Greeter:
+    def greet(self, words):
+        # 嵌套函数的调用按局部作用域解析：Greeter.greet -> Greeter.shout -> hello
+        def shout(word):
+            return hello(word).upper()
+
+        return [shout(word) for word in words]
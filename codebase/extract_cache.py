@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from .language_extract import EXTRACTOR_VERSION, content_hash
+
+
+# 文件的修改时间与记录缓存条目的时间相差不到该值时不能只凭大小和修改时间使用缓存条目：
+# 文件系统的修改时间精度可能粗到 2 秒，这段时间内的修改可能不改变大小和修改时间
+RACY_MTIME_NS = 2 * 10**9
+
+
+class ExtractCache:
+    def __init__(self, cache_dir: str, directory: str, language: str) -> None:
+        """
+        单文件提取结果的持久化缓存。
+
+        每个 (目录, 语言) 对应缓存目录中的一个 JSON 文件，记录每个源文件的大小、修改时间、
+        内容哈希、记录时间以及提取出的函数定义和原始调用关系。文件的大小和修改时间都没有变化，
+        并且修改时间早于记录时间 RACY_MTIME_NS 以上时直接命中（与 FileHashCache 相同）；
+        否则比较内容哈希，内容未变化同样命中，只有内容变化的文件才需要重新解析。
+
+        Args:
+            cache_dir (str): 缓存目录。
+            directory (str): 被分析的仓库目录。
+            language (str): 提取器的语言。
+        """
+        self.cache_dir = cache_dir
+        key = hashlib.sha1(f"{os.path.abspath(directory)}\0{language}".encode("utf-8")).hexdigest()[:16]
+        self.cache_path = os.path.join(cache_dir, f"{language}-{key}.json")
+        self.entries = self._load()
+        # 本次分析中见到的文件及其状态，保存时会清理已经不存在的文件
+        self.seen = {}
+        self.dirty = False
+
+    def _load(self):
+        """
+        读取缓存文件，提取器版本不一致或文件损坏时返回空缓存。
+
+        Returns:
+            dict: 相对路径到缓存条目的映射。
+        """
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != EXTRACTOR_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def get(self, file_path, relative_path):
+        """
+        查找文件的缓存提取结果。
+
+        Args:
+            file_path (str): 文件的绝对路径。
+            relative_path (str): 文件的相对路径。
+
+        Returns:
+            dict: 命中时返回单文件提取结果，否则返回 None。
+        """
+        recorded_ns = time.time_ns()
+        stat = os.stat(file_path)
+        self.seen[relative_path] = (stat.st_size, stat.st_mtime_ns, recorded_ns)
+        entry = self.entries.get(relative_path)
+        if entry is None:
+            return None
+        if (
+            entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and stat.st_mtime_ns + RACY_MTIME_NS < entry.get("recorded_ns", 0)
+        ):
+            return entry["result"]
+        # 修改时间变化但内容可能没有变化（例如切换分支后又切换回来），
+        # 或者记录时文件刚被修改过，同一修改时间内可能还有同大小的修改，比较内容哈希
+        with open(file_path, "rb") as file:
+            source_code = file.read()
+        if content_hash(source_code) == entry["result"]["hash"]:
+            if (entry["size"], entry["mtime_ns"], entry.get("recorded_ns")) != (stat.st_size, stat.st_mtime_ns, recorded_ns):
+                entry["size"], entry["mtime_ns"], entry["recorded_ns"] = stat.st_size, stat.st_mtime_ns, recorded_ns
+                self.dirty = True
+            return entry["result"]
+        return None
+
+    def put(self, relative_path, result):
+        """
+        记录文件的提取结果。
+
+        使用 get 时记录的文件状态（解析之前获取），这样解析期间文件再次变化时，下次仍会重新比较。
+
+        Args:
+            relative_path (str): 文件的相对路径。
+            result (dict): 单文件提取结果。
+        """
+        size, mtime_ns, recorded_ns = self.seen[relative_path]
+        self.entries[relative_path] = {"size": size, "mtime_ns": mtime_ns, "recorded_ns": recorded_ns, "result": result}
+        self.dirty = True
+
+    def save(self):
+        """
+        清理已删除文件的条目，并在缓存有变化时写回磁盘。
+
+        先写入临时文件再替换，避免并发读取到不完整的缓存文件。
+        """
+        for relative_path in list(self.entries):
+            if relative_path not in self.seen:
+                del self.entries[relative_path]
+                self.dirty = True
+        if not self.dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": EXTRACTOR_VERSION, "files": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
+
+
+class FileHashCache:
+    def __init__(self, cache_dir: Optional[str], directory: str) -> None:
+        """
+        文件内容哈希（与 git 的 blob 哈希相同，见 content_hash）的缓存，用于计算内容寻址的图索引 id。
+
+        按相对路径记录文件的大小、修改时间、内容哈希和记录时间。大小和修改时间都没有变化，并且修改时间早于
+        记录时间 RACY_MTIME_NS 以上时直接使用记录的哈希，否则重新读取文件计算哈希，
+        因此修改时间精度范围内的同大小修改也会被发现（与 git 处理 racy clean 文件的方式相同）。
+        cache_dir 为 None 时不读写缓存文件，每次都计算所有文件的哈希。
+
+        Args:
+            cache_dir (str, optional): 缓存目录，缓存保存在其中的 `hashes-{key}.json`。
+            directory (str): 被分析的仓库目录。
+        """
+        self.cache_path = None
+        if cache_dir:
+            key = hashlib.sha1(os.path.abspath(directory).encode("utf-8")).hexdigest()[:16]
+            self.cache_path = os.path.join(cache_dir, f"hashes-{key}.json")
+        self.entries = self._load()
+        self.dirty = False
+
+    def _load(self):
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def hash(self, entry):
+        """
+        返回文件的内容哈希。
+
+        Args:
+            entry (ManifestEntry): 文件清单中的文件。
+
+        Returns:
+            str: 十六进制的 sha1 哈希值，文件已被删除时返回 None。
+        """
+        cached = self.entries.get(entry.path)
+        if cached is not None:
+            size, mtime_ns, digest, recorded_ns = cached
+            if size == entry.size and mtime_ns == entry.mtime_ns and mtime_ns + RACY_MTIME_NS < recorded_ns:
+                return digest
+        recorded_ns = time.time_ns()
+        try:
+            with open(entry.abs_path, "rb") as file:
+                source_code = file.read()
+        except FileNotFoundError:
+            return None
+        digest = content_hash(source_code)
+        self.entries[entry.path] = [entry.size, entry.mtime_ns, digest, recorded_ns]
+        self.dirty = True
+        return digest
+
+    def save(self, relative_paths):
+        """
+        清理已经不存在的文件，并在有变化时写回缓存文件。
+
+        Args:
+            relative_paths (Iterable[str]): 仓库中现有文件的相对路径，例如文件清单中的所有文件。
+        """
+        if self.cache_path is None:
+            return
+        relative_paths = set(relative_paths)
+        for relative_path in list(self.entries):
+            if relative_path not in relative_paths:
+                del self.entries[relative_path]
+                self.dirty = True
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
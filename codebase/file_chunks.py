@@ -0,0 +1,144 @@
+import os
+import re
+
+from .language_extract import EXTRACT_CLASSES
+from .parser_pool import parse_source
+
+
+# 扩展名 -> tree-sitter 语言名称
+SYNTAX_LANGUAGES = {extract_class.file_extension: extract_class(".").language for extract_class in EXTRACT_CLASSES.values()}
+
+
+def _line_spans(data: bytes, start: int, end: int):
+    """按行划分 [start, end)，每段包含行尾的换行符。"""
+    spans = []
+    while start < end:
+        newline = data.find(b"\n", start, end)
+        line_end = end if newline == -1 else newline + 1
+        spans.append((start, line_end))
+        start = line_end
+    return spans
+
+
+def _paragraph_spans(data: bytes):
+    """按空行划分文本，每段包含其后的空行。"""
+    spans = []
+    start = 0
+    for match in re.finditer(rb"\n[ \t]*\n\s*", data):
+        spans.append((start, match.end()))
+        start = match.end()
+    if start < len(data):
+        spans.append((start, len(data)))
+    return spans
+
+
+def _node_spans(node, start: int, end: int):
+    """
+    按子节点划分 [start, end)，子节点之前的空白和注释归入该子节点，最后一个子节点之后的内容归入最后一段。
+    """
+    spans = []
+    for child in node.children:
+        if start < child.end_byte <= end:
+            spans.append((start, child.end_byte))
+            start = child.end_byte
+    if start < end:
+        if spans:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def split_source(text: str, file_path: str, count_tokens, max_tokens: int):
+    """
+    把文件内容切分为不超过 max_tokens 个 token 的连续片段，尽量在语法边界处切分。
+
+    支持的源代码文件用 tree-sitter 解析，按顶层定义（函数、类等）切分；单个定义超过上限时按其子节点
+    （例如类中的方法）继续切分，叶子节点按行切分。其它文件按空行切分，段落超过上限时按行切分。
+    单行超过上限时（例如压缩后的代码）按字符平均切分。相邻的小片段会合并，直到接近上限。
+    所有片段按顺序拼接后与原文完全一致。
+
+    Args:
+        text (str): 文件内容。
+        file_path (str): 文件路径，用于根据扩展名选择语言。
+        count_tokens (Callable[[str], int]): 计算文本 token 数的函数。
+        max_tokens (int): 每个片段的 token 上限。
+
+    Returns:
+        list: (起始行号, 结束行号, 片段文本) 的列表，行号从 1 开始。
+    """
+    data = text.encode("utf-8")
+    language = SYNTAX_LANGUAGES.get(os.path.splitext(file_path)[1])
+    root = None
+    if language is not None:
+        try:
+            root = parse_source(data, language).root_node
+        except Exception:
+            # 语言库不可用时按普通文本处理
+            root = None
+
+    def tokens(start, end):
+        return count_tokens(data[start:end].decode("utf-8", errors="ignore"))
+
+    def split_line(start, end, span_tokens):
+        # 按字符平均切分，切分点不落在 UTF-8 多字节字符的中间
+        parts = -(-span_tokens // max_tokens)
+        step = -(-(end - start) // parts)
+        while start < end:
+            cut = min(start + step, end)
+            while cut < end and data[cut] & 0xC0 == 0x80:
+                cut += 1
+            yield start, cut, tokens(start, cut)
+            start = cut
+
+    def pieces(node, start, end):
+        # 按语法结构递归地切分 [start, end)，直到每一段都不超过上限
+        children = {}
+        if node is not None and node.children:
+            spans = _node_spans(node, start, end)
+            children = {child.end_byte: child for child in node.children}
+        else:
+            spans = _line_spans(data, start, end)
+        for span_start, span_end in spans:
+            span_tokens = tokens(span_start, span_end)
+            if span_tokens <= max_tokens:
+                yield span_start, span_end, span_tokens
+            elif len(spans) == 1 and node is None:
+                yield from split_line(span_start, span_end, span_tokens)
+            else:
+                yield from pieces(children.get(span_end), span_start, span_end)
+
+    def top_level():
+        if root is not None:
+            yield from pieces(root, 0, len(data))
+            return
+        for span_start, span_end in _paragraph_spans(data):
+            span_tokens = tokens(span_start, span_end)
+            if span_tokens <= max_tokens:
+                yield span_start, span_end, span_tokens
+            else:
+                yield from pieces(None, span_start, span_end)
+
+    chunks = []
+    chunk_start = chunk_end = 0
+    chunk_tokens = 0
+    for span_start, span_end, span_tokens in top_level():
+        if chunk_end > chunk_start and chunk_tokens + span_tokens > max_tokens:
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = span_start
+            chunk_tokens = 0
+        chunk_end = span_end
+        chunk_tokens += span_tokens
+    if chunk_end > chunk_start:
+        chunks.append((chunk_start, chunk_end))
+
+    result = []
+    for start, end in chunks:
+        # 行号范围不包括片段首尾的空白
+        chunk = data[start:end]
+        first = start + len(chunk) - len(chunk.lstrip())
+        last = max(start + len(chunk.rstrip()) - 1, first)
+        start_line = data.count(b"\n", 0, first) + 1
+        end_line = start_line + data.count(b"\n", first, last)
+        result.append((start_line, end_line, chunk.decode("utf-8", errors="ignore")))
+    return result
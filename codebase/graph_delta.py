@@ -0,0 +1,266 @@
+"""
+比较两个 git 版本之间调用图的变化（新增/删除的函数和调用边），只重新解析两个版本之间改动过的文件。
+
+用法:
+    python -m codebase.graph_delta <目录> <基准版本> <目标版本> [--language python] [--cache-dir output/extract_cache | --no-cache]
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from typing import Optional
+
+from .extract_cache import ExtractCache
+from .language_extract import EXTRACTOR_VERSION, get_extract_class
+from .manifest import MAX_FILE_SIZE, VENDORED_DIRS, file_extension
+from .watch import IncrementalCallGraph
+
+# 命令行默认使用的提取缓存目录，与 CallRelationSearch 使用的 GraphIndex 缓存目录相同
+DEFAULT_CACHE_DIR = os.path.join("output", "extract_cache")
+
+
+def _git(directory, *args, input=None):
+    return subprocess.run(["git", *args], cwd=directory, input=input, capture_output=True, check=True).stdout
+
+
+def resolve_revision(directory, revision):
+    """返回版本对应的完整提交哈希。"""
+    return _git(directory, "rev-parse", "--verify", f"{revision}^{{commit}}").decode("utf-8").strip()
+
+
+def changed_files(directory, base, head):
+    """
+    用 `git diff --name-only` 列出两个版本之间改动过的文件（重命名按删除和新增处理）。
+
+    Returns:
+        list: 相对于 directory 的路径列表。
+    """
+    output = _git(directory, "diff", "--name-only", "--no-renames", "--relative", "-z", base, head, "--", ".")
+    return [path for path in output.decode("utf-8").split("\0") if path]
+
+
+def _is_source_file(path, extension):
+    # 跳过的目录与文件清单一致
+    return file_extension(path) == extension and not any(part in VENDORED_DIRS for part in path.split("/")[:-1])
+
+
+def list_revision_files(directory, revision, extension, paths=None):
+    """
+    用 `git ls-tree` 列出某个版本中 directory 下指定扩展名的文件，跳过的目录和文件大小上限与文件清单一致。
+
+    Args:
+        directory (str): 仓库目录。
+        revision (str): 版本。
+        extension (str): 扩展名。
+        paths (list, optional): 只列出这些路径，版本中不存在的路径会被忽略。默认为 None，列出整个目录。
+
+    Returns:
+        dict: 相对路径到 blob 哈希的映射。
+    """
+    output = _git(directory, "ls-tree", "-r", "-l", "-z", revision, "--", *(paths or ["."]))
+    files = {}
+    for line in output.decode("utf-8").split("\0"):
+        if not line:
+            continue
+        meta, path = line.split("\t", 1)
+        mode, object_type, blob, size = meta.split()
+        # 只处理普通文件，跳过符号链接和子模块
+        if object_type != "blob" or mode == "120000" or not _is_source_file(path, extension) or int(size) > MAX_FILE_SIZE:
+            continue
+        files[path] = blob
+    return files
+
+
+def read_blobs(directory, objects):
+    """
+    用一个 `git cat-file --batch` 进程读取多个对象。
+
+    Args:
+        directory (str): 仓库目录。
+        objects (list): 对象名称的列表，例如 blob 哈希或 '版本:路径'。
+
+    Returns:
+        list: 与 objects 一一对应的内容（bytes），对象不存在时为 None。
+    """
+    if not objects:
+        return []
+    output = _git(directory, "cat-file", "--batch", input="".join(f"{name}\n" for name in objects).encode("utf-8"))
+    contents = []
+    position = 0
+    for _ in objects:
+        end = output.index(b"\n", position)
+        header = output[position:end].split()
+        position = end + 1
+        if header[-1] == b"missing":
+            contents.append(None)
+            continue
+        size = int(header[2])
+        contents.append(output[position : position + size])
+        # 内容之后还有一个换行符
+        position += size + 1
+    return contents
+
+
+class RevisionCache:
+    def __init__(self, cache_dir: str, directory: str, language: str) -> None:
+        """
+        按 (相对路径, blob 哈希) 缓存某个版本中文件的提取结果。
+
+        与 ExtractCache 保存在同一个缓存目录中；查找时还会复用 ExtractCache 中内容哈希相同的工作区提取结果
+        （提取结果的内容哈希与 git 的 blob 哈希算法一致），因此分析过工作区之后，未改动的文件都不需要重新解析。
+        保存时只保留本次用到的条目。
+
+        Args:
+            cache_dir (str): 缓存目录。
+            directory (str): 被分析的仓库目录。
+            language (str): 提取器的语言。
+        """
+        self.cache_dir = cache_dir
+        key = hashlib.sha1(f"{os.path.abspath(directory)}\0{language}".encode("utf-8")).hexdigest()[:16]
+        self.cache_path = os.path.join(cache_dir, f"{language}-{key}-revisions.json")
+        self.entries = self._load()
+        self.worktree = ExtractCache(cache_dir, directory, language).entries
+        self.seen = set()
+        self.dirty = False
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != EXTRACTOR_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def get(self, relative_path, blob):
+        """查找文件在某个版本中的提取结果，找不到时返回 None。"""
+        key = f"{relative_path}\0{blob}"
+        self.seen.add(key)
+        result = self.entries.get(key)
+        if result is not None:
+            return result
+        entry = self.worktree.get(relative_path)
+        if entry is not None and entry["result"]["hash"] == blob:
+            self.entries[key] = entry["result"]
+            self.dirty = True
+            return entry["result"]
+        return None
+
+    def put(self, relative_path, blob, result):
+        key = f"{relative_path}\0{blob}"
+        self.seen.add(key)
+        self.entries[key] = result
+        self.dirty = True
+
+    def save(self):
+        for key in list(self.entries):
+            if key not in self.seen:
+                del self.entries[key]
+                self.dirty = True
+        if not self.dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": EXTRACTOR_VERSION, "files": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
+
+
+def _extract_revision_files(extract, directory, files, cache):
+    """按 {相对路径: blob 哈希} 提取文件，优先使用缓存，其余文件通过一次 cat-file 读取后解析。"""
+    results = {}
+    missing = []
+    for relative_path, blob in files.items():
+        result = cache.get(relative_path, blob) if cache is not None else None
+        if result is None:
+            missing.append(relative_path)
+        else:
+            results[relative_path] = result
+    for relative_path, source_code in zip(missing, read_blobs(directory, [files[relative_path] for relative_path in missing])):
+        result = extract.extract_source(source_code, relative_path)
+        results[relative_path] = result
+        if cache is not None:
+            cache.put(relative_path, files[relative_path], result)
+    return results
+
+
+def call_graph_delta(directory: str, base: str, head: str, language: str = "python", cache_dir: Optional[str] = None):
+    """
+    计算两个 git 版本之间调用图的变化。
+
+    先用基准版本中所有文件的提取结果建立 IncrementalCallGraph（未改动的文件直接复用缓存的提取结果），
+    再只把 `git diff --name-only` 列出的改动文件替换为目标版本的提取结果；符号没有变化时只重新解析这些文件中的调用。
+    新增、删除的函数和调用边与分别对两个版本运行 GraphIndex.analyze_directory 的结果之差相同。
+
+    Args:
+        directory (str): git 仓库中的目录，只比较该目录下的文件。
+        base (str): 基准版本，例如 'main' 或提交哈希。
+        head (str): 目标版本。
+        language (str, optional): 语言类型，支持 GraphIndex.analyze_directory 的各种别名（不支持 'auto'）。默认为 'python'。
+        cache_dir (str, optional): 提取缓存目录，通常与 GraphIndex 的 cache_dir 相同。默认为 None（不使用缓存），
+            此时基准版本的每个文件都要重新解析；需要增量比较时应指定缓存目录，命令行默认使用 DEFAULT_CACHE_DIR。
+
+    Returns:
+        dict: 包含 'base'、'head'（提交哈希）、'changed_files'，以及 'added_functions'、'removed_functions'
+        （函数标识符列表）和 'added_edges'、'removed_edges'（[调用者, 被调用者] 列表）。
+    """
+    extract = get_extract_class(language)(directory)
+    base = resolve_revision(directory, base)
+    head = resolve_revision(directory, head)
+    cache = RevisionCache(cache_dir, directory, extract.language) if cache_dir else None
+
+    base_files = list_revision_files(directory, base, extract.file_extension)
+    touched = [path for path in changed_files(directory, base, head) if _is_source_file(path, extract.file_extension)]
+    # 改动文件在目标版本中的 blob 哈希，被删除的文件不在结果中
+    head_blobs = list_revision_files(directory, head, extract.file_extension, touched) if touched else {}
+
+    call_graph = IncrementalCallGraph(extract)
+    call_graph.set_file_order(sorted(set(base_files) | set(head_blobs)))
+    call_graph.update_files(_extract_revision_files(extract, directory, base_files, cache))
+    base_functions = set(call_graph.functions)
+    base_edges = set(call_graph.graph.edges())
+
+    head_results = _extract_revision_files(extract, directory, head_blobs, cache)
+    call_graph.update_files({path: head_results.get(path) for path in touched})
+    head_functions = set(call_graph.functions)
+    head_edges = set(call_graph.graph.edges())
+    if cache is not None:
+        cache.save()
+
+    return {
+        "base": base,
+        "head": head,
+        "changed_files": touched,
+        "added_functions": sorted(head_functions - base_functions),
+        "removed_functions": sorted(base_functions - head_functions),
+        "added_edges": [list(edge) for edge in sorted(head_edges - base_edges)],
+        "removed_edges": [list(edge) for edge in sorted(base_edges - head_edges)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="call graph changes between two git revisions")
+    parser.add_argument("directory")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--language", default="python")
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="extraction cache shared with GraphIndex; without it every file of the base revision is re-parsed "
+        f"on each run, so keep it for incremental comparisons (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the extraction cache")
+    args = parser.parse_args()
+    delta = call_graph_delta(args.directory, args.base, args.head, args.language, None if args.no_cache else args.cache_dir)
+    print(json.dumps(delta, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import csv
+import io
+
+import networkx as nx
+
+
+def _csv_text(rows, header=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def file_communities(file_paths, edges):
+    """
+    按跨文件的调用关系把文件分组：以文件为节点、调用关系为无向边，用标签传播算法划分社区。
+
+    Args:
+        file_paths (list): 文件路径，按出现顺序排列。
+        edges (Iterable[tuple]): (调用者所在文件, 被调用者所在文件)。
+
+    Returns:
+        list: 文件路径列表的列表。社区按其中第一个文件出现的顺序排列，社区内的文件保持原有顺序。
+    """
+    order = {file_path: index for index, file_path in enumerate(file_paths)}
+    G = nx.Graph()
+    G.add_nodes_from(file_paths)
+    G.add_edges_from((source, target) for source, target in edges if source != target and source in order and target in order)
+    communities = [sorted(community, key=order.__getitem__) for community in nx.algorithms.community.label_propagation_communities(G)]
+    return sorted(communities, key=lambda community: order[community[0]])
+
+
+def partition_graph_csv(csv_text: str, count_tokens, max_tokens: int, edges=None):
+    """
+    把调用图的 CSV 划分为多个不超过 max_tokens 的部分，每部分都是带表头的完整 CSV，可以单独交给 LLM 处理。
+
+    同一个文件的行总是放在一起；先按调用关系把文件分为社区，再按社区顺序依次装入，
+    装不下时开始新的部分，因此相互调用的文件尽量落在同一部分中。单个文件超过 max_tokens 时按行拆分。
+
+    Args:
+        csv_text (str): GraphIndex 生成的 `{id}.csv` 的内容。
+        count_tokens (Callable[[str], int]): 计算文本 token 数的函数。
+        max_tokens (int): 每部分 CSV 的 token 上限（不含提示词）。
+        edges (Iterable[tuple], optional): (调用者, 被调用者) 函数标识符，例如 `{id}.edges.csv` 中的完整调用边。
+            默认为 None，使用 CSV 中记录的调用边。
+
+    Returns:
+        list: CSV 文本的列表，图为空时返回只有一部分的列表。
+    """
+    reader = csv.reader(io.StringIO(csv_text))
+    header = next(reader, None)
+    if header is None:
+        return [csv_text]
+    rows = list(reader)
+    id_column, file_column, source_column, target_column = (header.index(name) for name in ("id", "file_path", "source", "target"))
+
+    rows_of_file = {}
+    file_of_function = {}
+    for row in rows:
+        rows_of_file.setdefault(row[file_column], []).append(row)
+        file_of_function[row[id_column]] = row[file_column]
+    if edges is None:
+        edges = ((row[source_column], row[target_column]) for row in rows if row[source_column])
+    file_edges = ((file_of_function.get(caller), file_of_function.get(callee)) for caller, callee in edges)
+    header_tokens = count_tokens(_csv_text([], header))
+
+    partitions = []
+    current_rows = []
+    current_tokens = header_tokens
+
+    def close():
+        nonlocal current_rows, current_tokens
+        if current_rows:
+            partitions.append(_csv_text(current_rows, header))
+        current_rows = []
+        current_tokens = header_tokens
+
+    for community in file_communities(list(rows_of_file), file_edges):
+        for file_path in community:
+            file_rows = rows_of_file[file_path]
+            file_tokens = count_tokens(_csv_text(file_rows))
+            if current_tokens + file_tokens <= max_tokens:
+                current_rows.extend(file_rows)
+                current_tokens += file_tokens
+                continue
+            close()
+            if header_tokens + file_tokens <= max_tokens:
+                current_rows = list(file_rows)
+                current_tokens += file_tokens
+                continue
+            # 单个文件超过上限，按行拆分
+            for row in file_rows:
+                row_tokens = count_tokens(_csv_text([row]))
+                if current_rows and current_tokens + row_tokens > max_tokens:
+                    close()
+                current_rows.append(row)
+                current_tokens += row_tokens
+    close()
+    return partitions or [csv_text]
+
+
+def merge_file_descriptions(responses):
+    """
+    合并各部分 LLM 返回的文件描述列表。
+
+    同一个文件出现在多个部分中时（文件被拆分，或者 LLM 描述了其它部分中的被调用文件），按出现顺序拼接描述。
+
+    Args:
+        responses (list): 每部分的 [{'file_path': ..., 'descriptions': ...}] 列表。
+
+    Returns:
+        list: 合并后的列表，按文件第一次出现的顺序排列。
+    """
+    merged = {}
+    for response in responses:
+        for item in response:
+            file_path = item.get("file_path")
+            if file_path in merged:
+                descriptions = merged[file_path].get("descriptions") or ""
+                if item.get("descriptions") and item["descriptions"] not in descriptions:
+                    merged[file_path]["descriptions"] = (descriptions + " " + item["descriptions"]).strip()
+            else:
+                merged[file_path] = dict(item)
+    return list(merged.values())
@@ -0,0 +1,325 @@
+import json
+import math
+import os
+from collections import deque
+from typing import Literal, TypeAlias
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .csr_graph import CSRCallGraph
+from .edge_export import node_link_graph
+
+
+Direction: TypeAlias = Literal["callees", "callers", "both"]
+
+# 传递闭包占用内存的上限（字节）。n 个强连通分量时，调用方向和被调用方向的位集最坏情况下（一条链）共占 n²/8 字节
+CLOSURE_MAX_BYTES = 32 * 2**20
+# 强连通分量数不超过该值（16384）时预先计算两个方向的传递闭包，否则可达性查询在缩点后的 DAG 上搜索
+CLOSURE_MAX_COMPONENTS = math.isqrt(8 * CLOSURE_MAX_BYTES)
+
+
+def _csr_from_pairs(pairs, size):
+    """把 (起点, 终点) 数组转换为按起点分组的 (indptr, indices)，同一起点的终点保持原有顺序。"""
+    order = np.argsort(pairs[:, 0], kind="stable")
+    indices = pairs[order, 1].astype(np.int64)
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[:, 0], minlength=size), out=indptr[1:])
+    return indptr, indices
+
+
+class CallGraphQuery:
+    def __init__(self, graph, closure_max_components: int = CLOSURE_MAX_COMPONENTS) -> None:
+        """
+        调用图的查询引擎，支持直接/传递的调用者和被调用者、两个函数之间的最短调用路径以及 k 跳邻域子图。
+
+        构造时预先计算强连通分量并缩点为 DAG，分量按拓扑顺序编号（边总是从编号小的分量指向编号大的分量）；
+        分量数不超过 closure_max_components 时，再计算每个分量可以到达的分量和可以到达它的分量的位集作为可达性索引，
+        两个位集最坏情况下共占 closure_max_components²/8 字节（默认不超过 CLOSURE_MAX_BYTES）。
+        可达性判断只需一次位运算，传递查询的开销只与结果大小有关，与图的规模无关。
+
+        Args:
+            graph (CSRCallGraph | DiGraph): 调用图。
+            closure_max_components (int, optional): 预先计算传递闭包的最大分量数。
+        """
+        if not isinstance(graph, CSRCallGraph):
+            graph = CSRCallGraph.from_networkx(graph)
+        self.graph = graph
+        n = graph.num_nodes
+        indptr = np.asarray(graph.indptr, dtype=np.int64)
+        indices = np.asarray(graph.indices, dtype=np.int64)
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+
+        matrix = csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr), shape=(n, n))
+        count, labels = connected_components(matrix, directed=True, connection="strong")
+        edges = np.stack([labels[sources], labels[indices]], axis=1).astype(np.int64)
+        edges = np.unique(edges[edges[:, 0] != edges[:, 1]], axis=0).reshape(-1, 2)
+
+        # 按拓扑顺序重新编号分量
+        in_degree = np.bincount(edges[:, 1], minlength=count).tolist()
+        out_indptr, out_indices = _csr_from_pairs(edges, count)
+        out_indptr, out_indices = out_indptr.tolist(), out_indices.tolist()
+        queue = deque(component for component in range(count) if in_degree[component] == 0)
+        order = []
+        while queue:
+            component = queue.popleft()
+            order.append(component)
+            for successor in out_indices[out_indptr[component] : out_indptr[component + 1]]:
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    queue.append(successor)
+        rank = np.empty(count, dtype=np.int64)
+        rank[np.array(order, dtype=np.int64)] = np.arange(count, dtype=np.int64)
+        self.num_components = count
+        # 节点编号 -> 拓扑编号后的分量
+        self.component = rank[labels]
+        edges = rank[edges]
+        self._dag_indptr, self._dag_indices = (array.tolist() for array in _csr_from_pairs(edges, count))
+        self._dag_in_indptr, self._dag_in_indices = (array.tolist() for array in _csr_from_pairs(edges[:, ::-1], count))
+
+        # 分量 -> 节点编号
+        members = np.argsort(self.component, kind="stable")
+        member_indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.component, minlength=count), out=member_indptr[1:])
+        self._members = members.tolist()
+        self._member_indptr = member_indptr.tolist()
+        # 分量内部存在环（多个节点或自调用）时，其中的函数可以传递地调用自己
+        cyclic = np.diff(member_indptr) > 1
+        self_loops = sources[sources == indices]
+        cyclic[self.component[self_loops]] = True
+        self._cyclic = cyclic.tolist()
+        self._component_list = self.component.tolist()
+
+        self._closure = None
+        self._reverse_closure = None
+        if count <= closure_max_components:
+            # closure[c] 的第 i 位表示分量 c 可以到达分量 c + i（第 0 位是分量自身），按逆拓扑顺序计算
+            closure = [0] * count
+            for component in range(count - 1, -1, -1):
+                reach = 1
+                for successor in self._dag_indices[self._dag_indptr[component] : self._dag_indptr[component + 1]]:
+                    reach |= closure[successor] << (successor - component)
+                closure[component] = reach
+            self._closure = closure
+            # reverse_closure[c] 的第 i 位表示分量 c - i 可以到达分量 c，按拓扑顺序计算
+            reverse_closure = [0] * count
+            for component in range(count):
+                reach = 1
+                for predecessor in self._dag_in_indices[self._dag_in_indptr[component] : self._dag_in_indptr[component + 1]]:
+                    reach |= reverse_closure[predecessor] << (component - predecessor)
+                reverse_closure[component] = reach
+            self._reverse_closure = reverse_closure
+        self._short_names = None
+
+    @classmethod
+    def load(cls, output_dir: str, id: str, **kwargs):
+        """
+        加载 GraphIndex 保存在输出目录中的调用图，优先使用内存映射的 `{id}.csrgraph`，否则读取 `{id}.json`。
+
+        Args:
+            output_dir (str): 输出目录。
+            id (str): 图索引的 id。
+
+        Returns:
+            CallGraphQuery: 查询引擎。
+        """
+        csr_file_path = os.path.join(output_dir, id + ".csrgraph")
+        if os.path.exists(csr_file_path):
+            return cls(CSRCallGraph.load(csr_file_path), **kwargs)
+        with open(os.path.join(output_dir, id + ".json"), "r", encoding="utf-8") as f:
+            return cls(node_link_graph(json.load(f)), **kwargs)
+
+    def _index(self, function_id):
+        index = self.graph.node_index(function_id)
+        if index is None:
+            raise KeyError(f"Function not found in call graph: {function_id}")
+        return index
+
+    def _ids(self, indices):
+        node_ids = self.graph.node_ids
+        return [node_ids[index] for index in indices]
+
+    def find_functions(self, name: str):
+        """
+        按名称查找函数：完全匹配的标识符，或者以 '.名称' 结尾的方法（例如 'run' 可以匹配 'Worker.run'）。
+
+        Returns:
+            list: 函数标识符的列表。
+        """
+        if self.graph.node_index(name) is not None:
+            return [name]
+        if self._short_names is None:
+            short_names = {}
+            for function_id in self.graph.node_ids:
+                short_names.setdefault(function_id.rsplit(".", 1)[-1], []).append(function_id)
+            self._short_names = short_names
+        return [function_id for function_id in self._short_names.get(name.rsplit(".", 1)[-1], []) if function_id.endswith("." + name)]
+
+    def callees(self, function_id: str):
+        """返回函数直接调用的函数。"""
+        return self._ids(self.graph.successors(self._index(function_id)).tolist())
+
+    def callers(self, function_id: str):
+        """返回直接调用该函数的函数。"""
+        return self._ids(self.graph.predecessors(self._index(function_id)).tolist())
+
+    def reaches(self, caller: str, callee: str):
+        """
+        判断 caller 是否直接或间接地调用 callee。
+
+        Returns:
+            bool: 存在从 caller 到 callee 的调用路径时为 True。函数只有处于调用环中时才会到达自身。
+        """
+        source = self._component_list[self._index(caller)]
+        target = self._component_list[self._index(callee)]
+        return self._component_reaches(source, target)
+
+    def _component_reaches(self, source, target):
+        if source == target:
+            return self._cyclic[source]
+        if target < source:
+            return False
+        if self._closure is not None:
+            return bool((self._closure[source] >> (target - source)) & 1)
+        # 没有传递闭包时在 DAG 上搜索，拓扑编号大于 target 的分量不可能到达 target
+        visited = {source}
+        stack = [source]
+        while stack:
+            component = stack.pop()
+            for successor in self._dag_indices[self._dag_indptr[component] : self._dag_indptr[component + 1]]:
+                if successor == target:
+                    return True
+                if successor < target and successor not in visited:
+                    visited.add(successor)
+                    stack.append(successor)
+        return False
+
+    def _reachable_components(self, component, indptr, indices):
+        visited = {component}
+        stack = [component]
+        while stack:
+            current = stack.pop()
+            for neighbor in indices[indptr[current] : indptr[current + 1]]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    stack.append(neighbor)
+        visited.discard(component)
+        return visited
+
+    @staticmethod
+    def _offsets(reach):
+        """返回位集中除第 0 位以外所有为 1 的位的序号。"""
+        reach >>= 1
+        bits = np.unpackbits(np.frombuffer(reach.to_bytes((reach.bit_length() + 7) // 8, "little"), dtype=np.uint8), bitorder="little")
+        return np.flatnonzero(bits) + 1
+
+    def _members_of(self, components):
+        members = []
+        for component in sorted(components):
+            members.extend(self._members[self._member_indptr[component] : self._member_indptr[component + 1]])
+        return members
+
+    def transitive_callees(self, function_id: str):
+        """
+        返回函数直接或间接调用的所有函数（不包括函数自身），按分量的拓扑顺序排列。
+        """
+        index = self._index(function_id)
+        component = self._component_list[index]
+        if self._closure is not None:
+            components = set((component + self._offsets(self._closure[component])).tolist())
+        else:
+            components = self._reachable_components(component, self._dag_indptr, self._dag_indices)
+        if self._cyclic[component]:
+            components.add(component)
+        return [function for function in self._ids(self._members_of(components)) if function != function_id]
+
+    def transitive_callers(self, function_id: str):
+        """
+        返回直接或间接调用该函数的所有函数（不包括函数自身），按分量的拓扑顺序排列。
+        """
+        index = self._index(function_id)
+        component = self._component_list[index]
+        if self._reverse_closure is not None:
+            components = set((component - self._offsets(self._reverse_closure[component])).tolist())
+        else:
+            components = self._reachable_components(component, self._dag_in_indptr, self._dag_in_indices)
+        if self._cyclic[component]:
+            components.add(component)
+        return [function for function in self._ids(self._members_of(components)) if function != function_id]
+
+    def shortest_path(self, caller: str, callee: str):
+        """
+        返回从 caller 到 callee 经过函数最少的调用路径。
+
+        先用可达性索引排除不可达的情况；广度优先搜索时只展开能够到达 callee 的分量中的节点。
+
+        Returns:
+            list: 路径上的函数标识符（包括两端），不存在调用路径时返回 None。
+        """
+        source = self._index(caller)
+        target = self._index(callee)
+        target_component = self._component_list[target]
+        if source != target and not self._component_reaches(self._component_list[source], target_component):
+            return None
+        if source == target:
+            return [caller]
+        indptr = self.graph.indptr
+        indices = self.graph.indices
+        parents = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for successor in indices[indptr[node] : indptr[node + 1]].tolist():
+                if successor in parents:
+                    continue
+                successor_component = self._component_list[successor]
+                if successor_component != target_component and not self._component_reaches(successor_component, target_component):
+                    continue
+                parents[successor] = node
+                if successor == target:
+                    path = [target]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return self._ids(reversed(path))
+                queue.append(successor)
+        return None
+
+    def neighborhood(self, function_id: str, k: int = 1, direction: Direction = "both"):
+        """
+        返回函数 k 跳以内的邻域子图。
+
+        Args:
+            function_id (str): 中心函数。
+            k (int, optional): 跳数。默认为 1。
+            direction (str, optional): 'callees' 只沿调用方向扩展，'callers' 只沿被调用方向扩展，'both' 两个方向都扩展。
+
+        Returns:
+            DiGraph: 邻域内的节点（包括属性）以及它们之间的所有调用边。
+        """
+        start = self._index(function_id)
+        distance = {start: 0}
+        frontier = [start]
+        for hop in range(1, k + 1):
+            next_frontier = []
+            for node in frontier:
+                neighbors = []
+                if direction in ("callees", "both"):
+                    neighbors.extend(self.graph.successors(node).tolist())
+                if direction in ("callers", "both"):
+                    neighbors.extend(self.graph.predecessors(node).tolist())
+                for neighbor in neighbors:
+                    if neighbor not in distance:
+                        distance[neighbor] = hop
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        G = nx.DiGraph()
+        for node in distance:
+            G.add_node(self.graph.node_id(node), **self.graph.node_attributes(node), distance=distance[node])
+        for node in distance:
+            for successor in self.graph.successors(node).tolist():
+                if successor in distance:
+                    G.add_edge(self.graph.node_id(node), self.graph.node_id(successor))
+        return G
@@ -0,0 +1,266 @@
+import os
+import sqlite3
+import threading
+
+import networkx as nx
+
+from .graph_query import Direction
+
+
+SCHEMA = """
+CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+CREATE TABLE functions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    short_name TEXT NOT NULL,
+    class TEXT,
+    file_id INTEGER REFERENCES files (id),
+    language TEXT
+);
+CREATE TABLE edges (caller INTEGER NOT NULL, callee INTEGER NOT NULL, file_id INTEGER, line INTEGER);
+"""
+
+# 数据写入之后再建立索引，比逐行维护索引快得多
+INDEXES = """
+CREATE INDEX edges_caller ON edges (caller, callee);
+CREATE INDEX edges_callee ON edges (callee, caller);
+CREATE INDEX functions_short_name ON functions (short_name);
+CREATE INDEX functions_file ON functions (file_id);
+"""
+
+
+class SQLiteCallGraph:
+    def __init__(self, file_path: str) -> None:
+        """
+        以只读方式打开 SQLite 格式的调用图。
+
+        查询只读取用到的索引页，不需要把整张图加载到内存中。每个线程使用自己的连接，
+        多个线程或多个服务进程可以同时读取同一个文件。
+
+        Args:
+            file_path (str): `{id}.sqlite` 文件的路径。
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Call graph store not found: {file_path}")
+        self.file_path = file_path
+        self._local = threading.local()
+
+    @classmethod
+    def create(cls, file_path: str, functions: dict, calls: list):
+        """
+        根据函数信息和调用关系（与 GraphIndex.build_call_graph 的输入相同）批量写入 SQLite 调用图。
+
+        函数的编号与 build_call_graph 构建的 DiGraph 的节点顺序一致：先按顺序写入所有函数，
+        再写入调用关系中未定义的端点。每个调用点写入一行边，同一对函数之间的多次调用都会保留。
+        先写入临时文件并在写完后建立索引，再替换为目标文件，读取者不会看到不完整的文件。
+
+        Args:
+            file_path (str): `{id}.sqlite` 文件的路径。
+            functions (dict): 包含函数信息的字典，键是函数名称，值是相关信息。
+            calls (list): 包含函数调用关系的列表。
+
+        Returns:
+            SQLiteCallGraph: 打开的调用图。
+        """
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        connection = sqlite3.connect(tmp_path)
+        try:
+            # 临时文件写入失败时直接丢弃，不需要回滚日志
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            connection.executescript(SCHEMA)
+
+            file_ids = {}
+            function_ids = {}
+
+            def file_id(path):
+                if not path:
+                    return None
+                if path not in file_ids:
+                    file_ids[path] = len(file_ids) + 1
+                return file_ids[path]
+
+            def function_rows():
+                for name, info in functions.items():
+                    function_ids[name] = len(function_ids) + 1
+                    yield function_ids[name], name, name.rsplit(".", 1)[-1], info.get("class"), file_id(info.get("file_path")), info.get("language")
+                for call in calls:
+                    for name in (call["caller"], call["callee"]):
+                        if name not in function_ids:
+                            function_ids[name] = len(function_ids) + 1
+                            info = functions.get(name, {})
+                            yield function_ids[name], name, name.rsplit(".", 1)[-1], info.get("class"), file_id(info.get("file_path")), info.get("language")
+
+            with connection:
+                connection.executemany("INSERT INTO functions VALUES (?, ?, ?, ?, ?, ?)", function_rows())
+                connection.executemany(
+                    "INSERT INTO edges VALUES (?, ?, ?, ?)",
+                    ((function_ids[call["caller"]], function_ids[call["callee"]], file_id(call.get("file_path")), call.get("line")) for call in calls),
+                )
+                connection.executemany("INSERT INTO files VALUES (?, ?)", ((index, path) for path, index in file_ids.items()))
+                connection.executescript(INDEXES)
+            connection.execute("ANALYZE")
+            connection.execute("PRAGMA journal_mode = DELETE")
+        except BaseException:
+            connection.close()
+            os.remove(tmp_path)
+            raise
+        connection.close()
+        os.replace(tmp_path, file_path)
+        return cls(file_path)
+
+    @classmethod
+    def load(cls, output_dir: str, id: str):
+        """打开 GraphIndex 保存在输出目录中的 `{id}.sqlite`。"""
+        return cls(os.path.join(output_dir, id + ".sqlite"))
+
+    @property
+    def connection(self):
+        """当前线程的只读连接。"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.file_path}?mode=ro", uri=True)
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        """关闭当前线程的连接。"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _query(self, sql, parameters=()):
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def _id(self, function_id):
+        rows = self._query("SELECT id FROM functions WHERE name = ?", (function_id,))
+        if not rows:
+            raise KeyError(f"Function not found in call graph: {function_id}")
+        return rows[0][0]
+
+    @property
+    def num_functions(self):
+        return self._query("SELECT COUNT(*) FROM functions")[0][0]
+
+    @property
+    def num_edges(self):
+        """调用点的数量（多重边分别计数）。"""
+        return self._query("SELECT COUNT(*) FROM edges")[0][0]
+
+    def function(self, function_id: str):
+        """
+        返回函数的属性。
+
+        Returns:
+            dict: 包含 'class'、'file_path' 和 'language' 的字典，函数不存在时返回 None。
+        """
+        rows = self._query(
+            "SELECT f.class, files.path, f.language FROM functions f LEFT JOIN files ON files.id = f.file_id WHERE f.name = ?",
+            (function_id,),
+        )
+        if not rows:
+            return None
+        class_name, file_path, language = rows[0]
+        return {"class": class_name, "file_path": file_path, "language": language}
+
+    def find_functions(self, name: str):
+        """
+        按名称查找函数：完全匹配的标识符，或者以 '.名称' 结尾的方法，与 CallGraphQuery.find_functions 相同。
+
+        Returns:
+            list: 函数标识符的列表。
+        """
+        if self._query("SELECT 1 FROM functions WHERE name = ?", (name,)):
+            return [name]
+        rows = self._query("SELECT name FROM functions WHERE short_name = ? ORDER BY id", (name.rsplit(".", 1)[-1],))
+        return [function_id for (function_id,) in rows if function_id.endswith("." + name)]
+
+    def callees(self, function_id: str):
+        """返回函数直接调用的函数，按第一次调用的顺序排列。"""
+        rows = self._query(
+            "SELECT f.name FROM edges e JOIN functions f ON f.id = e.callee WHERE e.caller = ? GROUP BY e.callee ORDER BY MIN(e.rowid)",
+            (self._id(function_id),),
+        )
+        return [name for (name,) in rows]
+
+    def callers(self, function_id: str):
+        """返回直接调用该函数的函数，按第一次调用的顺序排列。"""
+        rows = self._query(
+            "SELECT f.name FROM edges e JOIN functions f ON f.id = e.caller WHERE e.callee = ? GROUP BY e.caller ORDER BY MIN(e.rowid)",
+            (self._id(function_id),),
+        )
+        return [name for (name,) in rows]
+
+    def call_sites(self, caller: str, callee: str):
+        """
+        返回 caller 调用 callee 的所有调用点。
+
+        Returns:
+            list: (文件路径, 行号) 的列表。
+        """
+        return self._query(
+            "SELECT files.path, e.line FROM edges e LEFT JOIN files ON files.id = e.file_id WHERE e.caller = ? AND e.callee = ? ORDER BY e.rowid",
+            (self._id(caller), self._id(callee)),
+        )
+
+    def functions_in_file(self, file_path: str):
+        """返回定义在文件中的函数。"""
+        rows = self._query("SELECT f.name FROM functions f JOIN files ON files.id = f.file_id WHERE files.path = ? ORDER BY f.id", (file_path,))
+        return [name for (name,) in rows]
+
+    def neighborhood(self, function_id: str, k: int = 1, direction: Direction = "both"):
+        """
+        返回函数 k 跳以内的邻域子图，与 CallGraphQuery.neighborhood 相同。
+
+        逐跳地用索引查询当前一层节点的邻居，只读取邻域内的节点和边。
+
+        Args:
+            function_id (str): 中心函数。
+            k (int, optional): 跳数。默认为 1。
+            direction (str, optional): 'callees' 只沿调用方向扩展，'callers' 只沿被调用方向扩展，'both' 两个方向都扩展。
+
+        Returns:
+            DiGraph: 邻域内的节点（包括属性）以及它们之间的所有调用边。
+        """
+        start = self._id(function_id)
+        distance = {start: 0}
+        frontier = [start]
+        queries = []
+        if direction in ("callees", "both"):
+            queries.append("SELECT DISTINCT callee FROM edges WHERE caller IN (SELECT value FROM json_each(?))")
+        if direction in ("callers", "both"):
+            queries.append("SELECT DISTINCT caller FROM edges WHERE callee IN (SELECT value FROM json_each(?))")
+        for hop in range(1, k + 1):
+            if not frontier:
+                break
+            ids = "[" + ",".join(map(str, frontier)) + "]"
+            frontier = []
+            for sql in queries:
+                for (neighbor,) in self._query(sql, (ids,)):
+                    if neighbor not in distance:
+                        distance[neighbor] = hop
+                        frontier.append(neighbor)
+
+        ids = "[" + ",".join(map(str, distance)) + "]"
+        G = nx.DiGraph()
+        names = {}
+        for id, name, class_name, file_path, language in self._query(
+            "SELECT f.id, f.name, f.class, files.path, f.language FROM functions f LEFT JOIN files ON files.id = f.file_id "
+            "WHERE f.id IN (SELECT value FROM json_each(?)) ORDER BY f.id",
+            (ids,),
+        ):
+            names[id] = name
+            attributes = {"class": class_name, "file_path": file_path}
+            if language is not None:
+                attributes["language"] = language
+            G.add_node(name, **attributes, distance=distance[id])
+        for caller, callee in self._query(
+            "SELECT caller, callee FROM edges WHERE caller IN (SELECT value FROM json_each(?)) GROUP BY caller, callee ORDER BY MIN(rowid)",
+            (ids,),
+        ):
+            if callee in names:
+                G.add_edge(names[caller], names[callee])
+        return G
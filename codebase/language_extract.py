@@ -1,9 +1,121 @@
-from tree_sitter import Language, Parser
+import hashlib
 import os
-import platform
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from .manifest import get_manifest
+from .parser_pool import get_query, parse_source
+from .symbol_table import SymbolTable
+
+
+# 提取结果的格式版本，提取逻辑变化时需要递增，以便让缓存的结果失效
+EXTRACTOR_VERSION = "6"
+
+
+def content_hash(source_code):
+    """
+    计算文件内容的哈希值。
+
+    与 git 的 blob 对象哈希算法一致，因此可以直接与 git 记录的文件哈希比较。
+
+    Args:
+        source_code (bytes): 文件内容。
+
+    Returns:
+        str: 十六进制的 sha1 哈希值。
+    """
+    return hashlib.sha1(b"blob %d\0" % len(source_code) + source_code).hexdigest()
+
+
+class ExtractContext:
+    def __init__(self, file_path):
+        """
+        单个文件提取过程中的上下文，由遍历器在各个节点处理函数之间共享。
+
+        current_class 和 current_function 记录遍历过程中最近一次遇到的类和函数定义，
+        处理函数据此确定调用者以及被调用函数的完整名称。
+        imports、wildcard_imports 和 bases 记录文件的导入和类的基类，写入提取结果后用于建立符号表和解析调用；
+        enclosing 记录嵌套函数所在的外层函数，用于按局部作用域解析调用。
+
+        Args:
+            file_path (str): 当前分析的文件路径。
+        """
+        self.file_path = file_path
+        self.functions = {}
+        self.calls = []
+        self.current_class = None
+        self.current_function = None
+        self.variable_types = {}
+        # 导入的名称 -> [模块, 模块中的名称]，导入整个模块时名称为 None
+        self.imports = {}
+        # `from 模块 import *` 等方式导入全部名称的模块
+        self.wildcard_imports = []
+        # 类名 -> 基类名称列表
+        self.bases = {}
+        # 嵌套函数的标识符 -> 直接包含它的函数的标识符列表（不同函数中可以定义同名的嵌套函数）
+        self.enclosing = {}
+
+
+# 查询无法编译的语言（语言库中缺少 node_handlers 登记的节点类型），提取时改用 walk_tree
+_unqueryable_languages = set()
+
+
+def walk_tree(root_node, handlers, context):
+    """
+    使用 TreeCursor 迭代地先序遍历语法树，按节点类型调用对应的处理函数。
+
+    与递归遍历 node.children 相比，不需要为每个节点创建子节点列表，
+    遍历深度也不受 Python 递归深度的限制。访问顺序与递归先序遍历完全一致。
+
+    Args:
+        root_node (Node): 语法树的根节点。
+        handlers (dict): 节点类型到处理函数的映射，处理函数的参数为 (node, context)。
+        context (ExtractContext): 提取上下文。
+    """
+    cursor = root_node.walk()
+    while True:
+        node = cursor.node
+        handler = handlers.get(node.type)
+        if handler is not None:
+            handler(node, context)
+        if cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return
+
+
+def query_nodes(root_node, language, node_types):
+    """
+    使用预编译的 tree-sitter 查询找出语法树中指定类型的所有节点。
+
+    每种节点类型对应查询中的一个模式，捕获名即节点类型；匹配在 C 中完成，
+    Python 只会为匹配到的节点创建 Node 对象。查询在每个进程中只编译一次。
+    返回的节点按先序遍历的顺序排列（起始位置升序，起始位置相同时外层节点在前），
+    与 walk_tree 的访问顺序一致。
+
+    Args:
+        root_node (Node): 语法树的根节点。
+        language (str): tree-sitter 语言名称。
+        node_types (Iterable[str]): 需要查找的节点类型。
+
+    Returns:
+        list: (node, node_type) 元组的列表。
+    """
+    query = get_query(language, " ".join(f"({node_type}) @{node_type}" for node_type in node_types))
+    captures = query.captures(root_node)
+    captures.sort(key=lambda capture: (capture[0].start_byte, -capture[0].end_byte))
+    return captures
 
 
 class BaseExtract:
+    # 该语言源文件的扩展名，由子类指定
+    file_extension = None
+    # 节点类型到处理方法名的映射，由子类指定
+    node_handlers = {}
+    # 模块名的分隔符，与 module_name 返回的模块名一致
+    module_separator = "/"
+
     def __init__(self, directory, language):
         self.directory = str(directory)
         self.language = language
@@ -12,7 +124,7 @@ class BaseExtract:
         """
         使用 tree_sitter 解析文件，获取 AST（抽象语法树）。
 
-        此函数读取指定路径的文件，并使用 tree_sitter 解析器来解析该文件，
+        此函数读取指定路径的文件，并使用进程级缓存的语言和解析器池来解析该文件，
         最终获取并返回文件的抽象语法树（AST）的根节点。
 
         Args:
@@ -23,24 +135,400 @@ class BaseExtract:
         """
         with open(file_path, "rb") as file:
             source_code = file.read()
-        parser = Parser()
-
-        # Determine the file extension based on the operating system
-        system = platform.system()
-        if system == "Windows":
-            extension = "dll"
-        elif system == "Darwin":
-            extension = "dylib"
-        else:  # Assume Linux if not Windows or macOS
-            extension = "so"
-
-        language_path = os.path.join(os.path.dirname(__file__), "build", f"tree-sitter-{self.language}.{extension}")
-        parser.set_language(Language(language_path, self.language))
-        tree = parser.parse(source_code)
+        tree = parse_source(source_code, self.language)
         return tree.root_node
 
+    def create_context(self, file_path):
+        """
+        创建单个文件的提取上下文，需要额外状态的语言可以重写此方法。
+
+        Args:
+            file_path (str): 当前分析的文件路径。
+
+        Returns:
+            ExtractContext: 提取上下文。
+        """
+        return ExtractContext(file_path)
+
+    def extract_context(self, root_node, file_path):
+        """
+        一次遍历语法树，同时提取函数定义、原始调用关系、导入和基类。
+
+        node_handlers 中登记的节点由预编译的查询（query_nodes）一次找出，再按先序遍历的顺序
+        调用子类对应的处理方法，处理方法只负责名称解析。语言库的版本不支持查询中的某个节点类型时，
+        退回到 walk_tree 完整遍历语法树，两者调用处理方法的顺序相同。
+
+        Args:
+            root_node (Node): 语法树的根节点。
+            file_path (str): 当前分析的文件路径。
+
+        Returns:
+            ExtractContext: 提取完成后的上下文。
+        """
+        context = self.create_context(file_path)
+        handlers = {node_type: getattr(self, name) for node_type, name in self.node_handlers.items()}
+        if self.language not in _unqueryable_languages:
+            try:
+                nodes = query_nodes(root_node, self.language, handlers)
+            except NameError:
+                # 语言库中缺少某些节点类型时查询无法编译，之后该语言都改用完整遍历
+                _unqueryable_languages.add(self.language)
+            else:
+                for node, node_type in nodes:
+                    handlers[node_type](node, context)
+                return context
+        walk_tree(root_node, handlers, context)
+        return context
+
+    def extract_definitions_and_calls(self, root_node, file_path):
+        """
+        一次遍历语法树，同时提取函数定义和原始调用关系。
+
+        Args:
+            root_node (Node): 语法树的根节点。
+            file_path (str): 当前分析的文件路径。
+
+        Returns:
+            tuple: (functions, calls)。calls 中的被调用函数尚未与符号表比对，
+            由 resolve_calls 在所有文件提取完成后统一处理。
+        """
+        context = self.extract_context(root_node, file_path)
+        return context.functions, context.calls
+
+    def extract_file(self, file_path, relative_path):
+        """
+        解析单个文件，并一次性提取其中的函数定义和原始调用关系。
+
+        Args:
+            file_path (str): 要解析的文件路径。
+            relative_path (str): 记录在函数信息中的相对路径。
+
+        Returns:
+            dict: 包含 'file_path'、'hash'、'functions' 和 'calls' 的单文件提取结果。
+        """
+        with open(file_path, "rb") as file:
+            source_code = file.read()
+        return self.extract_source(source_code, relative_path)
+
+    def extract_source(self, source_code, relative_path):
+        """
+        解析源码内容，并一次性提取其中的函数定义和原始调用关系。
+
+        Args:
+            source_code (bytes): 文件内容。
+            relative_path (str): 记录在函数信息中的相对路径。
+
+        Returns:
+            dict: 包含 'file_path'、'hash'、'functions' 和 'calls' 的单文件提取结果。
+        """
+        return self.extract_tree(parse_source(source_code, self.language), source_code, relative_path)
+
+    def extract_tree(self, tree, source_code, relative_path):
+        """
+        从已经解析好的语法树中提取函数定义和原始调用关系，例如增量解析得到的语法树。
+
+        Args:
+            tree (Tree): 源码的语法树。
+            source_code (bytes): 文件内容。
+            relative_path (str): 记录在函数信息中的相对路径。
+
+        Returns:
+            dict: 包含 'file_path'、'hash'、'functions'、'calls'、'imports'、'wildcard_imports'、'bases' 和 'enclosing' 的单文件提取结果。
+        """
+        context = self.extract_context(tree.root_node, relative_path)
+        return {
+            "file_path": relative_path,
+            "hash": content_hash(source_code),
+            "functions": context.functions,
+            "calls": context.calls,
+            "imports": context.imports,
+            "wildcard_imports": context.wildcard_imports,
+            "bases": context.bases,
+            "enclosing": context.enclosing,
+        }
+
+    def module_name(self, relative_path):
+        """
+        返回文件所属的模块，作为符号表索引的第一部分。默认每个文件是一个模块，子类可以重写。
+
+        Args:
+            relative_path (str): 文件的相对路径。
+
+        Returns:
+            str: 模块名。
+        """
+        return relative_path
+
+    def build_symbol_table(self, results):
+        """
+        根据所有文件的提取结果建立符号表，每次分析只建立一次。
+
+        Args:
+            results (list): 单文件提取结果的列表。
+
+        Returns:
+            SymbolTable: 符号表。
+        """
+        symbols = SymbolTable(self.module_separator)
+        for result in results:
+            symbols.add_file(result["file_path"], self.module_name(result["file_path"]), result)
+        return symbols
+
+    def resolve_call(self, call, module, result, symbols):
+        """
+        解析单个原始调用的被调用函数。
+
+        默认只保留调用者和被调用者都已定义的调用；子类可以结合导入、类和基类重写解析规则。
+
+        Args:
+            call (dict): 原始调用。
+            module (str): 调用所在文件的模块。
+            result (dict): 调用所在文件的提取结果。
+            symbols (SymbolTable): 符号表。
+
+        Returns:
+            str: 被调用函数的标识符，无法解析时返回 None。
+        """
+        if call["caller"] in symbols and call["callee"] in symbols:
+            return call["callee"]
+        return None
+
+    def resolve_file_calls(self, result, symbols):
+        """
+        解析单个文件中的原始调用。
+
+        Args:
+            result (dict): 单文件提取结果。
+            symbols (SymbolTable): 符号表。
+
+        Returns:
+            list: 解析后的调用关系列表。每个调用点对应一项，包含调用点所在的文件 'file_path' 和行号 'line'。
+        """
+        module = self.module_name(result["file_path"])
+        calls = []
+        for call in result["calls"]:
+            callee = self.resolve_call(call, module, result, symbols)
+            if callee is not None:
+                calls.append({"caller": call["caller"], "callee": callee, "file_path": result["file_path"], "line": call.get("line")})
+        return calls
+
+    def resolve_calls(self, results, symbols=None):
+        """
+        按文件顺序解析所有原始调用，无法解析到已定义函数的调用被丢弃，不会在调用图中产生多余的节点。
+
+        Args:
+            results (list): 单文件提取结果的列表。
+            symbols (SymbolTable, optional): 符号表。为 None 时根据 results 建立。
+
+        Returns:
+            list: 解析后的调用关系列表。
+        """
+        return list(ResolvedCalls(self, results, symbols))
+
+    def list_source_files(self):
+        """
+        列出目录下该语言的所有源文件。
+
+        Returns:
+            list: (file_path, relative_path) 元组的列表，file_path 为绝对路径，
+            relative_path 为记录在函数信息中的相对路径。
+        """
+        return scan_source_files(self.directory, [self.file_extension])[self.file_extension]
+
+    def extract_files(self, source_files, workers: Optional[int] = 1):
+        """
+        解析一组文件，按输入顺序返回单文件提取结果。
+
+        workers 大于 1 时，文件解析会分发到进程池中并行执行，结果仍然按输入顺序返回。
+
+        Args:
+            source_files (list): (file_path, relative_path) 元组的列表。
+            workers (int, optional): 并行解析的进程数。默认为 1，即串行执行；为 None 时使用全部 CPU 核心。
+
+        Returns:
+            list: 单文件提取结果的列表，不包括列出之后被删除的文件。
+        """
+        tasks = [(type(self), self.directory, file_path, relative_path) for file_path, relative_path in source_files]
+        return [result for result in extract_files(tasks, workers) if result is not None]
+
+    def merge_results(self, results, lazy: bool = False):
+        """
+        按文件顺序合并单文件提取结果，并通过符号表统一解析被调用函数。
+
+        Args:
+            results (list): 单文件提取结果的列表。
+            lazy (bool, optional): 为 True 时 calls 为 ResolvedCalls，迭代时才逐个文件解析，不在内存中生成调用列表。
+                默认为 False。
+
+        Returns:
+            tuple: (functions, calls)。
+        """
+        functions = {}
+        for result in results:
+            functions.update(result["functions"])
+        calls = ResolvedCalls(self, results)
+        return functions, calls if lazy else list(calls)
+
+    def extract_call_functions(self, workers: Optional[int] = 1, cache=None, lazy: bool = False):
+        """
+        分析目录下该语言的所有源文件，返回函数定义和调用关系。
+
+        每个文件只解析、遍历一次，所有文件处理完成后再统一解析被调用函数。
+        workers 大于 1 时，文件解析会分发到进程池中并行执行；各文件的结果按文件顺序合并，
+        因此输出与串行模式完全一致。
+        传入 cache 时，未变化的文件直接复用缓存的提取结果，只重新解析变化的文件。
+
+        Args:
+            workers (int, optional): 并行解析的进程数。默认为 1，即串行执行；为 None 时使用全部 CPU 核心。
+            cache (ExtractCache, optional): 单文件提取结果的持久化缓存。
+            lazy (bool, optional): 为 True 时 calls 为按文件逐个解析的 ResolvedCalls，见 merge_results。默认为 False。
+
+        Returns:
+            tuple: (functions, calls)。
+        """
+        source_files = self.list_source_files()
+        results = extract_source_files([(self, source_files, cache)], workers)[0]
+        return self.merge_results(results, lazy)
+
+
+class ResolvedCalls:
+    def __init__(self, extract, results, symbols=None) -> None:
+        """
+        按文件顺序解析的调用关系，可以多次迭代。
+
+        每次迭代都用符号表重新解析各文件的原始调用（只是字典查找，比解析语法树快得多），解析出的调用逐个产生，
+        不在内存中保留完整的调用列表，可以直接交给调用图构建、边文件导出等只需要顺序读取的使用方。
+        迭代的结果与 resolve_calls 返回的列表相同。
+
+        Args:
+            extract (BaseExtract): 提取器。
+            results (list): 单文件提取结果的列表。
+            symbols (SymbolTable, optional): 符号表。为 None 时根据 results 建立。
+        """
+        self.extract = extract
+        self.results = results
+        self.symbols = symbols if symbols is not None else extract.build_symbol_table(results)
+
+    def __iter__(self):
+        for result in self.results:
+            yield from self.extract.resolve_file_calls(result, self.symbols)
+
+
+def scan_source_files(directory, extensions):
+    """
+    按扩展名从仓库的文件清单中收集源文件。
+
+    文件清单由 manifest.get_manifest 生成并按仓库版本缓存，已经跳过了 .gitignore 忽略的文件、
+    第三方依赖目录和过大的文件。不切换工作目录，可以在多个线程中同时分析不同的仓库。
+
+    Args:
+        directory (str): 仓库目录。
+        extensions (list): 需要收集的扩展名，例如 ['.py', '.go']。
+
+    Returns:
+        dict: 扩展名到 (file_path, relative_path) 元组列表的映射，file_path 为绝对路径，
+        relative_path 为记录在函数信息中的相对路径。
+    """
+    source_files = {extension: [] for extension in extensions}
+    for entry in get_manifest(directory):
+        files_of_extension = source_files.get(entry.extension)
+        if files_of_extension is not None:
+            files_of_extension.append((entry.abs_path, entry.path))
+    return source_files
+
+
+def extract_files(tasks, workers: Optional[int] = 1):
+    """
+    执行一组单文件提取任务，按输入顺序返回结果。
+
+    任务可以来自不同语言的提取器；workers 大于 1 时，所有任务共享同一个进程池并行执行。
+
+    Args:
+        tasks (list): (提取器类, 目录, 文件路径, 相对路径) 元组的列表。
+        workers (int, optional): 并行解析的进程数。默认为 1，即串行执行；为 None 时使用全部 CPU 核心。
+
+    Returns:
+        list: 单文件提取结果的列表，列出之后被删除的文件对应的结果为 None。
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_extract_file_worker, tasks, chunksize=chunksize))
+    return [_extract_file_worker(task) for task in tasks]
+
+
+def extract_source_files(jobs, workers: Optional[int] = 1):
+    """
+    提取多组源文件，未变化的文件直接复用缓存，其余文件一起解析。
+
+    Args:
+        jobs (list): (提取器, source_files, cache) 元组的列表，cache 可以为 None。
+        workers (int, optional): 并行解析的进程数。默认为 1，即串行执行；为 None 时使用全部 CPU 核心。
+
+    Returns:
+        list: 与 jobs 一一对应的单文件提取结果列表，每个列表按 source_files 的顺序排列，
+        列出之后被删除的文件会被跳过。
+    """
+    results = []
+    pending = []
+    for job_index, (extract, source_files, cache) in enumerate(jobs):
+        job_results = [None] * len(source_files)
+        for index, (file_path, relative_path) in enumerate(source_files):
+            if cache is not None:
+                try:
+                    job_results[index] = cache.get(file_path, relative_path)
+                except FileNotFoundError:
+                    # 文件已被删除，交给提取任务跳过
+                    pass
+            if job_results[index] is None:
+                pending.append((job_index, index))
+        results.append(job_results)
+
+    tasks = []
+    for job_index, index in pending:
+        extract, source_files, cache = jobs[job_index]
+        tasks.append((type(extract), extract.directory, *source_files[index]))
+    for (job_index, index), result in zip(pending, extract_files(tasks, workers)):
+        extract, source_files, cache = jobs[job_index]
+        results[job_index][index] = result
+        if cache is not None and result is not None:
+            cache.put(source_files[index][1], result)
+    for extract, source_files, cache in jobs:
+        if cache is not None:
+            cache.save()
+    return [[result for result in job_results if result is not None] for job_results in results]
+
+
+def _extract_file_worker(task):
+    """
+    进程池中执行的单文件提取任务。
+
+    Args:
+        task (tuple): (提取器类, 目录, 文件路径, 相对路径)。
+
+    Returns:
+        dict: 单文件提取结果，文件已被删除时返回 None。
+    """
+    extract_class, directory, file_path, relative_path = task
+    try:
+        return extract_class(directory).extract_file(file_path, relative_path)
+    except FileNotFoundError:
+        return None
+
 
 class python_extract(BaseExtract):
+    file_extension = ".py"
+    module_separator = "."
+    node_handlers = {
+        "import_statement": "handle_import",
+        "import_from_statement": "handle_import_from",
+        "class_definition": "handle_class",
+        "function_definition": "handle_function",
+        "call": "handle_call",
+    }
+
     def __init__(self, directory):
         super().__init__(directory, "python")
 
@@ -51,10 +539,6 @@ class python_extract(BaseExtract):
         """
         从抽象语法树的根节点提取函数信息。
 
-        此函数遍历抽象语法树的节点。当遇到类定义或函数定义时，提取相关信息并存储。
-        对于每个类定义，记录当前类的名称。对于每个函数定义，记录函数的信息，
-        包括其在文件中的起始和结束字节位置、所属的类（如果有）以及函数所在的文件路径。
-
         Args:
             root_node (Node): 语法树的根节点。
             file_path (str): 当前分析的文件路径。
@@ -62,54 +546,13 @@ class python_extract(BaseExtract):
         Returns:
             dict: 包含所有函数信息的字典。键为函数标识符，值为函数的详细信息。
         """
-        functions = {}
-        current_class = None
-        current_function = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取类和函数的定义信息。
-
-            这是一个递归函数，用于检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会提取函数的信息并更新当前函数。
-
-            Args:
-                node (Node): 当前遍历到的节点。
-            """
-            nonlocal current_class, current_function
-            if node.type == "class_definition":
-                class_name = node.child_by_field_name("name")
-                if class_name:
-                    current_class = class_name.text.decode("utf-8")
-                else:
-                    current_class = None
-            elif node.type == "function_definition":
-                function_name = node.child_by_field_name("name")
-                if function_name:
-                    # 确保在构建functions字典时，所有的键都是字符串类型
-                    function_id = f"{current_class}.{function_name.text.decode('utf-8')}" if current_class else function_name.text.decode("utf-8")
-                    functions[function_id] = {
-                        # 'start_byte': node.start_byte,
-                        # 'end_byte': node.end_byte,
-                        "class": current_class,
-                        "file_path": file_path,
-                    }
-                    current_function = function_id
-                else:
-                    current_function = None
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
-
-        traverse(root_node)
-        return functions
+        return self.extract_definitions_and_calls(root_node, file_path)[0]
 
     def extract_calls(self, root_node, functions):
         """
-        遍历语法树的节点，提取函数调用关系。
+        遍历语法树的节点，提取被调用函数已在 functions 中定义的调用关系。
 
-        此函数对每个函数调用进行分析，记录调用者和被调用者的信息，并将其存储在 calls 列表中。
-        在这个过程中，如果当前存在类上下文，会用于确定被调用函数的完整名称。
+        只使用本文件的导入和定义解析被调用函数。
 
         Args:
             root_node (Node): 语法树的根节点。
@@ -118,89 +561,300 @@ class python_extract(BaseExtract):
         Returns:
             list: 包含所有函数调用关系的列表。
         """
-        calls = []
-        current_class = None
-        current_function = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取函数调用信息。
-
-            这是一个递归函数，它会检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会更新当前函数；
-            如果节点是函数调用，它会提取调用信息并存储在calls列表中。
-
-            :param node: 当前遍历到的节点
-            """
-            nonlocal current_class, current_function
-            if node.type == "class_definition":
-                class_name = node.child_by_field_name("name")
-                if class_name:
-                    current_class = class_name.text.decode("utf-8")
-            elif node.type == "function_definition":
-                function_name = node.child_by_field_name("name")
-                if function_name:
-                    function_id = f"{current_class}.{function_name.text.decode('utf-8')}" if current_class else function_name.text.decode("utf-8")
-                    current_function = function_id
-            elif node.type == "call":
-                function_called = node.child_by_field_name("function")
-                if function_called:
-                    function_called_text = function_called.text.decode("utf-8")
-                    callee_function_name = function_called_text  # 默认为全局函数名
-                    # 如果函数调用包含点号，说明它可能是一个类的方法或者模块中的函数
-                    if "." in function_called_text and current_class:
-                        callee_class, callee_function = function_called_text.rsplit(".", 1)
-                        callee_function_name = f"{callee_class}.{callee_function}"
-                        if callee_class == "self":
-                            callee_function_name = f"{current_class}.{callee_function}"
-                    elif current_class:
-                        # 如果当前有类上下文，假设它是这个类的方法
-                        callee_function_name = f"{current_class}.{function_called_text}"
-
-                    # 确保当前函数（调用者）和被调用的函数（callee_function_name）不同
-                    # print(f'current_function:{current_function},callee_function_name:{callee_function_name}')
-                    if current_function and current_function != callee_function_name and callee_function_name in functions:
-                        calls.append(
-                            {
-                                "caller": current_function,
-                                "callee": callee_function_name,
-                            }
-                        )
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
+        context = self.extract_context(root_node, "")
+        result = {
+            "file_path": "",
+            "functions": context.functions,
+            "calls": context.calls,
+            "imports": context.imports,
+            "wildcard_imports": context.wildcard_imports,
+            "bases": context.bases,
+            "enclosing": context.enclosing,
+        }
+        return [call for call in self.resolve_calls([result]) if call["callee"] in functions]
+
+    def create_context(self, file_path):
+        context = super().create_context(file_path)
+        # 包含当前节点的类和函数定义组成的栈，元素为 (结束位置, 所属的类, 函数标识符)
+        context.scopes = []
+        return context
+
+    def module_name(self, relative_path):
+        """
+        返回文件的点分模块名，例如 'pkg/sub/mod.py' 为 'pkg.sub.mod'，包的 '__init__.py' 为包名。
 
-        traverse(root_node)
-        return calls
+        目录本身是一个包（包含 __init__.py）时，模块名以目录名开头，与包外代码导入时使用的名称一致。
+        """
+        parts = os.path.splitext(relative_path)[0].split(os.sep)
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if self.root_package:
+            parts = [self.root_package] + parts
+        return ".".join(part for part in parts if part)
+
+    @property
+    def root_package(self):
+        if not hasattr(self, "_root_package"):
+            directory = os.path.abspath(self.directory)
+            self._root_package = os.path.basename(directory) if os.path.isfile(os.path.join(directory, "__init__.py")) else ""
+        return self._root_package
+
+    def _scope(self, node, context):
+        """
+        弹出已经结束的作用域，返回包含 node 的最内层作用域 (结束位置, 所属的类, 函数标识符)。
 
-    def python_extract_call_functions(self):
-        directory = self.directory
-        functions = {}
-        calls = []
-        original_directory = os.getcwd()  # 保存原始工作目录
-        os.chdir(directory)  # 切换到目标仓库的根目录
-        try:
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".py"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        file_path = file_path.replace("./", "")
-                        f = self.extract_functions(root_node, file_path)
-                        functions.update(f)
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".py"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        c = self.extract_calls(root_node, functions)
-                        calls.extend(c)
-        finally:
-            os.chdir(original_directory)  # 恢复原始工作目录
-        return functions, calls
+        查询得到的节点按先序排列，结束位置不超过 node 起始位置的作用域一定不包含 node 及其后的节点。
+        """
+        scopes = context.scopes
+        while scopes and scopes[-1][0] <= node.start_byte:
+            scopes.pop()
+        return scopes[-1] if scopes else (None, None, None)
+
+    def _absolute_module(self, module_node, context):
+        """
+        返回 from 导入语句中的模块名，相对导入按当前文件所在的包转换为绝对模块名。
+        """
+        if module_node.type != "relative_import":
+            return module_node.text.decode("utf-8")
+        level = 0
+        relative_name = ""
+        for child in module_node.children:
+            if child.type == "import_prefix":
+                level = len(child.text)
+            elif child.type == "dotted_name":
+                relative_name = child.text.decode("utf-8")
+        package = self.module_name(context.file_path).split(".")
+        if os.path.splitext(os.path.basename(context.file_path))[0] != "__init__":
+            package = package[:-1]
+        if level > 1:
+            package = package[: len(package) - (level - 1)]
+        return ".".join(part for part in package + [relative_name] if part)
+
+    def handle_import(self, node, context):
+        """
+        遇到 `import 模块` 或 `import 模块 as 别名` 时，记录导入的模块。
+        """
+        for name_node in node.children_by_field_name("name"):
+            if name_node.type == "aliased_import":
+                module = name_node.child_by_field_name("name").text.decode("utf-8")
+                alias = name_node.child_by_field_name("alias").text.decode("utf-8")
+                context.imports[alias] = [module, None]
+            else:
+                # `import a.b` 绑定的名称是顶层包 a
+                package = name_node.text.decode("utf-8").split(".")[0]
+                context.imports[package] = [package, None]
+
+    def handle_import_from(self, node, context):
+        """
+        遇到 `from 模块 import 名称` 时，记录每个导入的名称来自哪个模块。
+        """
+        module_node = node.child_by_field_name("module_name")
+        if module_node is None:
+            return
+        module = self._absolute_module(module_node, context)
+        for child in node.children:
+            if child.type == "wildcard_import":
+                context.wildcard_imports.append(module)
+        for name_node in node.children_by_field_name("name"):
+            if name_node.type == "aliased_import":
+                name = name_node.child_by_field_name("name").text.decode("utf-8")
+                alias = name_node.child_by_field_name("alias").text.decode("utf-8")
+            else:
+                name = alias = name_node.text.decode("utf-8")
+            context.imports[alias] = [module, name]
+
+    def handle_class(self, node, context):
+        """
+        遇到类定义时，记录当前类的名称和基类。
+        """
+        # 弹出已经结束的作用域，使嵌套的类入栈到正确的位置
+        self._scope(node, context)
+        class_name = node.child_by_field_name("name")
+        if class_name:
+            context.current_class = class_name.text.decode("utf-8")
+            superclasses = node.child_by_field_name("superclasses")
+            context.bases[context.current_class] = [
+                child.text.decode("utf-8") for child in (superclasses.named_children if superclasses else []) if child.type in ("identifier", "attribute")
+            ]
+        else:
+            context.current_class = None
+        context.scopes.append((node.end_byte, context.current_class, None))
+
+    def handle_function(self, node, context):
+        """
+        遇到函数定义时，记录函数的信息（所属的类和所在的文件路径），并将其作为当前函数。
+
+        所属的类是语法上包含该函数的最内层类，类定义结束之后的模块级函数不属于任何类。
+        定义在其他函数中的嵌套函数记录到 enclosing 中。
+        """
+        _, current_class, enclosing_function = self._scope(node, context)
+        function_name = node.child_by_field_name("name")
+        if function_name:
+            # 确保在构建functions字典时，所有的键都是字符串类型
+            function_id = f"{current_class}.{function_name.text.decode('utf-8')}" if current_class else function_name.text.decode("utf-8")
+            context.functions[function_id] = {
+                "class": current_class,
+                "file_path": context.file_path,
+            }
+            if enclosing_function:
+                context.enclosing.setdefault(function_id, []).append(enclosing_function)
+            context.current_function = function_id
+            context.scopes.append((node.end_byte, current_class, function_id))
+
+    def handle_call(self, node, context):
+        """
+        遇到函数调用时，记录调用所在的函数、类以及被调用的对象和名称，由 resolve_call 结合符号表解析。
+
+        模块级和类定义体中的调用不属于任何函数，不会被记录。
+        """
+        _, current_class, current_function = self._scope(node, context)
+        function_called = node.child_by_field_name("function")
+        if not current_function or not function_called:
+            return
+        if function_called.type == "identifier":
+            receiver = None
+            name = function_called.text.decode("utf-8")
+        elif function_called.type == "attribute":
+            receiver = function_called.child_by_field_name("object").text.decode("utf-8")
+            name = function_called.child_by_field_name("attribute").text.decode("utf-8")
+        else:
+            return
+        context.calls.append(
+            {
+                "caller": current_function,
+                "line": node.start_point[0] + 1,
+                "class": current_class,
+                "receiver": receiver,
+                "name": name,
+            }
+        )
+
+    def _lookup_in_module(self, symbols, module, name, visited=None):
+        """
+        在模块中查找函数或类（调用类时解析为它的 __init__ 方法）。
+
+        模块中没有定义该名称时，继续查找模块通过 `from 模块 import 名称` 或 `import *` 重新导出的名称，
+        例如包的 __init__.py 导出子模块中的函数。结果缓存在符号表中。
+        """
+        module = symbols.resolve_module(module)
+        if module is None:
+            return None
+        # 只缓存最外层的查找，内层查找的结果受 visited 影响
+        key = ("python", module, name)
+        if visited is None and key in symbols.memo:
+            return symbols.memo[key]
+        callee = symbols.lookup(module, None, name)
+        if callee is None and symbols.has_class(module, name):
+            callee = symbols.lookup_method(name, "__init__", module)
+        top_level = visited is None
+        if callee is None:
+            visited = visited if visited is not None else set()
+            visited.add((module, name))
+            for imports, wildcard_imports in symbols.module_imports(module):
+                targets = [imports[name]] if name in imports and imports[name][1] is not None else []
+                targets += [[wildcard_module, name] for wildcard_module in wildcard_imports]
+                for imported_module, imported_name in targets:
+                    resolved = symbols.resolve_module(imported_module)
+                    if resolved is not None and (resolved, imported_name) not in visited:
+                        callee = self._lookup_in_module(symbols, resolved, imported_name, visited)
+                        if callee is not None:
+                            break
+                if callee is not None:
+                    break
+        if top_level:
+            symbols.memo[key] = callee
+        return callee
+
+    def _lookup_local(self, call, result):
+        """
+        在调用者以及包含它的外层函数中查找嵌套定义的函数，对应 Python 先查找局部和外层函数作用域、再查找模块的规则。
+        """
+        enclosing = result.get("enclosing", {})
+        # 嵌套函数的标识符与同一个类中的方法相同，由所属的类和名称组成
+        function_id = f"{call['class']}.{call['name']}" if call["class"] else call["name"]
+        parents = enclosing.get(function_id)
+        if not parents:
+            return None
+        scopes = [call["caller"]]
+        visited = set()
+        while scopes:
+            scope = scopes.pop()
+            if scope in parents:
+                return function_id
+            if scope not in visited:
+                visited.add(scope)
+                scopes.extend(enclosing.get(scope, []))
+        return None
+
+    def _lookup_attribute(self, symbols, path, name):
+        """
+        解析 `路径.名称` 形式的调用，路径可以是模块，也可以是模块中的类。
+        """
+        callee = self._lookup_in_module(symbols, path, name)
+        if callee is None and "." in path:
+            module, class_name = path.rsplit(".", 1)
+            module = symbols.resolve_module(module)
+            if module is not None and symbols.has_class(module, class_name):
+                callee = symbols.lookup_method(class_name, name, module)
+        return callee
+
+    def resolve_call(self, call, module, result, symbols):
+        """
+        按 Python 的作用域规则解析被调用函数：
+
+        - `名称()`：调用者及其外层函数中定义的嵌套函数，然后是本模块的函数或类，
+          然后是 `from 模块 import 名称` 导入的名称，最后是 `import *` 导入的模块；
+        - `self.名称()`、`cls.名称()`：当前类及其基类的方法，`super().名称()` 只查找基类；
+        - `类.名称()`：本模块中的类，或者导入的模块、模块中的类。
+
+        通过类型未知的变量调用的方法无法确定，不会被记录为调用边。
+        """
+        name = call["name"]
+        receiver = call["receiver"]
+        current_class = call["class"]
+        imports = result.get("imports", {})
+        callee = None
+        if receiver is None:
+            callee = self._lookup_local(call, result)
+            if callee is None:
+                callee = self._lookup_in_module(symbols, module, name)
+            if callee is None and name in imports:
+                imported_module, imported_name = imports[name]
+                if imported_name is not None:
+                    callee = self._lookup_in_module(symbols, imported_module, imported_name)
+            for wildcard_module in result.get("wildcard_imports", []):
+                if callee is not None:
+                    break
+                callee = self._lookup_in_module(symbols, wildcard_module, name)
+        elif receiver in ("self", "cls"):
+            callee = symbols.lookup_method(current_class, name, module)
+        elif receiver == "super()":
+            callee = symbols.lookup_method(current_class, name, module, skip_self=True)
+        else:
+            head, _, rest = receiver.partition(".")
+            if not rest and symbols.has_class(module, head):
+                callee = symbols.lookup_method(head, name, module)
+            elif head in imports:
+                path = ".".join(part for part in imports[head] + [rest] if part)
+                callee = self._lookup_attribute(symbols, path, name)
+        # 确保当前函数（调用者）和被调用的函数不同
+        if callee == call["caller"]:
+            return None
+        return callee
+
+    def python_extract_call_functions(self, workers: Optional[int] = 1, cache=None):
+        return self.extract_call_functions(workers, cache)
 
 
 class java_extract(BaseExtract):
+    file_extension = ".java"
+    node_handlers = {
+        "class_declaration": "handle_class",
+        "method_declaration": "handle_method",
+        "assignment_expression": "handle_assignment",
+        "method_invocation": "handle_invocation",
+    }
+
     def __init__(self, directory):
         super().__init__(directory, "java")
 
@@ -211,10 +865,6 @@ class java_extract(BaseExtract):
         """
         从抽象语法树的根节点提取函数信息。
 
-        此函数遍历抽象语法树的节点。当遇到类定义或函数定义时，提取相关信息并存储。
-        对于每个类定义，记录当前类的名称。对于每个函数定义，记录函数的信息，
-        包括其在文件中的起始和结束字节位置、所属的类（如果有）以及函数所在的文件路径。
-
         Args:
             root_node (Node): 语法树的根节点。
             file_path (str): 当前分析的文件路径。
@@ -222,164 +872,121 @@ class java_extract(BaseExtract):
         Returns:
             dict: 包含所有函数信息的字典。键为函数标识符，值为函数的详细信息。
         """
-        functions = {}
-        current_class = None
-        current_function = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取类和函数的定义信息。
-
-            这是一个递归函数，用于检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会提取函数的信息并更新当前函数。
-
-            Args:
-                node (Node): 当前遍历到的节点。
-            """
-            nonlocal current_class, current_function
-            if node.type == "class_declaration":
-                class_name = node.child_by_field_name("name")
-                if class_name:
-                    current_class = class_name.text.decode("utf-8")
-                else:
-                    current_class = None
-            elif node.type == "method_declaration":
-                function_name = node.child_by_field_name("name")
-                if function_name:
-                    # 确保在构建functions字典时，所有的键都是字符串类型
-                    function_id = f"{current_class}.{function_name.text.decode('utf-8')}" if current_class else function_name.text.decode("utf-8")
-                    functions[function_id] = {
-                        # 'start_byte': node.start_byte,
-                        # 'end_byte': node.end_byte,
-                        "class": current_class,
-                        "file_path": file_path,
-                    }
-                    current_function = function_id
-                else:
-                    current_function = None
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
-
-        traverse(root_node)
-        return functions
+        return self.extract_definitions_and_calls(root_node, file_path)[0]
 
     def extract_calls(self, root_node):
         """
         遍历语法树的节点，提取函数调用关系。
 
-        此函数对每个函数调用进行分析，记录调用者和被调用者的信息，并将其存储在 calls 列表中。
-        在这个过程中，如果当前存在类上下文，会用于确定被调用函数的完整名称。
-
         Args:
             root_node (Node): 语法树的根节点。
-            functions (dict): 包含所有函数信息的字典。
 
         Returns:
             list: 包含所有函数调用关系的列表。
         """
-        calls = []
-        current_class = None
-        current_function = None
-        variable_types = {}
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取函数调用信息。
-
-            这是一个递归函数，它会检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会更新当前函数；
-            如果节点是函数调用，它会提取调用信息并存储在calls列表中。
-
-            :param node: 当前遍历到的节点
-            """
-            nonlocal current_class, current_function
-            stet = node.text.decode("utf-8")
-            # print(f'node.type:{node.type},\nname:{stet}')
-            if node.type == "class_declaration":
-                class_name = node.child_by_field_name("name")
-                if class_name:
-                    current_class = class_name.text.decode("utf-8")
-            elif node.type == "method_declaration":
-                function_name = node.child_by_field_name("name")
-                if function_name:
-                    function_id = f"{current_class}.{function_name.text.decode('utf-8')}" if current_class else function_name.text.decode("utf-8")
-                    current_function = function_id
-            elif node.type == "assignment_expression":
-                # 左侧是变量名，右侧是对象创建表达式
-                variable_name_node = node.child_by_field_name("left")
-                object_creation_node = node.child_by_field_name("right")
-                if variable_name_node and object_creation_node and object_creation_node.type == "object_creation_expression":
-                    variable_name = variable_name_node.text.decode("utf-8")
-                    type_identifier_node = object_creation_node.child_by_field_name("type")
-                    if type_identifier_node:
-                        variable_type = type_identifier_node.text.decode("utf-8")
-                        variable_types[variable_name] = variable_type
-            elif node.type == "method_invocation":
-                # 在Java中，方法调用可能是通过对象实例调用的，也可能是通过类名直接调用的静态方法
-                # 因此，我们需要检查是否存在一个对象或类名前缀
-                method_name = None
-                caller_name = None
-                for child in node.children:
-                    if child.type == "identifier":
-                        if method_name is None:
-                            method_name = child.text.decode("utf-8")
-                        else:
-                            caller_name = method_name
-                            method_name = child.text.decode("utf-8")
-                    elif child.type == "field_access":
-                        caller_name = "".join([n.text.decode("utf-8") for n in child.children if n.type == "identifier"])
-                caller_node = node.child_by_field_name("object") or node.child_by_field_name("receiver")
-                if caller_node:
-                    caller_name = caller_node.text.decode("utf-8")
-                    if caller_name in variable_types:
-                        caller_name = variable_types[caller_name]
-                    method_name = node.child_by_field_name("name").text.decode("utf-8")
-                    callee_function_name = f"{caller_name}.{method_name}"
-                    if current_function and current_function != callee_function_name:
-                        calls.append(
-                            {
-                                "caller": current_function,
-                                "callee": callee_function_name,
-                            }
-                        )
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
-
-        traverse(root_node)
-        return calls
+        return self.extract_definitions_and_calls(root_node, None)[1]
 
-    def java_extract_call_functions(self):
-        directory = self.directory
-        functions = {}
-        calls = []
-        original_directory = os.getcwd()  # 保存原始工作目录
-        os.chdir(directory)  # 切换到目标仓库的根目录
-        try:
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".java"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        file_path = file_path.replace("./", "")
-                        f = self.extract_functions(root_node, file_path)
-                        functions.update(f)
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".java"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        c = self.extract_calls(root_node)
-                        calls.extend(c)
-        finally:
-            os.chdir(original_directory)  # 恢复原始工作目录
-        filtered_calls = [call for call in calls if call["caller"] in functions and call["callee"] in functions]
-        calls = filtered_calls
-        return functions, calls
+    def handle_class(self, node, context):
+        """
+        遇到类声明时，记录当前类的名称和父类。
+        """
+        class_name = node.child_by_field_name("name")
+        if class_name:
+            context.current_class = class_name.text.decode("utf-8")
+            superclass = node.child_by_field_name("superclass")
+            bases = []
+            if superclass and superclass.named_child_count:
+                # 去掉泛型参数，例如 `extends Base<T>` 的父类为 Base
+                bases.append(superclass.named_child(0).text.decode("utf-8").split("<", 1)[0])
+            context.bases[context.current_class] = bases
+        else:
+            context.current_class = None
+
+    def handle_method(self, node, context):
+        """
+        遇到方法声明时，记录方法信息并将其作为当前函数。
+        """
+        function_name = node.child_by_field_name("name")
+        if function_name:
+            current_class = context.current_class
+            # 确保在构建functions字典时，所有的键都是字符串类型
+            function_id = f"{current_class}.{function_name.text.decode('utf-8')}" if current_class else function_name.text.decode("utf-8")
+            context.functions[function_id] = {
+                "class": current_class,
+                "file_path": context.file_path,
+            }
+            context.current_function = function_id
+
+    def handle_assignment(self, node, context):
+        """
+        遇到 `变量 = new 类型()` 形式的赋值时，记录变量的类型。
+        """
+        # 左侧是变量名，右侧是对象创建表达式
+        variable_name_node = node.child_by_field_name("left")
+        object_creation_node = node.child_by_field_name("right")
+        if variable_name_node and object_creation_node and object_creation_node.type == "object_creation_expression":
+            variable_name = variable_name_node.text.decode("utf-8")
+            type_identifier_node = object_creation_node.child_by_field_name("type")
+            if type_identifier_node:
+                variable_type = type_identifier_node.text.decode("utf-8")
+                context.variable_types[variable_name] = variable_type
+
+    def handle_invocation(self, node, context):
+        """
+        遇到方法调用时，结合变量类型确定被调用方法所属的类，由 resolve_call 在类及其父类中查找。
+        """
+        # 在Java中，方法调用可能是通过对象实例调用的，也可能是通过类名直接调用的静态方法
+        # 因此，我们需要检查是否存在一个对象或类名前缀；没有前缀时调用的是当前类的方法
+        caller_node = node.child_by_field_name("object") or node.child_by_field_name("receiver")
+        caller_name = None
+        if caller_node:
+            caller_name = caller_node.text.decode("utf-8")
+            if caller_name in context.variable_types:
+                caller_name = context.variable_types[caller_name]
+        method_name = node.child_by_field_name("name").text.decode("utf-8")
+        current_function = context.current_function
+        if current_function:
+            context.calls.append(
+                {
+                    "caller": current_function,
+                    "line": node.start_point[0] + 1,
+                    "callee": f"{caller_name or context.current_class}.{method_name}",
+                    "class": context.current_class,
+                    "receiver": caller_name,
+                    "name": method_name,
+                }
+            )
+
+    def resolve_call(self, call, module, result, symbols):
+        """
+        在接收者的类及其父类中查找被调用的方法：没有接收者或接收者为 this 时为当前类，super 只查找父类。
+        """
+        if call["caller"] not in symbols:
+            return None
+        receiver = call["receiver"]
+        if receiver is None or receiver == "this":
+            callee = symbols.lookup_method(call["class"], call["name"], module)
+        elif receiver == "super":
+            callee = symbols.lookup_method(call["class"], call["name"], module, skip_self=True)
+        else:
+            callee = symbols.lookup_method(receiver.split("<", 1)[0], call["name"])
+        # 确保当前函数（调用者）和被调用的函数不同
+        if callee == call["caller"]:
+            return None
+        return callee
+
+    def java_extract_call_functions(self, workers: Optional[int] = 1, cache=None):
+        return self.extract_call_functions(workers, cache)
 
 
 class go_extract(BaseExtract):
+    file_extension = ".go"
+    node_handlers = {
+        "import_spec": "handle_import",
+        "function_declaration": "handle_function",
+        "call_expression": "handle_call",
+    }
+
     def __init__(self, directory):
         super().__init__(directory, "go")
 
@@ -390,10 +997,6 @@ class go_extract(BaseExtract):
         """
         从抽象语法树的根节点提取函数信息。
 
-        此函数遍历抽象语法树的节点。当遇到类定义或函数定义时，提取相关信息并存储。
-        对于每个类定义，记录当前类的名称。对于每个函数定义，记录函数的信息，
-        包括其在文件中的起始和结束字节位置、所属的类（如果有）以及函数所在的文件路径。
-
         Args:
             root_node (Node): 语法树的根节点。
             file_path (str): 当前分析的文件路径。
@@ -401,130 +1004,115 @@ class go_extract(BaseExtract):
         Returns:
             dict: 包含所有函数信息的字典。键为函数标识符，值为函数的详细信息。
         """
-        functions = {}
-        current_class = None
-        current_function = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取类和函数的定义信息。
-
-            这是一个递归函数，用于检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会提取函数的信息并更新当前函数。
-
-            Args:
-                node (Node): 当前遍历到的节点。
-            """
-            nonlocal current_class, current_function
-
-            if node.type == "function_declaration":
-                function_name = node.child_by_field_name("name")
-                if function_name:
-                    # 确保在构建functions字典时，所有的键都是字符串类型
-                    function_id = function_name.text.decode("utf-8")
-                    functions[function_id] = {
-                        # 'start_byte': node.start_byte,
-                        # 'end_byte': node.end_byte,
-                        "file_path": file_path
-                    }
-                    current_function = function_id
-                else:
-                    current_function = None
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
-
-        traverse(root_node)
-        return functions
+        return self.extract_definitions_and_calls(root_node, file_path)[0]
 
     def extract_calls(self, root_node):
         """
         遍历语法树的节点，提取函数调用关系。
 
-        此函数对每个函数调用进行分析，记录调用者和被调用者的信息，并将其存储在 calls 列表中。
-        在这个过程中，如果当前存在类上下文，会用于确定被调用函数的完整名称。
-
         Args:
             root_node (Node): 语法树的根节点。
-            functions (dict): 包含所有函数信息的字典。
 
         Returns:
             list: 包含所有函数调用关系的列表。
         """
-        calls = []
-        current_function = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取函数调用信息。
-
-            这是一个递归函数，它会检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会更新当前函数；
-            如果节点是函数调用，它会提取调用信息并存储在calls列表中。
-
-            :param node: 当前遍历到的节点
-            """
-            # stet = node.text.decode('utf-8')
-            # print(f'node.type:{node.type},\nname:{stet}')
-            nonlocal current_function
-            if node.type == "function_declaration":
-                function_name_node = node.child_by_field_name("name")
-                if function_name_node:
-                    current_function = function_name_node.text.decode("utf-8")
-                    # print(f'current_function:{current_function}')
-            elif node.type == "call_expression":
-                function_called_node = node.child_by_field_name("function")
-                # print(f'function_called_node:{function_called_node}')
-                if function_called_node:
-                    function_called = function_called_node.text.decode("utf-8")
-
-                    # print(f'function_called:{function_called},current_function:{current_function}')
-
-                    if current_function and current_function != function_called:
-                        calls.append(
-                            {
-                                "caller": current_function,
-                                "callee": function_called,
-                            }
-                        )
-
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
+        return self.extract_definitions_and_calls(root_node, None)[1]
 
-        traverse(root_node)
-        return calls
+    def handle_function(self, node, context):
+        """
+        遇到函数声明时，记录函数信息并将其作为当前函数。
+        """
+        function_name = node.child_by_field_name("name")
+        if function_name:
+            # 确保在构建functions字典时，所有的键都是字符串类型
+            function_id = function_name.text.decode("utf-8")
+            context.functions[function_id] = {
+                "file_path": context.file_path
+            }
+            context.current_function = function_id
+
+    def module_name(self, relative_path):
+        """
+        Go 以目录作为包，同一目录下的文件属于同一个模块，例如 'pkg/sub/a.go' 为 'pkg/sub'。
+        """
+        return os.path.dirname(relative_path).replace(os.sep, "/")
 
-    def go_extract_call_functions(self):
-        directory = self.directory
-        functions = {}
-        calls = []
-        original_directory = os.getcwd()  # 保存原始工作目录
-        os.chdir(directory)  # 切换到目标仓库的根目录
-        try:
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".go"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        file_path = file_path.replace("./", "")
-                        f = self.extract_functions(root_node, file_path)
-                        functions.update(f)
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".go"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        c = self.extract_calls(root_node)
-                        calls.extend(c)
-        finally:
-            os.chdir(original_directory)  # 恢复原始工作目录
-        filtered_calls = [call for call in calls if call["caller"] in functions and call["callee"] in functions]
-        calls = filtered_calls
-        return functions, calls
+    def handle_import(self, node, context):
+        """
+        遇到导入声明时，记录包名（或别名）对应的导入路径。
+        """
+        path_node = node.child_by_field_name("path")
+        if not path_node:
+            return
+        path = path_node.text.decode("utf-8").strip('"`')
+        name_node = node.child_by_field_name("name")
+        name = name_node.text.decode("utf-8") if name_node else path.rsplit("/", 1)[-1]
+        if name == ".":
+            context.wildcard_imports.append(path)
+        elif name != "_":
+            context.imports[name] = [path, None]
+
+    def handle_call(self, node, context):
+        """
+        遇到调用表达式时，记录当前函数对被调用函数的调用，`包名.函数()` 形式的调用同时记录包名。
+        """
+        function_called_node = node.child_by_field_name("function")
+        if function_called_node:
+            function_called = function_called_node.text.decode("utf-8")
+            receiver = None
+            name = function_called
+            if function_called_node.type == "selector_expression":
+                receiver = function_called_node.child_by_field_name("operand").text.decode("utf-8")
+                name = function_called_node.child_by_field_name("field").text.decode("utf-8")
+            current_function = context.current_function
+            if current_function and current_function != function_called:
+                context.calls.append(
+                    {
+                        "caller": current_function,
+                        "line": node.start_point[0] + 1,
+                        "callee": function_called,
+                        "receiver": receiver,
+                        "name": name,
+                    }
+                )
+
+    def resolve_call(self, call, module, result, symbols):
+        """
+        按包解析被调用函数：`函数()` 在当前包和点导入的包中查找，`包名.函数()` 在导入路径对应的目录中查找。
+        """
+        if call["caller"] not in symbols:
+            return None
+        receiver = call["receiver"]
+        if receiver is None:
+            callee = symbols.lookup(module, None, call["name"])
+            for path in result.get("wildcard_imports", []):
+                if callee is not None:
+                    break
+                package = symbols.resolve_module(path)
+                if package is not None:
+                    callee = symbols.lookup(package, None, call["name"])
+        else:
+            imported = result.get("imports", {}).get(receiver)
+            package = symbols.resolve_module(imported[0]) if imported is not None else None
+            callee = symbols.lookup(package, None, call["name"]) if package is not None else None
+        # 确保当前函数（调用者）和被调用的函数不同
+        if callee == call["caller"]:
+            return None
+        return callee
+
+    def go_extract_call_functions(self, workers: Optional[int] = 1, cache=None):
+        return self.extract_call_functions(workers, cache)
 
 
 class js_extract(BaseExtract):
+    file_extension = ".js"
+    node_handlers = {
+        "class_declaration": "handle_class",
+        "method_definition": "handle_method",
+        "variable_declarator": "handle_declarator",
+        "call_expression": "handle_call",
+    }
+
     def __init__(self, directory):
         super().__init__(directory, "javascript")
 
@@ -535,10 +1123,6 @@ class js_extract(BaseExtract):
         """
         从抽象语法树的根节点提取函数信息。
 
-        此函数遍历抽象语法树的节点。当遇到类定义或函数定义时，提取相关信息并存储。
-        对于每个类定义，记录当前类的名称。对于每个函数定义，记录函数的信息，
-        包括其在文件中的起始和结束字节位置、所属的类（如果有）以及函数所在的文件路径。
-
         Args:
             root_node (Node): 语法树的根节点。
             file_path (str): 当前分析的文件路径。
@@ -546,165 +1130,126 @@ class js_extract(BaseExtract):
         Returns:
             dict: 包含所有函数信息的字典。键为函数标识符，值为函数的详细信息。
         """
-        functions = {}
-        current_class = None
-        current_function = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取类和函数的定义信息。
-
-            这是一个递归函数，用于检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会提取函数的信息并更新当前函数。
-
-            Args:
-                node (Node): 当前遍历到的节点。
-            """
-            nonlocal current_class, current_function
-            # testss = node.text.decode('utf-8')
-            # print(f'text:{testss}\ntype:{node.type}')
-            if node.type == "class_declaration":
-                class_name_node = node.child_by_field_name("name")
-                if class_name_node:
-                    current_class = class_name_node.text.decode("utf-8")
-            elif node.type == "method_definition":
-                function_name_node = node.child_by_field_name("name")
-                if function_name_node:
-                    function_name = function_name_node.text.decode("utf-8")
-                    # 如果当前节点是方法定义，并且存在当前类的上下文，则将类名附加到函数名前
-                    function_id = f"{current_class}.{function_name}" if current_class else function_name
-                    functions[function_id] = {
-                        # 'start_byte': node.start_byte,
-                        # 'end_byte': node.end_byte,
-                        "class": current_class if node.type == "method_definition" else None,
-                        "file_path": file_path,
-                    }
-                    current_function = function_id
-                else:
-                    current_function = None
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
-
-        traverse(root_node)
-        return functions
+        return self.extract_definitions_and_calls(root_node, file_path)[0]
 
     def extract_calls(self, root_node):
         """
         遍历语法树的节点，提取函数调用关系。
 
-        此函数对每个函数调用进行分析，记录调用者和被调用者的信息，并将其存储在 calls 列表中。
-        在这个过程中，如果当前存在类上下文，会用于确定被调用函数的完整名称。
-
         Args:
             root_node (Node): 语法树的根节点。
-            functions (dict): 包含所有函数信息的字典。
 
         Returns:
             list: 包含所有函数调用关系的列表。
         """
-        calls = []
-        current_function = None
-        current_class = None
-        variable_types = {}
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取函数调用信息。
-
-            这是一个递归函数，它会检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会更新当前函数；
-            如果节点是函数调用，它会提取调用信息并存储在calls列表中。
-
-            :param node: 当前遍历到的节点
-            """
-            nonlocal current_function, current_class, variable_types
-            if node.type == "class_declaration":
-                class_name_node = node.child_by_field_name("name")
-                if class_name_node:
-                    current_class = class_name_node.text.decode("utf-8")
-            elif node.type == "method_definition":
-                function_name_node = node.child_by_field_name("name")
-                if function_name_node:
-                    function_name = function_name_node.text.decode("utf-8")
-                    current_function = f"{current_class}.{function_name}" if current_class else function_name
-            elif node.type == "variable_declarator":
-                variable_name_node = node.child_by_field_name("name")
-                # 查找 new_expression 节点
-                for child in node.children:
-                    if child.type == "new_expression":
-                        type_node = child.named_child(0)  # 假设类型节点是 new_expression 的第一个命名子节点
-                        if type_node and variable_name_node:
-                            variable_name = variable_name_node.text.decode("utf-8")
-                            variable_type = type_node.text.decode("utf-8")
-                            variable_types[variable_name] = variable_type
-                        break  # 找到 new_expression 后不需要继续遍历其他子节点
-
-            elif node.type == "call_expression":
-                # 提取调用表达式中的方法名和对象名
-                method_name_node = node.child_by_field_name("function")
-                if method_name_node and method_name_node.type == "member_expression":
-                    object_node = method_name_node.child_by_field_name("object")
-                    property_node = method_name_node.child_by_field_name("property")
-                    if object_node and property_node:
-                        object_name = object_node.text.decode("utf-8")
-                        method_name = property_node.text.decode("utf-8")
-                        # print(f'object_name:{object_name}\nmethod_name:{method_name}')
-                        # 如果对象名是 'this' 或者与当前类名相同，我们可以假设它是当前类的方法调用
-                        if object_name == "this":
-                            object_name = current_class
-                        # 如果对象名是一个变量，我们需要查找这个变量对应的类名
-                        elif object_name in variable_types:
-                            object_name = variable_types[object_name]
-                        callee = f"{object_name}.{method_name}"
-                    else:
-                        callee = method_name_node.text.decode("utf-8")
-
-                    if current_function and callee and current_function != callee:
-                        calls.append(
-                            {
-                                "caller": current_function,
-                                "callee": callee,
-                            }
-                        )
-
-            # 遍历子节点
+        return self.extract_definitions_and_calls(root_node, None)[1]
+
+    def handle_class(self, node, context):
+        """
+        遇到类声明时，记录当前类的名称和父类。
+        """
+        class_name_node = node.child_by_field_name("name")
+        if class_name_node:
+            context.current_class = class_name_node.text.decode("utf-8")
+            bases = []
             for child in node.children:
-                traverse(child)
+                if child.type == "class_heritage" and child.named_child_count:
+                    bases.append(child.named_child(0).text.decode("utf-8"))
+            context.bases[context.current_class] = bases
 
-        traverse(root_node)
-        return calls
+    def handle_method(self, node, context):
+        """
+        遇到方法定义时，记录方法信息并将其作为当前函数。
+        """
+        function_name_node = node.child_by_field_name("name")
+        if function_name_node:
+            current_class = context.current_class
+            function_name = function_name_node.text.decode("utf-8")
+            # 如果当前节点是方法定义，并且存在当前类的上下文，则将类名附加到函数名前
+            function_id = f"{current_class}.{function_name}" if current_class else function_name
+            context.functions[function_id] = {
+                "class": current_class,
+                "file_path": context.file_path,
+            }
+            context.current_function = function_id
+
+    def handle_declarator(self, node, context):
+        """
+        遇到 `let 变量 = new 类型()` 形式的声明时，记录变量的类型。
+        """
+        variable_name_node = node.child_by_field_name("name")
+        # 查找 new_expression 节点
+        for child in node.children:
+            if child.type == "new_expression":
+                type_node = child.named_child(0)  # 假设类型节点是 new_expression 的第一个命名子节点
+                if type_node and variable_name_node:
+                    variable_name = variable_name_node.text.decode("utf-8")
+                    variable_type = type_node.text.decode("utf-8")
+                    context.variable_types[variable_name] = variable_type
+                break  # 找到 new_expression 后不需要继续遍历其他子节点
 
-    def js_extract_call_functions(self):
-        directory = self.directory
-        functions = {}
-        calls = []
-        original_directory = os.getcwd()  # 保存原始工作目录
-        os.chdir(directory)  # 切换到目标仓库的根目录
-        try:
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".js"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        file_path = file_path.replace("./", "")
-                        f = self.extract_functions(root_node, file_path)
-                        functions.update(f)
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".js"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        c = self.extract_calls(root_node)
-                        calls.extend(c)
-        finally:
-            os.chdir(original_directory)  # 恢复原始工作目录
-        filtered_calls = [call for call in calls if call["caller"] in functions and call["callee"] in functions]
-        calls = filtered_calls
-        return functions, calls
+    def handle_call(self, node, context):
+        """
+        遇到调用表达式时，结合 this 和变量类型确定被调用方法所属的类，由 resolve_call 在类及其父类中查找。
+        """
+        # 提取调用表达式中的方法名和对象名
+        method_name_node = node.child_by_field_name("function")
+        if method_name_node and method_name_node.type == "member_expression":
+            object_node = method_name_node.child_by_field_name("object")
+            property_node = method_name_node.child_by_field_name("property")
+            object_name = method_name = None
+            if object_node and property_node:
+                object_name = object_node.text.decode("utf-8")
+                method_name = property_node.text.decode("utf-8")
+                # 如果对象名是 'this' 或者与当前类名相同，我们可以假设它是当前类的方法调用
+                if object_name == "this":
+                    object_name = context.current_class
+                # 如果对象名是一个变量，我们需要查找这个变量对应的类名
+                elif object_name in context.variable_types:
+                    object_name = context.variable_types[object_name]
+                callee = f"{object_name}.{method_name}"
+            else:
+                callee = method_name_node.text.decode("utf-8")
+
+            current_function = context.current_function
+            if current_function and callee and current_function != callee:
+                context.calls.append(
+                    {
+                        "caller": current_function,
+                        "line": node.start_point[0] + 1,
+                        "callee": callee,
+                        "receiver": object_name,
+                        "name": method_name,
+                    }
+                )
+
+    def resolve_call(self, call, module, result, symbols):
+        """
+        在对象所属的类及其父类中查找被调用的方法，无法确定类时按完整名称匹配。
+        """
+        if call["caller"] not in symbols:
+            return None
+        if call["receiver"] is None:
+            return super().resolve_call(call, module, result, symbols)
+        callee = symbols.lookup_method(call["receiver"], call["name"])
+        # 确保当前函数（调用者）和被调用的函数不同
+        if callee == call["caller"]:
+            return None
+        return callee
+
+    def js_extract_call_functions(self, workers: Optional[int] = 1, cache=None):
+        return self.extract_call_functions(workers, cache)
 
 
 class cpp_extract(BaseExtract):
+    file_extension = ".cpp"
+    node_handlers = {
+        "class_specifier": "handle_class",
+        "function_declarator": "handle_function",
+        "declaration": "handle_declaration",
+        "call_expression": "handle_call",
+    }
+
     def __init__(self, directory):
         super().__init__(directory, "cpp")
 
@@ -715,10 +1260,6 @@ class cpp_extract(BaseExtract):
         """
         从抽象语法树的根节点提取函数信息。
 
-        此函数遍历抽象语法树的节点。当遇到类定义或函数定义时，提取相关信息并存储。
-        对于每个类定义，记录当前类的名称。对于每个函数定义，记录函数的信息，
-        包括其在文件中的起始和结束字节位置、所属的类（如果有）以及函数所在的文件路径。
-
         Args:
             root_node (Node): 语法树的根节点。
             file_path (str): 当前分析的文件路径。
@@ -726,220 +1267,129 @@ class cpp_extract(BaseExtract):
         Returns:
             dict: 包含所有函数信息的字典。键为函数标识符，值为函数的详细信息。
         """
-        functions = {}
-        current_class = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取类和函数的定义信息。
-
-            这是一个递归函数，用于检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会提取函数的信息并更新当前函数。
-
-            Args:
-                node (Node): 当前遍历到的节点。
-            """
-            nonlocal current_class
-            # test = node.text.decode("utf-8")
-            # print(f'node.type:{node.type},test:{test}')
-            if node.type == "class_specifier":
-                class_name_node = node.child_by_field_name("name")
-
-                if class_name_node:
-                    current_class = class_name_node.text.decode("utf-8")
-                    # print(f'current_class:{current_class}')
-            elif node.type == "function_declarator":
-                function_name_node = None
-                for i in range(0, node.child_count):
-                    child = node.child(i)
-                    if child.type == "field_identifier":
-                        function_name_node = child
-                        break
-                if function_name_node:
-
-                    function_name = function_name_node.text.decode("utf-8")
-                    # print(f'node.type:{function_name_node.type},function_name:{function_name}')
-                    function_id = f"{current_class}.{function_name}" if current_class else function_name
-                    functions[function_id] = {
-                        # 'start_byte': node.start_byte,
-                        # 'end_byte': node.end_byte,
-                        "class": current_class,
-                        "file_path": file_path,
-                    }
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
-
-        traverse(root_node)
-        return functions
+        return self.extract_definitions_and_calls(root_node, file_path)[0]
 
     def extract_calls(self, root_node):
         """
         遍历语法树的节点，提取函数调用关系。
 
-        此函数对每个函数调用进行分析，记录调用者和被调用者的信息，并将其存储在 calls 列表中。
-        在这个过程中，如果当前存在类上下文，会用于确定被调用函数的完整名称。
-
         Args:
             root_node (Node): 语法树的根节点。
-            functions (dict): 包含所有函数信息的字典。
 
         Returns:
             list: 包含所有函数调用关系的列表。
         """
-        calls = []
-        current_function = None
-        current_class = None
-        variable_types = {}
-        callee = None
+        return self.extract_definitions_and_calls(root_node, None)[1]
 
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取函数调用信息。
+    def create_context(self, file_path):
+        context = super().create_context(file_path)
+        # 最近一次解析出的被调用函数，没有解析出新名称的调用表达式沿用该值
+        context.callee = None
+        return context
 
-            这是一个递归函数，它会检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会更新当前函数；
-            如果节点是函数调用，它会提取调用信息并存储在calls列表中。
-
-            :param node: 当前遍历到的节点
-            """
-            nonlocal current_function, current_class, variable_types, callee
-            # test = node.text.decode("utf-8")
-            # print(f'node.type:{node.type},text:{test}')
-            if node.type == "class_specifier":
-                class_name_node = node.child_by_field_name("name")
-
-                if class_name_node:
-                    current_class = class_name_node.text.decode("utf-8")
-            elif node.type == "function_declarator":
-                function_name_node = None
-                for i in range(0, node.child_count):
-                    child = node.child(i)
-                    if child.type == "field_identifier":
-                        function_name_node = child
-                        break
-                if function_name_node:
-                    function_name = function_name_node.text.decode("utf-8")
-                    current_function = f"{current_class}.{function_name}" if current_class else function_name
-
-            elif node.type == "declaration":
-                # 在C++中，变量声明可能包含类型和变量名
-                type_node = node.child_by_field_name("type")
-                variable_name_node = node.child_by_field_name("declarator")
-                if type_node and variable_name_node:
-                    variable_type = type_node.text.decode("utf-8")
-                    variable_name = variable_name_node.text.decode("utf-8")
-                    variable_types[variable_name] = variable_type
-
-            elif node.type == "call_expression":
-                # 提取调用表达式中的方法名和对象名
-                method_name_node = None
-                object_name = None
-                for child in node.children:
-                    if child.type == "field_expression":
-                        # field_expression 通常包含一个对象和一个通过该对象调用的方法
-                        object_node = child.child_by_field_name("argument")
-                        method_name_node = child.child_by_field_name("field")
-                        if object_node and method_name_node:
-                            object_name = object_node.text.decode("utf-8")
-                            method_name = method_name_node.text.decode("utf-8")
-                            # 如果对象名是一个变量，我们需要查找这个变量对应的类名
-                            if object_name in variable_types:
-                                object_name = variable_types[object_name]
-                            callee = f"{object_name}.{method_name}"
-                    elif child.type == "identifier" and method_name_node is None:
-                        # 如果是直接的函数调用，没有对象名
-                        method_name_node = child
-                        callee = method_name_node.text.decode("utf-8")
-
-                if method_name_node and not object_name:
-                    # 直接的函数调用，没有对象名
-                    callee = method_name_node.text.decode("utf-8")
-
-                if current_function and callee and current_function != callee:
-                    calls.append(
-                        {
-                            "caller": current_function,
-                            "callee": callee,
-                        }
-                    )
-
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
+    def handle_class(self, node, context):
+        """
+        遇到类定义时，记录当前类的名称。
+        """
+        class_name_node = node.child_by_field_name("name")
 
-        traverse(root_node)
-        return calls
+        if class_name_node:
+            context.current_class = class_name_node.text.decode("utf-8")
 
-    def cpp_extract_call_functions(self):
-        directory = self.directory
-        functions = {}
-        calls = []
-        original_directory = os.getcwd()  # 保存原始工作目录
-        os.chdir(directory)  # 切换到目标仓库的根目录
-        try:
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".cpp"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        file_path = file_path.replace("./", "")
-                        f = self.extract_functions(root_node, file_path)
-                        functions.update(f)
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".cpp"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        c = self.extract_calls(root_node)
-                        calls.extend(c)
-        finally:
-            os.chdir(original_directory)  # 恢复原始工作目录
-        filtered_calls = [call for call in calls if call["caller"] in functions and call["callee"] in functions]
-        calls = filtered_calls
-        return functions, calls
+    def handle_function(self, node, context):
+        """
+        遇到带有 field_identifier 的函数声明符时，记录函数信息并将其作为当前函数。
+        """
+        function_name_node = None
+        for i in range(0, node.child_count):
+            child = node.child(i)
+            if child.type == "field_identifier":
+                function_name_node = child
+                break
+        if function_name_node:
+            current_class = context.current_class
+            function_name = function_name_node.text.decode("utf-8")
+            function_id = f"{current_class}.{function_name}" if current_class else function_name
+            context.functions[function_id] = {
+                "class": current_class,
+                "file_path": context.file_path,
+            }
+            context.current_function = function_id
+
+    def handle_declaration(self, node, context):
+        """
+        遇到变量声明时，记录变量的类型。
+        """
+        # 在C++中，变量声明可能包含类型和变量名
+        type_node = node.child_by_field_name("type")
+        variable_name_node = node.child_by_field_name("declarator")
+        if type_node and variable_name_node:
+            variable_type = type_node.text.decode("utf-8")
+            variable_name = variable_name_node.text.decode("utf-8")
+            context.variable_types[variable_name] = variable_type
+
+    def handle_call(self, node, context):
+        """
+        遇到调用表达式时，结合变量类型确定被调用函数的完整名称。
+        """
+        # 提取调用表达式中的方法名和对象名
+        method_name_node = None
+        object_name = None
+        for child in node.children:
+            if child.type == "field_expression":
+                # field_expression 通常包含一个对象和一个通过该对象调用的方法
+                object_node = child.child_by_field_name("argument")
+                method_name_node = child.child_by_field_name("field")
+                if object_node and method_name_node:
+                    object_name = object_node.text.decode("utf-8")
+                    method_name = method_name_node.text.decode("utf-8")
+                    # 如果对象名是一个变量，我们需要查找这个变量对应的类名
+                    if object_name in context.variable_types:
+                        object_name = context.variable_types[object_name]
+                    context.callee = f"{object_name}.{method_name}"
+            elif child.type == "identifier" and method_name_node is None:
+                # 如果是直接的函数调用，没有对象名
+                method_name_node = child
+                context.callee = method_name_node.text.decode("utf-8")
+
+        if method_name_node and not object_name:
+            # 直接的函数调用，没有对象名
+            context.callee = method_name_node.text.decode("utf-8")
+
+        current_function = context.current_function
+        callee = context.callee
+        if current_function and callee and current_function != callee:
+            context.calls.append(
+                {
+                    "caller": current_function,
+                    "line": node.start_point[0] + 1,
+                    "callee": callee,
+                }
+            )
+
+    def cpp_extract_call_functions(self, workers: Optional[int] = 1, cache=None):
+        return self.extract_call_functions(workers, cache)
 
 
 class c_extract(BaseExtract):
+    file_extension = ".c"
+    node_handlers = {
+        "struct_specifier": "handle_struct",
+        "function_definition": "handle_function",
+        "declaration": "handle_declaration",
+        "call_expression": "handle_call",
+    }
+
     def __init__(self, directory):
-        self.directory = str(directory)
+        super().__init__(directory, "c")
 
     def parse_file_with_treesitter(self, file_path):
-        """
-        使用 tree_sitter 解析文件，获取 AST（抽象语法树）。
-
-        此函数读取指定路径的文件，并使用 tree_sitter 解析器来解析该文件，
-        最终获取并返回文件的抽象语法树（AST）的根节点。
-
-        Args:
-            file_path (str): 要解析的文件路径。
-
-        Returns:
-            Node: AST 的根节点。
-        """
-        with open(file_path, "rb") as file:
-            source_code = file.read()
-        parser = Parser()
-        system = platform.system()
-        if system == "Windows":
-            extension = "dll"
-        elif system == "Darwin":
-            extension = "dylib"
-        else:  # Assume Linux if not Windows or macOS
-            extension = "so"
-        language_path = os.path.join(os.path.dirname(__file__), "build", f"tree-sitter-c.{extension}")
-        parser.set_language(Language(language_path, "c"))
-        tree = parser.parse(source_code)
-        return tree.root_node
+        return super().parse_file_with_treesitter(file_path)
 
     def extract_functions(self, root_node, file_path):
         """
         从抽象语法树的根节点提取函数信息。
 
-        此函数遍历抽象语法树的节点。当遇到结构体定义或函数定义时，提取相关信息并存储。
-        对于每个结构体定义，记录当前结构体的名称。对于每个函数定义，记录函数的信息，
-        包括其在文件中的起始和结束字节位置、所属的结构体（如果有）以及函数所在的文件路径。
-
         Args:
             root_node (Node): 语法树的根节点。
             file_path (str): 当前分析的文件路径。
@@ -947,52 +1397,11 @@ class c_extract(BaseExtract):
         Returns:
             dict: 包含所有函数信息的字典。键为函数标识符，值为函数的详细信息。
         """
-        functions = {}
-        current_struct = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取结构体和函数的定义信息。
-
-            这是一个递归函数，用于检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是结构体定义，它会更新当前结构体的名称；如果节点是函数定义，它会提取函数的信息并更新当前函数。
-
-            Args:
-                node (Node): 当前遍历到的节点。
-            """
-            nonlocal current_struct
-            if node.type == "struct_specifier":
-                # 获取结构体名称
-                name_node = node.child_by_field_name("name")
-                if name_node:
-                    current_struct = name_node.text.decode("utf-8")
-            elif node.type == "function_definition":
-                # 获取函数名称
-                function_name_node = node.child_by_field_name("declarator")
-                while function_name_node and function_name_node.type != "identifier":
-                    function_name_node = function_name_node.child_by_field_name("declarator") or function_name_node.named_child(0)
-                if function_name_node:
-                    function_name = function_name_node.text.decode("utf-8")
-                    function_id = f"{current_struct}.{function_name}" if current_struct else function_name
-                    functions[function_id] = {
-                        # 'start_byte': node.start_byte,
-                        # 'end_byte': node.end_byte,
-                        "class": current_struct,
-                        "file_path": file_path,
-                    }
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
-
-        traverse(root_node)
-        return functions
+        return self.extract_definitions_and_calls(root_node, file_path)[0]
 
     def extract_calls(self, root_node, functions):
         """
-        遍历语法树的节点，提取函数调用关系。
-
-        此函数对每个函数调用进行分析，记录调用者和被调用者的信息，并将其存储在 calls 列表中。
-        在这个过程中，如果当前存在结构体上下文，会用于确定被调用函数的完整名称。
+        遍历语法树的节点，提取被调用函数已在 functions 中定义的调用关系。
 
         Args:
             root_node (Node): 语法树的根节点。
@@ -1001,127 +1410,106 @@ class c_extract(BaseExtract):
         Returns:
             list: 包含所有函数调用关系的列表。
         """
-        calls = []
-        current_function = None
-        current_struct = None
-        variable_types = {}
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取函数调用信息。
-
-            这是一个递归函数，它会检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是函数定义，它会更新当前函数；
-            如果节点是函数调用，它会提取调用信息并存储在calls列表中。
-
-            :param node: 当前遍历到的节点
-            """
-            nonlocal current_function, variable_types, current_struct
-            if node.type == "struct_specifier":
-                # 获取结构体名称
-                name_node = node.child_by_field_name("name")
-                if name_node:
-                    current_struct = name_node.text.decode("utf-8")
-            elif node.type == "function_definition":
-                function_name_node = node.child_by_field_name("declarator")
-                while function_name_node and function_name_node.type != "identifier":
-                    function_name_node = function_name_node.child_by_field_name("declarator") or function_name_node.named_child(0)
-                if function_name_node:
-                    current_function = function_name_node.text.decode("utf-8")
-                    # print(f'current_function:{current_function}')
-
-            elif node.type == "declaration":
-                # 在C中，变量声明可能包含类型和变量名
-                # 我们需要找到类型标识符，这可能是一个结构体名称
-                type_node = node.child_by_field_name("type")
-                variable_name_node = node.child_by_field_name("declarator")
-                if type_node and variable_name_node:
-                    # 遍历类型节点的子节点以找到类型标识符
-                    type_identifier_node = None
-                    for child in type_node.children:
-                        if child.type == "type_identifier":
-                            type_identifier_node = child
-                            break
-                    if type_identifier_node:
-                        variable_type = type_identifier_node.text.decode("utf-8")
-                        variable_name = variable_name_node.text.decode("utf-8")
-                        variable_types[variable_name] = variable_type
-
-            elif node.type == "call_expression":
-                # 提取调用表达式中的方法名
-                function_called_node = node.child_by_field_name("function")
-                test = function_called_node.text.decode("utf-8")
-                # print(f'function_called_node:{test},type:{function_called_node.type}')
-                if function_called_node and function_called_node.type == "field_expression":
-                    # field_expression 通常包含一个对象和一个通过该对象调用的方法
-                    object_node = function_called_node.child_by_field_name("argument")
-                    method_name_node = function_called_node.child_by_field_name("field")
-                    if object_node and method_name_node:
-                        object_name = object_node.text.decode("utf-8")
-                        method_name = method_name_node.text.decode("utf-8")
-                        # 如果对象名是一个变量，我们需要查找这个变量对应的结构体类型
-                        if object_name in variable_types:
-                            struct_type = variable_types[object_name]
-
-                            callee = f"{struct_type}.{method_name}"
-
-                            caller = f"{current_struct}.{current_function}"
-                            # print(f'callee:{callee},caller:{caller},isbool :{callee in functions}')
-
-                            calls.append(
-                                {
-                                    "caller": caller,
-                                    "callee": callee,
-                                }
-                            )
-                elif function_called_node and function_called_node.type == "identifier":
-                    # 直接的函数调用，没有对象名
-                    function_called = function_called_node.text.decode("utf-8")
-                    if current_function and function_called in functions:
-                        calls.append(
-                            {
-                                "caller": current_function,
-                                "callee": function_called,
-                            }
-                        )
-
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
+        calls = self.extract_definitions_and_calls(root_node, None)[1]
+        return [call for call in calls if call["callee"] in functions]
 
-        traverse(root_node)
-        return calls
+    def handle_struct(self, node, context):
+        """
+        遇到结构体定义时，记录当前结构体的名称（保存在 current_class 中）。
+        """
+        # 获取结构体名称
+        name_node = node.child_by_field_name("name")
+        if name_node:
+            context.current_class = name_node.text.decode("utf-8")
 
-    def c_extract_call_functions(self):
-        directory = self.directory
-        functions = {}
-        calls = []
-        original_directory = os.getcwd()  # 保存原始工作目录
-        os.chdir(directory)  # 切换到目标仓库的根目录
-        try:
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".c"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        file_path = file_path.replace("./", "")
-                        function = self.extract_functions(root_node, file_path)
-                        functions.update(function)
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".c"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        call = self.extract_calls(root_node, functions)
-                        calls.extend(call)
-        finally:
-            os.chdir(original_directory)  # 恢复原始工作目录
-        filtered_calls = [call for call in calls if call["caller"] in functions and call["callee"] in functions]
-        calls = filtered_calls
-        return functions, calls
+    def handle_function(self, node, context):
+        """
+        遇到函数定义时，记录函数信息（所属的结构体和所在的文件路径）并将其作为当前函数。
+        """
+        # 获取函数名称
+        function_name_node = node.child_by_field_name("declarator")
+        while function_name_node and function_name_node.type != "identifier":
+            function_name_node = function_name_node.child_by_field_name("declarator") or function_name_node.named_child(0)
+        if function_name_node:
+            current_struct = context.current_class
+            function_name = function_name_node.text.decode("utf-8")
+            function_id = f"{current_struct}.{function_name}" if current_struct else function_name
+            context.functions[function_id] = {
+                "class": current_struct,
+                "file_path": context.file_path,
+            }
+            context.current_function = function_name
+
+    def handle_declaration(self, node, context):
+        """
+        遇到变量声明时，记录变量的结构体类型。
+        """
+        # 在C中，变量声明可能包含类型和变量名
+        # 我们需要找到类型标识符，这可能是一个结构体名称
+        type_node = node.child_by_field_name("type")
+        variable_name_node = node.child_by_field_name("declarator")
+        if type_node and variable_name_node:
+            # 遍历类型节点的子节点以找到类型标识符
+            type_identifier_node = None
+            for child in type_node.children:
+                if child.type == "type_identifier":
+                    type_identifier_node = child
+                    break
+            if type_identifier_node:
+                variable_type = type_identifier_node.text.decode("utf-8")
+                variable_name = variable_name_node.text.decode("utf-8")
+                context.variable_types[variable_name] = variable_type
+
+    def handle_call(self, node, context):
+        """
+        遇到函数调用时，结合变量类型确定被调用函数的完整名称。
+        """
+        # 提取调用表达式中的方法名
+        current_function = context.current_function
+        function_called_node = node.child_by_field_name("function")
+        if function_called_node and function_called_node.type == "field_expression":
+            # field_expression 通常包含一个对象和一个通过该对象调用的方法
+            object_node = function_called_node.child_by_field_name("argument")
+            method_name_node = function_called_node.child_by_field_name("field")
+            if object_node and method_name_node:
+                object_name = object_node.text.decode("utf-8")
+                method_name = method_name_node.text.decode("utf-8")
+                # 如果对象名是一个变量，我们需要查找这个变量对应的结构体类型
+                if object_name in context.variable_types:
+                    struct_type = context.variable_types[object_name]
+                    context.calls.append(
+                        {
+                            "caller": f"{context.current_class}.{current_function}",
+                            "line": node.start_point[0] + 1,
+                            "callee": f"{struct_type}.{method_name}",
+                        }
+                    )
+        elif function_called_node and function_called_node.type == "identifier":
+            # 直接的函数调用，没有对象名
+            function_called = function_called_node.text.decode("utf-8")
+            if current_function:
+                context.calls.append(
+                    {
+                        "caller": current_function,
+                        "line": node.start_point[0] + 1,
+                        "callee": function_called,
+                    }
+                )
+
+    def c_extract_call_functions(self, workers: Optional[int] = 1, cache=None):
+        return self.extract_call_functions(workers, cache)
 
 
 class php_extract(BaseExtract):
+    file_extension = ".php"
+    node_handlers = {
+        "class_declaration": "handle_class",
+        "function_definition": "handle_function",
+        "method_declaration": "handle_function",
+        "assignment_expression": "handle_assignment",
+        "function_call_expression": "handle_call",
+    }
+
     def __init__(self, directory):
         super().__init__(directory, "php")
 
@@ -1132,10 +1520,6 @@ class php_extract(BaseExtract):
         """
         从抽象语法树的根节点提取 PHP 函数和类方法信息。
 
-        此函数遍历抽象语法树的节点。当遇到类定义或方法定义时，提取相关信息并存储。
-        对于每个类定义，记录当前类的名称。对于每个函数或方法定义，记录函数的信息，
-        包括其在文件中的起始和结束字节位置、所属的类（如果有）以及函数所在的文件路径。
-
         Args:
             root_node (Node): 语法树的根节点。
             file_path (str): 当前分析的文件路径。
@@ -1143,48 +1527,11 @@ class php_extract(BaseExtract):
         Returns:
             dict: 包含所有函数信息的字典。键为函数标识符，值为函数的详细信息。
         """
-        functions = {}
-        current_class = None
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取类和函数的定义信息。
-
-            这是一个递归函数，用于检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数或方法定义，它会提取函数的信息并更新当前函数。
-
-            Args:
-                node (Node): 当前遍历到的节点。
-            """
-            nonlocal current_class
-            if node.type == "class_declaration":
-                class_name_node = node.child_by_field_name("name")
-                if class_name_node:
-                    current_class = class_name_node.text.decode("utf-8")
-            elif node.type == "function_definition" or node.type == "method_declaration":
-                function_name_node = node.child_by_field_name("name")
-                if function_name_node:
-                    function_name = function_name_node.text.decode("utf-8")
-                    function_id = f"{current_class}.{function_name}" if current_class else function_name
-                    functions[function_id] = {
-                        # 'start_byte': node.start_byte,
-                        # 'end_byte': node.end_byte,
-                        "class": current_class,
-                        "file_path": file_path,
-                    }
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
-
-        traverse(root_node)
-        return functions
+        return self.extract_definitions_and_calls(root_node, file_path)[0]
 
     def extract_calls(self, root_node, functions):
         """
-        遍历语法树的节点，提取 PHP 函数和方法调用关系。
-
-        此函数对每个函数调用进行分析，记录调用者和被调用者的信息，并将其存储在 calls 列表中。
-        在这个过程中，如果当前存在类上下文，会用于确定被调用函数的完整名称。
+        遍历语法树的节点，提取被调用函数已在 functions 中定义的 PHP 函数和方法调用关系。
 
         Args:
             root_node (Node): 语法树的根节点。
@@ -1193,114 +1540,202 @@ class php_extract(BaseExtract):
         Returns:
             list: 包含所有函数调用关系的列表。
         """
-        calls = []
-        current_function = None
-        current_class = None
-        variable_assignments = {}
-        variable_types = {}
-
-        def traverse(node):
-            """
-            遍历语法树的内部节点，提取函数调用信息。
-
-            这是一个递归函数，它会检查当前节点的类型，并根据节点类型执行相应的操作。
-            如果节点是类定义，它会更新当前类的名称；如果节点是函数定义，它会更新当前函数；
-            如果节点是函数调用，它会提取调用信息并存储在calls列表中。
-
-            :param node: 当前遍历到的节点
-            """
-            nonlocal current_function, current_class, variable_assignments
-            if node.type == "class_declaration":
-                class_name_node = node.child_by_field_name("name")
+        calls = self.extract_definitions_and_calls(root_node, None)[1]
+        return [call for call in calls if call["callee"] in functions]
+
+    def create_context(self, file_path):
+        context = super().create_context(file_path)
+        # `$变量 = $对象->方法` 形式赋值的变量到方法完整名称的映射
+        context.variable_assignments = {}
+        return context
+
+    def handle_class(self, node, context):
+        """
+        遇到类定义时，记录当前类的名称。
+        """
+        class_name_node = node.child_by_field_name("name")
+        if class_name_node:
+            context.current_class = class_name_node.text.decode("utf-8")
+
+    def handle_function(self, node, context):
+        """
+        遇到函数或方法定义时，记录函数信息并将其作为当前函数。
+        """
+        function_name_node = node.child_by_field_name("name")
+        if function_name_node:
+            current_class = context.current_class
+            function_name = function_name_node.text.decode("utf-8")
+            function_id = f"{current_class}.{function_name}" if current_class else function_name
+            context.functions[function_id] = {
+                "class": current_class,
+                "file_path": context.file_path,
+            }
+            context.current_function = function_id
+
+    def handle_assignment(self, node, context):
+        """
+        遇到赋值时，记录 `new 类名()` 创建的变量类型以及 `$变量->方法` 形式的方法引用。
+        """
+        # 处理变量赋值
+        variable_name_node = node.child_by_field_name("left")
+        value_node = node.child_by_field_name("right")
+        if variable_name_node and value_node:
+            variable_name = variable_name_node.text.decode("utf-8")
+            if value_node.type == "object_creation_expression":
+                class_name_node = None
+                # 这是一个对象创建表达式，提取类名
+                for child in value_node.children:
+                    if child.type == "name":
+                        class_name_node = child
                 if class_name_node:
-                    current_class = class_name_node.text.decode("utf-8")
-            elif node.type in ["function_definition", "method_declaration"]:
-                function_name_node = node.child_by_field_name("name")
-                if function_name_node:
-                    function_name = function_name_node.text.decode("utf-8")
-                    current_function = f"{current_class}.{function_name}" if current_class else function_name
-            elif node.type == "assignment_expression":
-                # 处理变量赋值
-                variable_name_node = node.child_by_field_name("left")
-                value_node = node.child_by_field_name("right")
-                if variable_name_node and value_node:
-                    variable_name = variable_name_node.text.decode("utf-8")
-                    if value_node.type == "object_creation_expression":
-                        # test = value_node.text.decode("utf-8")
-                        class_name_node = None
-                        # 这是一个对象创建表达式，提取类名
-                        for child in value_node.children:
-                            if child.type == "name":
-                                class_name_node = child
-                        # print(f'class_name_node:{class_name_node}')
-                        if class_name_node:
-                            class_name = class_name_node.text.decode("utf-8")
-                            # print(f'class_name:{class_name}')
-                            variable_types[variable_name] = class_name
-                    elif value_node.type == "member_access_expression":
-                        # 这是一个成员访问表达式，提取方法名
-                        method_name_node = value_node.child_by_field_name("name")
-                        if method_name_node:
-                            method_name = method_name_node.text.decode("utf-8")
-                            object_node = value_node.child_by_field_name("object")
-                            if object_node:
-                                object_name = object_node.text.decode("utf-8")
-                                if object_name in variable_types:
-                                    # 如果对象名是之前创建的变量，则获取实际的类名
-                                    class_name = variable_types[object_name]
-                                    variable_assignments[variable_name] = f"{class_name}.{method_name}"
-            elif node.type == "function_call_expression":
-                # 处理函数调用
-                # print(f'variable_assignments:{variable_assignments}')
-                function_name_node = node.child_by_field_name("function")
-                if function_name_node and function_name_node.type == "variable_name":
-                    function_name = function_name_node.text.decode("utf-8")
-
-                    function_name = function_name_node.text.decode("utf-8")
-                    # print(f'function_name:{function_name}')
-                    if function_name in variable_assignments:
-                        # 如果函数名是之前赋值的变量，则获取实际的函数名
-                        callee = variable_assignments[function_name]
-                        # print(f'callee:{callee},current_function:{current_function}')
-                        if current_function and callee in functions:
-                            calls.append(
-                                {
-                                    "caller": current_function,
-                                    "callee": callee,
-                                }
-                            )
-
-            # 遍历子节点
-            for child in node.children:
-                traverse(child)
+                    class_name = class_name_node.text.decode("utf-8")
+                    context.variable_types[variable_name] = class_name
+            elif value_node.type == "member_access_expression":
+                # 这是一个成员访问表达式，提取方法名
+                method_name_node = value_node.child_by_field_name("name")
+                if method_name_node:
+                    method_name = method_name_node.text.decode("utf-8")
+                    object_node = value_node.child_by_field_name("object")
+                    if object_node:
+                        object_name = object_node.text.decode("utf-8")
+                        if object_name in context.variable_types:
+                            # 如果对象名是之前创建的变量，则获取实际的类名
+                            class_name = context.variable_types[object_name]
+                            context.variable_assignments[variable_name] = f"{class_name}.{method_name}"
 
-        traverse(root_node)
-        return calls
+    def handle_call(self, node, context):
+        """
+        通过变量调用函数时，根据记录的方法引用确定被调用的方法。
+        """
+        # 处理函数调用
+        function_name_node = node.child_by_field_name("function")
+        if function_name_node and function_name_node.type == "variable_name":
+            function_name = function_name_node.text.decode("utf-8")
+            if function_name in context.variable_assignments:
+                # 如果函数名是之前赋值的变量，则获取实际的函数名
+                callee = context.variable_assignments[function_name]
+                if context.current_function:
+                    context.calls.append(
+                        {
+                            "caller": context.current_function,
+                            "line": node.start_point[0] + 1,
+                            "callee": callee,
+                        }
+                    )
 
-    def php_extract_call_functions(self):
-        directory = self.directory
-        functions = {}
-        calls = []
-        original_directory = os.getcwd()  # 保存原始工作目录
-        os.chdir(directory)  # 切换到目标仓库的根目录
-        try:
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".php"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        file_path = file_path.replace("./", "")
-                        function = self.extract_functions(root_node, file_path)
-                        functions.update(function)
-            for root, dirs, files in os.walk("."):
-                for filename in files:
-                    if filename.endswith(".php"):
-                        file_path = os.path.join(root, filename)
-                        root_node = self.parse_file_with_treesitter(file_path)
-                        call = self.extract_calls(root_node, functions)
-                        calls.extend(call)
-        finally:
-            os.chdir(original_directory)  # 恢复原始工作目录
-        filtered_calls = [call for call in calls if call["caller"] in functions and call["callee"] in functions]
-        calls = filtered_calls
-        return functions, calls
+    def php_extract_call_functions(self, workers: Optional[int] = 1, cache=None):
+        return self.extract_call_functions(workers, cache)
+
+
+# 语言名称（包括别名）到提取器类的映射
+EXTRACT_CLASSES = {
+    "python": python_extract,
+    "java": java_extract,
+    "golang": go_extract,
+    "go": go_extract,
+    "js": js_extract,
+    "javascript": js_extract,
+    "cpp": cpp_extract,
+    "c++": cpp_extract,
+    "c": c_extract,
+    "php": php_extract,
+}
+
+
+def get_extract_class(language):
+    """
+    根据语言名称获取提取器类。
+
+    Args:
+        language (str): 语言名称，不区分大小写，支持 'golang'、'js'、'c++' 等别名。
+
+    Returns:
+        type: 提取器类。
+    """
+    extract_class = EXTRACT_CLASSES.get(language.lower())
+    if extract_class is None:
+        raise ValueError("Unsupported language types: {}".format(language))
+    return extract_class
+
+
+def extract_repository(directory, workers: Optional[int] = 1, caches: Optional[dict] = None, lazy: bool = False):
+    """
+    自动识别语言，分析目录下所有支持的源文件。
+
+    只遍历一次目录，按扩展名把文件分发给对应语言的提取器；所有语言的待解析文件一起提交，
+    workers 大于 1 时不同语言的文件在同一个进程池中并发解析。每种语言的结果单独合并、解析调用关系。
+
+    Args:
+        directory (str): 仓库目录。
+        workers (int, optional): 并行解析的进程数。默认为 1，即串行执行；为 None 时使用全部 CPU 核心。
+        caches (dict, optional): tree-sitter 语言名称到 ExtractCache 的映射。
+        lazy (bool, optional): 为 True 时每种语言的 calls 为按文件逐个解析的 ResolvedCalls。默认为 False。
+
+    Returns:
+        dict: tree-sitter 语言名称到 (functions, calls) 的映射，只包含目录中存在的语言。
+    """
+    caches = caches or {}
+    extracts = [extract_class(directory) for extract_class in dict.fromkeys(EXTRACT_CLASSES.values())]
+    source_files = scan_source_files(directory, [extract.file_extension for extract in extracts])
+    jobs = [
+        (extract, source_files[extract.file_extension], caches.get(extract.language))
+        for extract in extracts
+        if source_files[extract.file_extension]
+    ]
+    results = extract_source_files(jobs, workers)
+    return {extract.language: extract.merge_results(job_results, lazy) for (extract, _, _), job_results in zip(jobs, results)}
+
+
+def merge_languages(language_results):
+    """
+    将多种语言的提取结果合并为一个统一的函数表和调用关系。
+
+    每个函数的信息中增加 'language' 字段。只有在多种语言中出现同名函数时，
+    才把这些函数的标识符改为 '语言:函数名'，避免不同语言的函数被合并为同一个节点。
+    调用关系不会复制到新的列表中，而是在迭代时逐个改写标识符，可以多次迭代。
+
+    Args:
+        language_results (dict): tree-sitter 语言名称到 (functions, calls) 的映射，calls 可以是列表或 ResolvedCalls。
+
+    Returns:
+        tuple: (functions, calls)。calls 为按语言顺序产生调用关系的 MergedCalls。
+    """
+    languages_of_function = {}
+    for language, (functions, calls) in language_results.items():
+        for function_id in functions:
+            languages_of_function.setdefault(function_id, []).append(language)
+
+    merged_functions = {}
+    for language, (functions, calls) in language_results.items():
+        for function_id, info in functions.items():
+            merged_functions[_qualify(function_id, language, languages_of_function)] = {**info, "language": language}
+    return merged_functions, MergedCalls(language_results, languages_of_function)
+
+
+def _qualify(function_id, language, languages_of_function):
+    # 在多种语言中出现的函数加上语言前缀
+    if len(languages_of_function.get(function_id, ())) > 1:
+        return f"{language}:{function_id}"
+    return function_id
+
+
+class MergedCalls:
+    def __init__(self, language_results, languages_of_function) -> None:
+        """
+        merge_languages 合并后的调用关系，可以多次迭代，每次迭代按语言顺序逐个产生改写标识符后的调用。
+
+        Args:
+            language_results (dict): tree-sitter 语言名称到 (functions, calls) 的映射。
+            languages_of_function (dict): 函数标识符到定义它的语言列表的映射。
+        """
+        self.language_results = language_results
+        self.languages_of_function = languages_of_function
+
+    def __iter__(self):
+        for language, (functions, calls) in self.language_results.items():
+            for call in calls:
+                yield {
+                    **call,
+                    "caller": _qualify(call["caller"], language, self.languages_of_function),
+                    "callee": _qualify(call["callee"], language, self.languages_of_function),
+                }
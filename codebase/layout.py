@@ -0,0 +1,128 @@
+import networkx as nx
+import numpy as np
+
+
+# 不超过该节点数时使用 networkx 的 spring_layout（每次迭代计算所有节点对之间的斥力）
+SPRING_LAYOUT_MAX_NODES = 500
+# 超过该节点数时不再绘制节点标签
+LABEL_MAX_NODES = 2000
+# 超过该节点数时不再绘制箭头，边按线段集合一次绘制
+ARROW_MAX_NODES = 5000
+
+
+def sampled_force_layout(G, iterations: int = 50, sample_size: int = 256, seed: int = 0, block_size: int = 4096):
+    """
+    基于采样的 Fruchterman-Reingold 力导向布局，适用于大规模的调用图。
+
+    引力沿边精确计算；斥力每次迭代只计算每个节点与随机抽取的 sample_size 个节点之间的作用，
+    再按 n / sample_size 放大作为全体节点斥力的估计。每次迭代的开销为 O(n * sample_size + m)，
+    而 spring_layout 为 O(n^2)。所有计算都以 numpy 数组完成，节点按 block_size 分块以限制内存占用。
+
+    Args:
+        G (Graph): 调用图。
+        iterations (int, optional): 迭代次数。默认为 50。
+        sample_size (int, optional): 每次迭代计算斥力时抽取的节点数。默认为 256。
+        seed (int, optional): 随机数种子，相同的种子得到相同的布局。默认为 0。
+        block_size (int, optional): 计算斥力时每块的节点数。默认为 4096。
+
+    Returns:
+        dict: 节点到坐标（长度为 2 的 ndarray，范围为 [-1, 1]）的映射。
+    """
+    nodes = list(G)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: np.zeros(2)}
+    rng = np.random.default_rng(seed)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=np.int64).reshape(-1, 2)
+    sources, targets = edges[:, 0], edges[:, 1]
+
+    pos = rng.random((n, 2))
+    # 理想的节点间距，与 spring_layout 的默认值一致
+    k = 1.0 / np.sqrt(n)
+    sample_size = min(sample_size, n)
+    scale = n / sample_size
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    displacement = np.empty_like(pos)
+    for _ in range(iterations):
+        sample = rng.choice(n, size=sample_size, replace=False)
+        sample_x, sample_y = pos[sample, 0], pos[sample, 1]
+        for start in range(0, n, block_size):
+            # x、y 分量分别计算，避免在长度为 2 的最后一维上归约
+            dx = pos[start : start + block_size, 0, None] - sample_x
+            dy = pos[start : start + block_size, 1, None] - sample_y
+            inverse = 1.0 / np.maximum(dx * dx + dy * dy, 1e-9)
+            displacement[start : start + block_size, 0] = (dx * inverse).sum(axis=1)
+            displacement[start : start + block_size, 1] = (dy * inverse).sum(axis=1)
+        displacement *= k * k * scale
+        if len(edges):
+            delta = pos[sources] - pos[targets]
+            distance = np.maximum(np.sqrt((delta**2).sum(axis=1)), 1e-9)
+            force = delta * (distance / k)[:, None]
+            np.subtract.at(displacement, sources, force)
+            np.add.at(displacement, targets, force)
+        length = np.maximum(np.sqrt((displacement**2).sum(axis=1)), 1e-9)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    pos = nx.rescale_layout(pos)
+    return dict(zip(nodes, pos))
+
+
+def graph_layout(G, seed: int = 0):
+    """
+    为调用图选择布局算法：小图使用 spring_layout，大图使用 sampled_force_layout。
+
+    Args:
+        G (Graph): 调用图。
+        seed (int, optional): 随机数种子。默认为 0。
+
+    Returns:
+        dict: 节点到坐标的映射。
+    """
+    if G.number_of_nodes() <= SPRING_LAYOUT_MAX_NODES:
+        # 增加节点间隔以确保节点之间有一定间隙，避免节点重合
+        return nx.spring_layout(G, k=1.5, iterations=100, seed=seed)
+    return sampled_force_layout(G, seed=seed)
+
+
+def _dot_quote(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def write_dot(G, file_path: str):
+    """
+    将调用图写为 Graphviz 的 DOT 文件，不依赖 pydot 或 pygraphviz。
+
+    节点属性中值为 None 的属性不会写出。生成的文件可以用 `dot`、`sfdp` 等工具渲染，大图建议使用 sfdp。
+
+    Args:
+        G (DiGraph): 调用图。
+        file_path (str): 文件路径。
+    """
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("digraph call_graph {\n")
+        for node, attributes in G.nodes(data=True):
+            attributes = ", ".join(f"{key}={_dot_quote(value)}" for key, value in attributes.items() if value is not None)
+            f.write(f"  {_dot_quote(node)}" + (f" [{attributes}]" if attributes else "") + ";\n")
+        for caller, callee in G.edges():
+            f.write(f"  {_dot_quote(caller)} -> {_dot_quote(callee)};\n")
+        f.write("}\n")
+
+
+def write_graphml(G, file_path: str):
+    """
+    将调用图写为 GraphML 文件，可以用 Gephi、Cytoscape 等工具打开。
+
+    GraphML 不支持 None 值，值为 None 的节点属性不会写出。
+
+    Args:
+        G (DiGraph): 调用图。
+        file_path (str): 文件路径。
+    """
+    H = nx.DiGraph()
+    H.add_nodes_from((node, {key: value for key, value in attributes.items() if value is not None}) for node, attributes in G.nodes(data=True))
+    H.add_edges_from(G.edges())
+    nx.write_graphml(H, file_path)
@@ -0,0 +1,414 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+
+# 不进入的目录：版本控制目录、第三方依赖和虚拟环境等
+VENDORED_DIRS = frozenset(
+    [
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        "bower_components",
+        "vendor",
+        "third_party",
+        "site-packages",
+        "__pycache__",
+        ".venv",
+        "venv",
+        ".tox",
+        ".nox",
+        ".mypy_cache",
+        ".pytest_cache",
+    ]
+)
+# 超过该大小的文件通常是生成的代码或压缩后的资源，不进入清单
+MAX_FILE_SIZE = 1024 * 1024
+
+# 扩展名到语言名称的映射
+EXTENSION_LANGUAGES = {
+    ".py": "python",
+    ".java": "java",
+    ".go": "go",
+    ".js": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".cpp": "cpp",
+    ".cc": "cpp",
+    ".cxx": "cpp",
+    ".hpp": "cpp",
+    ".c": "c",
+    ".h": "c",
+    ".php": "php",
+    ".rs": "rust",
+    ".rb": "ruby",
+    ".cs": "c#",
+    ".kt": "kotlin",
+    ".swift": "swift",
+    ".scala": "scala",
+    ".lua": "lua",
+    ".sh": "shell",
+    ".sql": "sql",
+    ".md": "markdown",
+}
+
+# 进程级的清单缓存：(仓库目录, 仓库版本) -> Manifest
+_MANIFEST_CACHE_SIZE = 16
+_manifests = OrderedDict()
+_manifests_lock = threading.Lock()
+
+
+class ManifestEntry(NamedTuple):
+    # 相对于仓库根目录的路径
+    path: str
+    abs_path: str
+    size: int
+    mtime_ns: int
+    # 扩展名（包括点号），没有扩展名时为空字符串
+    extension: str
+    # 根据扩展名识别的语言，无法识别时为 None
+    language: Optional[str]
+
+
+class Manifest:
+    def __init__(self, directory: str, entries: list, version: Optional[str] = None, stamps: Optional[dict] = None) -> None:
+        """
+        仓库的文件清单。
+
+        entries 的顺序与 os.walk 自顶向下遍历的顺序一致：先列出目录中的文件，再依次进入子目录。
+
+        Args:
+            directory (str): 仓库目录。
+            entries (list): ManifestEntry 的列表。
+            version (str, optional): 生成清单时的仓库版本，不是 git 仓库时为 None。
+            stamps (dict, optional): 扫描时读取的目录和 .gitignore 文件的路径到修改时间的映射，用于判断清单是否过期。
+        """
+        self.directory = directory
+        self.entries = entries
+        self.version = version
+        self.stamps = stamps or {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def files(self, extensions=None):
+        """
+        按扩展名筛选文件。
+
+        Args:
+            extensions (Iterable[str], optional): 需要的扩展名，例如 ['.py', '.js']。默认为 None，返回所有文件。
+
+        Returns:
+            list: ManifestEntry 的列表。
+        """
+        if extensions is None:
+            return list(self.entries)
+        extensions = set(extensions)
+        return [entry for entry in self.entries if entry.extension in extensions]
+
+    def is_current(self):
+        """
+        判断清单是否仍然与工作区一致。
+
+        在目录中新建、删除或重命名文件和子目录都会改变该目录的修改时间，因此只需要检查扫描过的目录
+        和 .gitignore 文件，不需要检查每个文件。只修改文件内容不会使清单过期，此时清单中记录的大小和
+        修改时间是扫描时的值。
+
+        Returns:
+            bool: 所有目录和 .gitignore 文件的修改时间都没有变化时为 True。
+        """
+        for path, mtime_ns in self.stamps.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+
+def file_extension(filename):
+    """
+    返回文件名的扩展名（包括点号），没有扩展名时返回空字符串。
+
+    与 os.path.splitext 不同，'.py' 这样以点号开头的文件名也会被识别为扩展名 '.py'，
+    与按 filename.endswith(扩展名) 筛选的结果一致。
+    """
+    index = filename.rfind(".")
+    return filename[index:] if index >= 0 else ""
+
+
+def _translate_gitignore_pattern(pattern):
+    """
+    将一条 .gitignore 模式转换为正则表达式。
+
+    Returns:
+        str: 匹配相对于 .gitignore 所在目录的路径的正则表达式。
+    """
+    # 模式中间或开头包含 '/' 时相对于 .gitignore 所在目录，否则可以匹配任意层级
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            regex += "[" + pattern[i + 1 : end].replace("!", "^", 1).replace("\\", "\\\\") + "]"
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex if anchored else "(?:.*/)?" + regex
+
+
+def _read_gitignore(path, base):
+    """
+    读取 .gitignore 文件。
+
+    Args:
+        path (str): .gitignore 文件路径。
+        base (str): .gitignore 所在目录相对于仓库根目录的路径前缀，根目录为空字符串。
+
+    Returns:
+        list: (base, 正则表达式, 是否取反, 是否只匹配目录) 元组的列表。
+    """
+    rules = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        rules.append((base, re.compile(_translate_gitignore_pattern(line)), negate, dir_only))
+    return rules
+
+
+def _is_ignored(relative_path, is_dir, rules):
+    """按 git 的规则判断路径是否被忽略：后出现的规则优先。"""
+    ignored = False
+    for base, regex, negate, dir_only in rules:
+        if dir_only and not is_dir:
+            continue
+        if regex.fullmatch(relative_path[len(base) :]):
+            ignored = not negate
+    return ignored
+
+
+def build_manifest(
+    directory: str,
+    max_file_size: Optional[int] = MAX_FILE_SIZE,
+    ignore_dirs=VENDORED_DIRS,
+    use_gitignore: bool = True,
+    version: Optional[str] = None,
+):
+    """
+    使用 os.scandir 扫描一次仓库目录，生成文件清单。
+
+    跳过 ignore_dirs 中的目录、.gitignore 忽略的文件和目录（只读取仓库目录内的 .gitignore）、
+    超过 max_file_size 的文件以及失效的符号链接；与 os.walk 一样，不进入指向目录的符号链接。
+
+    Args:
+        directory (str): 仓库目录。
+        max_file_size (int, optional): 文件大小上限（字节）。为 None 时不限制。
+        ignore_dirs (Iterable[str], optional): 不进入的目录名称。
+        use_gitignore (bool, optional): 是否应用 .gitignore 规则。默认为 True。
+        version (str, optional): 记录在清单中的仓库版本。
+
+    Returns:
+        Manifest: 文件清单。
+    """
+    entries = []
+    stamps = {}
+
+    def scan(path, relative_dir, rules):
+        try:
+            # 先记录目录的修改时间再列出内容，列出期间发生的变化会在下次检查时被发现
+            stamps[path] = os.stat(path).st_mtime_ns
+            with os.scandir(path) as iterator:
+                dir_entries = list(iterator)
+        except OSError:
+            return
+        if use_gitignore and any(entry.name == ".gitignore" for entry in dir_entries):
+            gitignore_path = os.path.join(path, ".gitignore")
+            try:
+                stamps[gitignore_path] = os.stat(gitignore_path).st_mtime_ns
+            except OSError:
+                pass
+            rules = rules + _read_gitignore(gitignore_path, relative_dir)
+        subdirs = []
+        for entry in dir_entries:
+            relative_path = relative_dir + entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if entry.name in ignore_dirs or entry.is_symlink() or _is_ignored(relative_path, True, rules):
+                    continue
+                subdirs.append(entry)
+                continue
+            if rules and _is_ignored(relative_path, False, rules):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if max_file_size is not None and stat.st_size > max_file_size:
+                continue
+            extension = file_extension(entry.name)
+            entries.append(
+                ManifestEntry(
+                    path=relative_path.replace("/", os.sep),
+                    abs_path=os.path.abspath(entry.path),
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    extension=extension,
+                    language=EXTENSION_LANGUAGES.get(extension.lower()),
+                )
+            )
+        for entry in subdirs:
+            scan(entry.path, relative_dir + entry.name + "/", rules)
+
+    scan(directory, "", [])
+    return Manifest(directory, entries, version, stamps)
+
+
+def _find_git_dir(directory):
+    """从 directory 向上查找 git 目录，找不到时返回 None。"""
+    path = os.path.abspath(directory)
+    while True:
+        git_path = os.path.join(path, ".git")
+        if os.path.isdir(git_path):
+            return git_path
+        if os.path.isfile(git_path):
+            # 工作树或子模块中的 .git 是一个指向真实 git 目录的文件
+            with open(git_path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+            if content.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(path, content[len("gitdir:") :].strip()))
+            return None
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def repo_version(directory):
+    """
+    返回仓库目录当前的版本标识。
+
+    版本由 HEAD 指向的提交和 git index 的修改时间组成，切换分支、提交、暂存都会改变版本；
+    工作区中未暂存的修改不会改变版本，由 Manifest.is_current 检查。
+
+    Args:
+        directory (str): 仓库目录。
+
+    Returns:
+        str: 版本标识。不是 git 仓库或无法解析 HEAD 时返回 None。
+    """
+    git_dir = _find_git_dir(directory)
+    if git_dir is None:
+        return None
+    try:
+        with open(os.path.join(git_dir, "HEAD"), "r", encoding="utf-8") as f:
+            head = f.read().strip()
+        if head.startswith("ref:"):
+            ref = head[len("ref:") :].strip()
+            commit = None
+            # 工作树的分支引用保存在公共 git 目录中
+            common_dir = git_dir
+            if os.path.isfile(os.path.join(git_dir, "commondir")):
+                with open(os.path.join(git_dir, "commondir"), "r", encoding="utf-8") as f:
+                    common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+            ref_path = os.path.join(common_dir, ref)
+            if os.path.isfile(ref_path):
+                with open(ref_path, "r", encoding="utf-8") as f:
+                    commit = f.read().strip()
+            elif os.path.isfile(os.path.join(common_dir, "packed-refs")):
+                with open(os.path.join(common_dir, "packed-refs"), "r", encoding="utf-8") as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) == 2 and parts[1] == ref:
+                            commit = parts[0]
+                            break
+            if commit is None:
+                return None
+        else:
+            commit = head
+        index_path = os.path.join(git_dir, "index")
+        index_mtime = os.stat(index_path).st_mtime_ns if os.path.exists(index_path) else 0
+    except OSError:
+        return None
+    return f"{commit}:{index_mtime}"
+
+
+def get_manifest(directory: str, refresh: bool = False):
+    """
+    获取仓库目录的文件清单。
+
+    git 仓库的清单按 (目录, 版本) 缓存在进程中，提取器、索引、接口服务等所有使用方共享同一份清单；
+    命中缓存时检查扫描过的目录的修改时间，工作区中新建、删除或重命名了文件（包括未暂存的修改）时重新扫描。
+    不是 git 仓库的目录每次都会重新扫描。
+
+    Args:
+        directory (str): 仓库目录。
+        refresh (bool, optional): 是否忽略缓存重新扫描。默认为 False。
+
+    Returns:
+        Manifest: 文件清单。
+    """
+    version = repo_version(directory)
+    if version is None:
+        return build_manifest(directory)
+    key = (os.path.abspath(directory), version)
+    if not refresh:
+        with _manifests_lock:
+            manifest = _manifests.get(key)
+            if manifest is not None:
+                _manifests.move_to_end(key)
+        # 检查目录的修改时间需要访问文件系统，不在锁内进行
+        if manifest is not None and manifest.is_current():
+            return manifest
+    manifest = build_manifest(directory, version=version)
+    with _manifests_lock:
+        _manifests[key] = manifest
+        _manifests.move_to_end(key)
+        while len(_manifests) > _MANIFEST_CACHE_SIZE:
+            _manifests.popitem(last=False)
+    return manifest
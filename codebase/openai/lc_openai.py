@@ -3,38 +3,47 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.prompts.chat import HumanMessagePromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain.schema import HumanMessage, AIMessage, SystemMessage
-from transformers import GPT2Tokenizer
-from langchain.text_splitter import CharacterTextSplitter
-import logging
 import asyncio
-from llm.functioncall.openai_function_call import OpenaiClient
+import functools
+from .llm_cache import LLMCache
+from .tokenizer import count_tokens, exceeds_tokens, get_tokenizer, truncate_tokens
 
 
 class ChatLLM:
-    def __init__(self, openai_api_key, model="gpt-3.5-turbo") -> None:
+    def __init__(self, openai_api_key, model="gpt-3.5-turbo", cache: LLMCache = None) -> None:
         # 初始化LangChainLLM类，设置OpenAI的API密钥和模型名称
         self.openai_api_key = openai_api_key
         self.model = model
-        # 设置日志级别以忽略警告
-        logging.getLogger("transformers.tokenization_utils_base").setLevel(logging.ERROR)
-        # 使用GPT2的tokenizer
-        self.tokenizer = GPT2Tokenizer.from_pretrained("gpt2")
+        # 响应的持久化缓存，相同的模型、instructions和prompt命中时不发送请求
+        self.cache = cache
+        # 使用进程内共享的GPT2快速tokenizer，只加载一次
+        self.tokenizer = get_tokenizer()
+        # 在这里导入：openai_function_call 经由 function.call_relation_search 导入 codebase.build_index，
+        # 在模块级导入会形成循环导入，使 codebase 中的模块不能直接作为入口运行
+        from llm.functioncall.openai_function_call import OpenaiClient
+
         self.client = OpenaiClient(self.openai_api_key)
 
     def count_tokenizer(self, text: str):
         # 计算给定文本的token数量
-        tokens = self.tokenizer.tokenize(text)
-        num_tokens = len(tokens)
-        return num_tokens
+        return count_tokens(text)
+
+    def exceeds_tokens(self, text: str, limit: int):
+        # 判断文本的token数量是否超过limit，明显较短或较长的文本不需要分词，超过limit时立即停止分词
+        return exceeds_tokens(text, limit)
 
     def split_text(self, text: str, nums_token: int):
-        # 根据指定的token数量分割文本
-        text_splitter = CharacterTextSplitter.from_huggingface_tokenizer(self.tokenizer, chunk_size=nums_token, chunk_overlap=0)
-        texts = text_splitter.split_text(text)
-        return texts[0]
+        # 按token偏移截取文本的前nums_token个token
+        return truncate_tokens(text, nums_token)
 
-    def chat(self, prompt, instructions=None):
+    def chat(self, prompt, instructions=None, refresh=False):
         # 使用指定的prompt和instructions进行聊天
+        # refresh为True时忽略缓存重新请求，并用新的响应替换缓存（例如上次的响应无法解析）
+        if not refresh:
+            cached = self.cached_response(prompt, instructions)
+            if cached is not None:
+                return cached
+        raw_prompt = prompt
         prompt = prompt.replace("{", "{{").replace("}", "}}")
         message =[]
         if instructions:
@@ -44,19 +53,26 @@ class ChatLLM:
             message.append({'content':prompt, 'role':"user"})
         response = self.client.chat_completion_request(message)
         # 调用链式处理并返回结果
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        self.cache_response(raw_prompt, instructions, content)
+        return content
 
-    # async def achat(self, prompt, instructions=None):
-    #     # 异步版本的chat方法
-    #     prompt = prompt.replace("{", "{{").replace("}", "}}")
-    #     if instructions:
-    #         chatprompt = [Message(content=instructions, role="system"), Message(content=prompt, role="user")]
-    #     else:
-    #         chatprompt = [Message(content=prompt, role="user")]
-    #     bot = OpenAIChat(api_key=self.openai_api_key, model=self.model)
-    #     response = await bot.async_chat(chatprompt, stream=False)
-    #     # 异步调用链式处理并返回结果
-    #     return response.content
+    def cached_response(self, prompt, instructions=None):
+        # 返回缓存中的响应，没有缓存或未命中时返回None
+        if self.cache is None:
+            return None
+        return self.cache.get(self.model, instructions, prompt)
+
+    def cache_response(self, prompt, instructions, response):
+        # 记录响应；也可以记录不是由这个prompt请求得到的响应（例如合并请求中拆分出的单个文件描述）
+        if self.cache is not None and response is not None:
+            self.cache.put(self.model, instructions, prompt, response)
+
+    async def achat(self, prompt, instructions=None, executor=None):
+        # 异步版本的chat方法：在线程池中执行同步请求（复用同一个客户端），不阻塞事件循环
+        # executor为None时使用事件循环默认的线程池，其线程数决定了同时进行的请求数上限
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(self.chat, prompt, instructions))
 
 
 class LangChainLLM:
@@ -64,22 +80,20 @@ class LangChainLLM:
         # 初始化LangChainLLM类，设置OpenAI的API密钥和模型名称
         self.openai_api_key = openai_api_key
         self.model = model
-        # 设置日志级别以忽略警告
-        logging.getLogger("transformers.tokenization_utils_base").setLevel(logging.ERROR)
-        # 使用GPT2的tokenizer
-        self.tokenizer = GPT2Tokenizer.from_pretrained("gpt2")
+        # 使用进程内共享的GPT2快速tokenizer，只加载一次
+        self.tokenizer = get_tokenizer()
 
     def count_tokenizer(self, text: str):
         # 计算给定文本的token数量
-        tokens = self.tokenizer.tokenize(text)
-        num_tokens = len(tokens)
-        return num_tokens
+        return count_tokens(text)
+
+    def exceeds_tokens(self, text: str, limit: int):
+        # 判断文本的token数量是否超过limit，明显较短或较长的文本不需要分词，超过limit时立即停止分词
+        return exceeds_tokens(text, limit)
 
     def split_text(self, text: str, nums_token: int):
-        # 根据指定的token数量分割文本
-        text_splitter = CharacterTextSplitter.from_huggingface_tokenizer(self.tokenizer, chunk_size=nums_token, chunk_overlap=0)
-        texts = text_splitter.split_text(text)
-        return texts[0]
+        # 按token偏移截取文本的前nums_token个token
+        return truncate_tokens(text, nums_token)
 
     def chat(self, prompt, instructions=None):
         # 使用指定的prompt和instructions进行聊天
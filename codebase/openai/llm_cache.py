@@ -0,0 +1,94 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# 缓存的默认容量（响应文本的总字节数）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(model: str, instructions, prompt: str):
+    """
+    返回请求的缓存键：模型、提示词模板（instructions）的哈希和完整提示词（包含文件路径和内容）的哈希。
+
+    文件内容、模型或提示词模板任何一个变化都会得到不同的键。
+    """
+    instructions_hash = hashlib.sha1((instructions or "").encode("utf-8")).hexdigest()
+    prompt_hash = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+    return f"{model}\0{instructions_hash}\0{prompt_hash}"
+
+
+class LLMCache:
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        LLM 响应的持久化缓存，保存在缓存目录的 `llm_cache.sqlite` 中。
+
+        以 (模型, 提示词模板哈希, 提示词哈希) 为键保存响应文本；超过 max_bytes 时按最近最少使用的顺序淘汰。
+        每个线程使用自己的连接，数据库使用 WAL 模式，多个线程或进程可以同时读写。
+
+        Args:
+            cache_dir (str): 缓存目录。
+            max_bytes (int, optional): 响应文本的总字节数上限。默认为 DEFAULT_MAX_BYTES。
+        """
+        self.cache_dir = cache_dir
+        self.cache_path = os.path.join(cache_dir, "llm_cache.sqlite")
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(cache_dir, exist_ok=True)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+    @property
+    def connection(self):
+        """当前线程的连接。"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.cache_path, timeout=30)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, model: str, instructions, prompt: str):
+        """
+        查找缓存的响应，命中时更新最近使用时间。
+
+        Returns:
+            str: 命中时返回响应文本，否则返回 None。
+        """
+        key = cache_key(model, instructions, prompt)
+        with self.connection:
+            row = self.connection.execute("SELECT response FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+        return row[0]
+
+    def put(self, model: str, instructions, prompt: str, response: str):
+        """记录响应，超过容量时淘汰最近最少使用的条目。"""
+        key = cache_key(model, instructions, prompt)
+        size = len(response.encode("utf-8"))
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, response, size, time.time_ns()))
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # 从最久未使用的条目开始删除，直到总大小不超过上限
+            excess = total - self.max_bytes
+            evicted = []
+            for evicted_key, evicted_size in self.connection.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                if excess <= 0:
+                    break
+                evicted.append((evicted_key,))
+                excess -= evicted_size
+            self.connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def clear(self):
+        """清空缓存。"""
+        with self.connection:
+            self.connection.execute("DELETE FROM entries")
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
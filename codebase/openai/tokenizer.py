@@ -0,0 +1,135 @@
+import logging
+import threading
+
+from transformers import GPT2TokenizerFast
+
+
+TOKENIZER_NAME = "gpt2"
+
+# 进程级共享的分词器，只加载一次
+_tokenizer = None
+_max_token_bytes = 0
+_tokenizer_lock = threading.Lock()
+
+
+def _usable(tokenizer):
+    # 词表为空的分词器对任何文本都返回 0 个 token，不能用于计数
+    return tokenizer.vocab_size > 0 and len(tokenizer.backend_tokenizer.encode("hello world", add_special_tokens=False).ids) > 0
+
+
+def get_tokenizer():
+    """
+    获取进程内共享的 GPT-2 快速分词器（Rust 实现）。
+
+    第一次调用时只从本地的 Hugging Face 缓存加载，不访问网络；本地没有缓存时才下载一次，之后都从缓存加载。
+    较新的 transformers 在本地没有缓存时不抛出异常，而是返回词表为空的分词器，此时同样重新下载；
+    仍然无法得到可用的分词器时抛出异常，不会用空词表计数（所有文本都会被当作 0 个 token）。
+    同一进程中的所有 ChatLLM、LangChainLLM 实例共用同一个分词器。
+
+    Returns:
+        GPT2TokenizerFast: 分词器。
+
+    Raises:
+        RuntimeError: 下载之后分词器的词表仍然为空。
+    """
+    global _tokenizer, _max_token_bytes
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                # 设置日志级别以忽略警告
+                logging.getLogger("transformers.tokenization_utils_base").setLevel(logging.ERROR)
+                try:
+                    tokenizer = GPT2TokenizerFast.from_pretrained(TOKENIZER_NAME, local_files_only=True)
+                except OSError:
+                    tokenizer = None
+                if tokenizer is None or not _usable(tokenizer):
+                    tokenizer = GPT2TokenizerFast.from_pretrained(TOKENIZER_NAME)
+                if not _usable(tokenizer):
+                    raise RuntimeError(f"Tokenizer {TOKENIZER_NAME} has an empty vocabulary, check the Hugging Face cache or network access")
+                # 字节级 BPE 的词表中每个字符对应一个字节，最长的 token 决定了每个 token 最多覆盖的字节数
+                _max_token_bytes = max((len(token) for token in tokenizer.get_vocab()), default=0)
+                _tokenizer = tokenizer
+    return _tokenizer
+
+
+def _encode(text: str):
+    # 直接调用 Rust 分词器，不经过 transformers 的长度检查
+    return get_tokenizer().backend_tokenizer.encode(text, add_special_tokens=False)
+
+
+def count_tokens(text: str):
+    """返回文本的 token 数。"""
+    if not text:
+        return 0
+    return len(_encode(text).ids)
+
+
+def exceeds_tokens(text: str, limit: int):
+    """
+    判断文本的 token 数是否超过 limit，不一定需要对整个文本分词。
+
+    字节级 BPE 的每个 token 至少覆盖一个字节、至多覆盖词表中最长 token 的字节数，因此字节数不超过 limit 的文本
+    一定不超过，字节数超过 limit 乘以最长 token 字节数的文本一定超过，这两种情况都不需要分词。
+    其余情况按换行符分块分词，累计的 token 数超过 limit 时立即返回。
+
+    Args:
+        text (str): 文本。
+        limit (int): token 数上限。
+
+    Returns:
+        bool: token 数超过 limit 时为 True。
+    """
+    # UTF-8 中每个字符最多 4 个字节
+    if len(text) * 4 <= limit:
+        return False
+    size = len(text.encode("utf-8"))
+    if size <= limit:
+        return False
+    get_tokenizer()
+    if _max_token_bytes and size > limit * _max_token_bytes:
+        return True
+    # 平均每个 token 约 4 个字符，每块大约对应 limit 个 token
+    window = max(limit * 4, 1024)
+    total = 0
+    start = 0
+    while start < len(text):
+        end = min(start + window, len(text))
+        if end < len(text):
+            newline = text.rfind("\n", start, end)
+            if newline > start:
+                end = newline + 1
+        total += count_tokens(text[start:end])
+        if total > limit:
+            return True
+        start = end
+    return False
+
+
+def truncate_tokens(text: str, max_tokens: int):
+    """
+    返回文本中前 max_tokens 个 token 对应的前缀，按 token 的字符偏移截断，不重新切分文本。
+
+    只对足够长的前缀分词，分词的开销与 max_tokens 成正比，与文本长度无关。
+
+    Args:
+        text (str): 文本。
+        max_tokens (int): 保留的 token 数。
+
+    Returns:
+        str: 截断后的文本，不超过 max_tokens 时返回原文本。
+    """
+    if max_tokens <= 0:
+        return ""
+    if not exceeds_tokens(text, max_tokens):
+        return text
+    prefix_length = max_tokens * 8
+    while True:
+        prefix = text[:prefix_length]
+        offsets = _encode(prefix).offsets
+        if len(offsets) > max_tokens or len(prefix) == len(text):
+            break
+        prefix_length *= 2
+    if len(offsets) <= max_tokens:
+        return text
+    # 第 max_tokens + 1 个 token 的起始位置，多个 token 共享同一个字符（例如多字节字符）时不会把字符切开
+    return text[: offsets[max_tokens][0]]
@@ -0,0 +1,132 @@
+from tree_sitter import Language, Parser
+import os
+import platform
+import threading
+
+
+BUILD_DIR = os.path.join(os.path.dirname(__file__), "build")
+
+# 进程级的语言注册表：每种语言只加载一次动态库
+_languages = {}
+_languages_lock = threading.Lock()
+# 进程级的查询缓存：(语言, 查询语句) 只编译一次
+_queries = {}
+_queries_lock = threading.Lock()
+# Parser 不是线程安全的，每个线程为每种语言复用一个 Parser
+_local = threading.local()
+
+
+def library_extension():
+    """
+    根据操作系统确定 tree-sitter 动态库的扩展名。
+
+    Returns:
+        str: 'dll'、'dylib' 或 'so'。
+    """
+    system = platform.system()
+    if system == "Windows":
+        return "dll"
+    elif system == "Darwin":
+        return "dylib"
+    else:  # Assume Linux if not Windows or macOS
+        return "so"
+
+
+def language_library_path(language):
+    """
+    返回指定语言的 tree-sitter 动态库路径。
+
+    Args:
+        language (str): tree-sitter 语言名称，例如 'python'。
+
+    Returns:
+        str: 动态库文件路径。
+    """
+    return os.path.join(BUILD_DIR, f"tree-sitter-{language}.{library_extension()}")
+
+
+def get_language(language):
+    """
+    获取指定语言的 Language 对象。
+
+    同一进程内每种语言只会构造一次 Language（即只 dlopen 一次动态库），之后直接复用缓存。
+
+    Args:
+        language (str): tree-sitter 语言名称。
+
+    Returns:
+        Language: 已加载的语言对象。
+    """
+    lang = _languages.get(language)
+    if lang is None:
+        with _languages_lock:
+            lang = _languages.get(language)
+            if lang is None:
+                lang = Language(language_library_path(language), language)
+                _languages[language] = lang
+    return lang
+
+
+def get_query(language, query_source):
+    """
+    获取编译好的 tree-sitter 查询。
+
+    同一进程内相同语言的相同查询语句只编译一次，之后直接复用缓存。
+
+    Args:
+        language (str): tree-sitter 语言名称。
+        query_source (str): 查询语句。
+
+    Returns:
+        Query: 已编译的查询对象。
+    """
+    key = (language, query_source)
+    query = _queries.get(key)
+    if query is None:
+        with _queries_lock:
+            query = _queries.get(key)
+            if query is None:
+                query = get_language(language).query(query_source)
+                _queries[key] = query
+    return query
+
+
+def get_parser(language):
+    """
+    从解析器池中获取当前线程的 Parser。
+
+    每个线程为每种语言保留一个已设置好语言的 Parser，重复解析时无需重新创建。
+
+    Args:
+        language (str): tree-sitter 语言名称。
+
+    Returns:
+        Parser: 已设置语言的解析器。
+    """
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    parser = parsers.get(language)
+    if parser is None:
+        parser = Parser()
+        parser.set_language(get_language(language))
+        parsers[language] = parser
+    return parser
+
+
+def parse_source(source_code, language, old_tree=None):
+    """
+    使用解析器池解析源码。
+
+    Args:
+        source_code (bytes): 源码字节串。
+        language (str): tree-sitter 语言名称。
+        old_tree (Tree, optional): 旧的语法树，用于增量解析。
+
+    Returns:
+        Tree: 解析得到的语法树。
+    """
+    parser = get_parser(language)
+    if old_tree is None:
+        return parser.parse(source_code)
+    return parser.parse(source_code, old_tree)
@@ -401,3 +401,48 @@ You must abide by the following rules:
 - Ensure the output can be parsed by Python json.loads.
 - Don't output in markdown format, something like ```json or ```,just output in the corresponding string format
 """
+
+FILE_DESCRIPTIONS_PROMPT = """
+    Your job is to summarize the contents of the document.
+    Follow these rules strictly:
+        - For code files, it summarizes each class and function, describing what each does.
+        - For text files, it directly intermediates the text content.
+        - The response is a clear, unambiguous paragraph summary without additional analysis.
+    """
+
+PACKED_FILE_DESCRIPTIONS_PROMPT = """
+Your job is to summarize the contents of several documents, each one separately.
+Follow these rules strictly:
+- For code files, it summarizes each class and function, describing what each does.
+- For text files, it directly intermediates the text content.
+- Each description is a clear, unambiguous paragraph summary without additional analysis.
+- Describe every document in the input exactly once, file_path is the file path given in the input, unchanged.
+You should only respond in JSON format as described below
+Response Format:
+[
+    {
+        "file_path": "",
+        "descriptions": ""
+    }
+]
+You must abide by the following rules:
+- Ensure the output can be parsed by Python json.loads.
+- Don't output in markdown format, something like ```json or ```,just output in the corresponding string format
+"""
+
+FILE_CHUNK_DESCRIPTIONS_PROMPT = """
+    Your job is to summarize one part of a document that is too long to be read at once.
+    Follow these rules strictly:
+        - For code, it summarizes each class and function in this part, describing what each does.
+        - For text, it directly intermediates the text content of this part.
+        - The response is a clear, unambiguous paragraph summary of this part only, without additional analysis.
+    """
+
+FILE_REDUCE_DESCRIPTIONS_PROMPT = """
+    Your job is to combine the summaries of consecutive parts of one document into a summary of the whole document.
+    Follow these rules strictly:
+        - For code files, it summarizes each class and function, describing what each does.
+        - For text files, it directly intermediates the text content.
+        - Keep every class and function mentioned in the part summaries, and do not invent content that is not in them.
+        - The response is a clear, unambiguous paragraph summary without additional analysis.
+    """
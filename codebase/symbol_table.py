@@ -0,0 +1,229 @@
+from collections import Counter
+
+
+class SymbolTable:
+    def __init__(self, separator: str = ".") -> None:
+        """
+        一次分析中所有函数定义的符号表，按 (模块, 类, 名称) 建立索引。
+
+        模块由各语言的提取器根据文件路径确定（例如 Python 的点分模块名、Go 的包目录），
+        类为 None 表示模块级函数。每次查找都是字典访问，解析一个调用点的开销与仓库大小无关。
+        符号表按文件登记，可以在文件变化时增量地删除和重新添加，供监视模式使用。
+
+        Args:
+            separator (str, optional): 模块名的分隔符，例如 Python 为 '.'，以目录作为模块的语言为 '/'。默认为 '.'。
+        """
+        self.separator = separator
+        # (模块, 类, 名称) -> {相对路径: 函数标识符}
+        self._symbols = {}
+        # (模块, 类) -> {相对路径: 基类名称列表}
+        self._classes = {}
+        # 类名 -> {模块: 定义该类的文件数}
+        self._class_modules = {}
+        # 模块 -> 属于该模块的文件数
+        self._modules = Counter()
+        # 模块名的最后一段 -> 模块集合，用于按后缀匹配导入的模块
+        self._modules_by_last = {}
+        self._module_cache = {}
+        # 模块 -> {相对路径: (导入的名称, 导入全部名称的模块)}，用于跟踪模块重新导出的名称
+        self._module_imports = {}
+        # 函数标识符 -> 定义它的文件数
+        self._ids = Counter()
+        # 相对路径 -> (模块, 登记的符号, 登记的类)
+        self._files = {}
+        # 解析过程中可以复用的中间结果，符号表变化时清空
+        self.memo = {}
+
+    def __contains__(self, function_id):
+        return function_id in self._ids
+
+    def add_file(self, relative_path, module, result):
+        """
+        登记单个文件定义的函数和类。同一文件重复登记时先删除旧的记录。
+
+        Args:
+            relative_path (str): 文件的相对路径。
+            module (str): 文件所属的模块。
+            result (dict): 单文件提取结果，使用其中的 'functions'、'bases'、'imports' 和 'wildcard_imports'。
+        """
+        if relative_path in self._files:
+            self.remove_file(relative_path)
+        self.memo.clear()
+        keys = []
+        classes = set()
+        for function_id, info in result["functions"].items():
+            class_name = info.get("class")
+            name = function_id[len(class_name) + 1 :] if class_name and function_id.startswith(class_name + ".") else function_id
+            key = (module, class_name, name)
+            self._symbols.setdefault(key, {})[relative_path] = function_id
+            self._ids[function_id] += 1
+            keys.append(key)
+            if class_name:
+                classes.add(class_name)
+        bases = result.get("bases", {})
+        classes.update(bases)
+        for class_name in classes:
+            self._classes.setdefault((module, class_name), {})[relative_path] = bases.get(class_name, [])
+            modules = self._class_modules.setdefault(class_name, {})
+            modules[module] = modules.get(module, 0) + 1
+        self._module_imports.setdefault(module, {})[relative_path] = (result.get("imports", {}), result.get("wildcard_imports", []))
+        self._modules[module] += 1
+        if self._modules[module] == 1:
+            self._modules_by_last.setdefault(self._last_part(module), set()).add(module)
+            self._module_cache.clear()
+        self._files[relative_path] = (module, keys, classes)
+
+    def remove_file(self, relative_path):
+        """
+        删除单个文件登记的函数和类。
+
+        Args:
+            relative_path (str): 文件的相对路径。
+        """
+        entry = self._files.pop(relative_path, None)
+        if entry is None:
+            return
+        self.memo.clear()
+        module, keys, classes = entry
+        del self._module_imports[module][relative_path]
+        if not self._module_imports[module]:
+            del self._module_imports[module]
+        for key in keys:
+            files = self._symbols[key]
+            function_id = files.pop(relative_path)
+            if not files:
+                del self._symbols[key]
+            self._ids[function_id] -= 1
+            if self._ids[function_id] == 0:
+                del self._ids[function_id]
+        for class_name in classes:
+            files = self._classes[(module, class_name)]
+            del files[relative_path]
+            if not files:
+                del self._classes[(module, class_name)]
+            modules = self._class_modules[class_name]
+            modules[module] -= 1
+            if modules[module] == 0:
+                del modules[module]
+                if not modules:
+                    del self._class_modules[class_name]
+        self._modules[module] -= 1
+        if self._modules[module] == 0:
+            del self._modules[module]
+            self._modules_by_last[self._last_part(module)].discard(module)
+            self._module_cache.clear()
+
+    def signature(self, relative_path):
+        """
+        返回文件登记的符号，用于判断文件的修改是否改变了其他文件中调用的解析结果。
+        """
+        entry = self._files.get(relative_path)
+        if entry is None:
+            return None
+        module, keys, classes = entry
+        symbols = sorted((repr(key), self._symbols[key][relative_path]) for key in keys)
+        bases = sorted((class_name, self._classes[(module, class_name)][relative_path]) for class_name in classes)
+        return module, symbols, bases, self._module_imports[module][relative_path]
+
+    def _last_part(self, module):
+        return module.rsplit(self.separator, 1)[-1]
+
+    def lookup(self, module, class_name, name):
+        """
+        按 (模块, 类, 名称) 查找函数，找不到时返回 None。
+
+        Returns:
+            str: 函数标识符。
+        """
+        files = self._symbols.get((module, class_name, name))
+        if not files:
+            return None
+        return min(files.values())
+
+    def module_imports(self, module):
+        """
+        返回模块中各文件的导入，按文件路径排序。
+
+        Returns:
+            list: (导入的名称, 导入全部名称的模块) 元组的列表。
+        """
+        files = self._module_imports.get(module, {})
+        return [files[relative_path] for relative_path in sorted(files)]
+
+    def has_class(self, module, class_name):
+        return (module, class_name) in self._classes
+
+    def _class_candidates(self, class_name, module=None):
+        if module is not None and (module, class_name) in self._classes:
+            return [(module, class_name)]
+        return [(candidate, class_name) for candidate in sorted(self._class_modules.get(class_name, ()))]
+
+    def lookup_method(self, class_name, name, module=None, skip_self=False):
+        """
+        在类及其基类中查找方法，按广度优先的顺序检查基类。
+
+        Args:
+            class_name (str): 类名。
+            name (str): 方法名。
+            module (str, optional): 类所在的模块。为 None 或该模块中没有这个类时，在所有定义了同名类的模块中查找。
+            skip_self (bool, optional): 是否跳过类本身只查找基类，用于 super() 调用。
+
+        Returns:
+            str: 函数标识符，找不到时返回 None。
+        """
+        if not class_name:
+            return None
+        classes = self._class_candidates(class_name, module)
+        visited = set(classes)
+        queue = [] if skip_self else list(classes)
+        if skip_self:
+            for candidate in classes:
+                self._enqueue_bases(candidate, queue, visited)
+        position = 0
+        while position < len(queue):
+            class_module, current = queue[position]
+            function_id = self.lookup(class_module, current, name)
+            if function_id is not None:
+                return function_id
+            self._enqueue_bases(queue[position], queue, visited)
+            position += 1
+        return None
+
+    def _enqueue_bases(self, class_key, queue, visited):
+        class_module = class_key[0]
+        for bases in self._classes.get(class_key, {}).values():
+            for base in bases:
+                for candidate in self._class_candidates(base.rsplit(".", 1)[-1], class_module):
+                    if candidate not in visited:
+                        visited.add(candidate)
+                        queue.append(candidate)
+
+    def resolve_module(self, name):
+        """
+        将导入语句中的模块名解析为符号表中的模块。
+
+        优先完全匹配；否则按路径后缀匹配，例如仓库中的 'src.pkg.mod' 可以匹配导入的 'pkg.mod'，
+        仓库中的 'pkg/mod' 可以匹配 Go 导入路径 'github.com/user/repo/pkg/mod'。有多个候选时取最长的匹配。
+
+        Args:
+            name (str): 导入的模块名或路径，使用与符号表相同的分隔符。
+
+        Returns:
+            str: 模块，找不到时返回 None。
+        """
+        if name in self._module_cache:
+            return self._module_cache[name]
+        separator = self.separator
+        module = None
+        if name in self._modules:
+            module = name
+        else:
+            candidates = [
+                candidate
+                for candidate in self._modules_by_last.get(name.rsplit(separator, 1)[-1], ())
+                if candidate.endswith(separator + name) or name.endswith(separator + candidate)
+            ]
+            if candidates:
+                module = max(candidates, key=lambda candidate: (len(candidate), candidate))
+        self._module_cache[name] = module
+        return module
@@ -0,0 +1,399 @@
+"""
+监视仓库目录，文件变化时增量更新调用图（以及可选的向量索引）。
+
+用法:
+    python -m codebase.watch <目录> [--language python] [--output-dir output] [--interval 1.0]
+"""
+import argparse
+import hashlib
+import os
+import time
+from typing import Optional
+
+import networkx as nx
+
+from .build_index import GraphIndex
+from .language_extract import get_extract_class
+from .manifest import build_manifest
+from .parser_pool import parse_source
+
+
+def _common_prefix_length(a, b):
+    """二分比较切片，求两个字节串的公共前缀长度（切片比较在 C 中完成）。"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _point(source_code, byte):
+    """返回字节偏移对应的 (行, 列)，列以字节计，与 tree-sitter 的 Point 一致。"""
+    row = source_code.count(b"\n", 0, byte)
+    return row, byte - (source_code.rfind(b"\n", 0, byte) + 1)
+
+
+def compute_edit(old_source, new_source):
+    """
+    比较文件修改前后的内容，求出 Tree.edit 需要的编辑范围。
+
+    编辑范围为去掉公共前缀和公共后缀之后的部分。
+
+    Args:
+        old_source (bytes): 修改前的内容。
+        new_source (bytes): 修改后的内容。
+
+    Returns:
+        dict: Tree.edit 的关键字参数。
+    """
+    prefix = _common_prefix_length(old_source, new_source)
+    # 公共后缀不能与公共前缀重叠
+    max_suffix = min(len(old_source), len(new_source)) - prefix
+    suffix = _common_prefix_length(old_source[len(old_source) - max_suffix :][::-1], new_source[len(new_source) - max_suffix :][::-1])
+    old_end_byte = len(old_source) - suffix
+    new_end_byte = len(new_source) - suffix
+    return {
+        "start_byte": prefix,
+        "old_end_byte": old_end_byte,
+        "new_end_byte": new_end_byte,
+        "start_point": _point(old_source, prefix),
+        "old_end_point": _point(old_source, old_end_byte),
+        "new_end_point": _point(new_source, new_end_byte),
+    }
+
+
+def watch_graph_id(directory, language):
+    """
+    返回监视模式保存调用图使用的 id：`watch-` 加上目录和语言的摘要。
+
+    analyze_directory 生成的图索引以内容摘要为 id（见 GraphIndex.graph_id），同一个 id 的图索引不能被改写；
+    监视模式每次更新都覆盖同一个 id 的调用图，因此使用与内容无关的单独 id。
+    """
+    key = hashlib.sha1(f"{os.path.abspath(directory)}\0{get_extract_class(language)(directory).language}".encode("utf-8")).hexdigest()[:16]
+    return f"watch-{key}"
+
+
+class IncrementalCallGraph:
+    def __init__(self, extract) -> None:
+        """
+        可以按文件增量更新的调用图。
+
+        记录每个文件的提取结果、每个函数由哪些文件定义、符号表以及每个文件解析后的调用。
+        文件变化时，只更新该文件定义的函数节点和涉及的边：文件只修改了函数体时只重新解析该文件的调用；
+        定义的函数或类发生变化时，其他文件中调用的解析结果可能随之改变，此时用更新后的符号表
+        重新解析所有文件的调用（只是字典查找，不需要重新解析语法树）。
+        得到的图与对全部文件重新运行 GraphIndex.analyze_directory 构建的调用图相同。
+
+        Args:
+            extract (BaseExtract): 对应语言的提取器，用于按该语言的规则解析调用关系。
+        """
+        self.extract = extract
+        self.graph = nx.DiGraph()
+        # 相对路径 -> 单文件提取结果
+        self.results = {}
+        # 相对路径 -> 文件顺序，同名函数以顺序靠后的文件为准，与批量合并一致
+        self.file_order = {}
+        self._next_order = 0
+        # 函数标识符 -> {相对路径: 函数信息}
+        self.definitions = {}
+        # 函数标识符 -> 当前生效的函数信息
+        self.functions = {}
+        self.symbols = extract.build_symbol_table([])
+        # 相对路径 -> {(调用者, 被调用者): 该文件中最后一个调用点的属性}
+        self.resolved = {}
+        # (调用者, 被调用者) -> {相对路径: 该文件中最后一个调用点的属性}
+        self.call_sites = {}
+
+    def set_file_order(self, relative_paths):
+        """
+        按目录遍历顺序重新设置文件顺序，使新增文件与批量分析时处于相同的位置。
+
+        Args:
+            relative_paths (Iterable[str]): 按遍历顺序排列的相对路径。
+        """
+        self.file_order = {relative_path: order for order, relative_path in enumerate(relative_paths)}
+        self._next_order = len(self.file_order)
+
+    def update_file(self, relative_path, result):
+        """
+        用文件的新提取结果替换旧结果，并增量更新调用图。
+
+        Args:
+            relative_path (str): 文件的相对路径。
+            result (dict): 单文件提取结果。
+        """
+        self.update_files({relative_path: result})
+
+    def remove_file(self, relative_path):
+        """
+        删除文件的提取结果，并增量更新调用图。
+
+        Args:
+            relative_path (str): 文件的相对路径。
+        """
+        self.update_files({relative_path: None})
+
+    def update_files(self, changes):
+        """
+        一次应用多个文件的变化，所有文件的符号更新完成后只重新解析一次调用。
+
+        Args:
+            changes (dict): 相对路径到新的单文件提取结果的映射，结果为 None 表示文件被删除。
+        """
+        changed_functions = set()
+        resolve_all = False
+        for relative_path, new_result in changes.items():
+            old_result = self.results.pop(relative_path, None)
+            if old_result is None and new_result is None:
+                continue
+            old_signature = self.symbols.signature(relative_path)
+            if old_result is not None:
+                for function_id in old_result["functions"]:
+                    self.definitions[function_id].pop(relative_path, None)
+                    changed_functions.add(function_id)
+                self.symbols.remove_file(relative_path)
+            if new_result is not None:
+                if relative_path not in self.file_order:
+                    self.file_order[relative_path] = self._next_order
+                    self._next_order += 1
+                self.results[relative_path] = new_result
+                for function_id, info in new_result["functions"].items():
+                    self.definitions.setdefault(function_id, {})[relative_path] = info
+                    changed_functions.add(function_id)
+                self.symbols.add_file(relative_path, self.extract.module_name(relative_path), new_result)
+            else:
+                self.file_order.pop(relative_path, None)
+            resolve_all = resolve_all or self.symbols.signature(relative_path) != old_signature
+
+        # 更新函数节点：同名函数以顺序靠后的文件为准
+        for function_id in changed_functions:
+            files = self.definitions[function_id]
+            if files:
+                info = files[max(files, key=self.file_order.__getitem__)]
+                self.functions[function_id] = info
+                if function_id in self.graph:
+                    attributes = self.graph.nodes[function_id]
+                    attributes.clear()
+                    attributes.update(info)
+                else:
+                    self.graph.add_node(function_id, **info)
+            else:
+                del self.definitions[function_id]
+                self.functions.pop(function_id, None)
+
+        # 重新解析受影响文件的调用，并更新每条边所在的文件
+        affected_calls = set()
+        for relative_path in dict.fromkeys(list(self.resolved) + list(self.results)) if resolve_all else changes:
+            old_calls = self.resolved.pop(relative_path, None)
+            if old_calls is None and relative_path not in self.results:
+                continue
+            for pair in old_calls or {}:
+                del self.call_sites[pair][relative_path]
+                affected_calls.add(pair)
+            if relative_path in self.results:
+                calls = {}
+                for call in self.extract.resolve_file_calls(self.results[relative_path], self.symbols):
+                    calls[(call["caller"], call["callee"])] = {k: v for k, v in call.items() if k not in ["caller", "callee"]}
+                for pair, attributes in calls.items():
+                    self.call_sites.setdefault(pair, {})[relative_path] = attributes
+                    affected_calls.add(pair)
+                self.resolved[relative_path] = calls
+
+        # 更新边：解析后的调用仍然存在时保留。批量构建时同一条边的属性被后面的调用点覆盖，
+        # 因此取顺序最靠后的文件中最后一个调用点的 file_path 和 line
+        for caller, callee in affected_calls:
+            pair = (caller, callee)
+            files = self.call_sites.get(pair)
+            if files:
+                for function_id in pair:
+                    if function_id not in self.graph:
+                        self.graph.add_node(function_id, **self.functions.get(function_id, {}))
+                attributes = files[max(files, key=self.file_order.__getitem__)]
+                if self.graph.has_edge(caller, callee):
+                    edge = self.graph.edges[caller, callee]
+                    edge.clear()
+                    edge.update(attributes)
+                else:
+                    self.graph.add_edge(caller, callee, **attributes)
+            else:
+                self.call_sites.pop(pair, None)
+                if self.graph.has_edge(caller, callee):
+                    self.graph.remove_edge(caller, callee)
+
+        # 删除不再定义、也不再被任何边引用的节点
+        for function_id in changed_functions | {function_id for pair in affected_calls for function_id in pair}:
+            if function_id not in self.functions and function_id in self.graph and self.graph.degree(function_id) == 0:
+                self.graph.remove_node(function_id)
+
+
+class RepositoryWatcher:
+    def __init__(
+        self,
+        directory: str,
+        language: str = "python",
+        graph_index=None,
+        graph_id: Optional[str] = None,
+        index_store=None,
+        interval: float = 1.0,
+    ) -> None:
+        """
+        监视仓库目录，文件变化时增量重新解析并更新调用图。
+
+        每个文件的内容和语法树都保存在内存中。轮询时通过文件清单比较大小和修改时间找出变化的文件，
+        把修改前后的内容差异转换为 Tree.edit，再以旧语法树为基础增量解析，
+        然后只更新该文件影响的函数节点和调用边。
+
+        Args:
+            directory (str): 仓库目录。
+            language (str, optional): 语言类型，支持 GraphIndex.analyze_directory 的各种别名。默认为 'python'。
+            graph_index (GraphIndex, optional): 指定时，每次更新后把调用图保存到它的输出目录（不绘制图片）。
+            graph_id (str, optional): 保存调用图使用的 id。默认为 watch_graph_id，不会改写 analyze_directory 生成的图索引。
+            index_store (IndexStore, optional): 指定时，同步增量更新变化文件的向量索引文档块。
+            interval (float, optional): 轮询间隔（秒）。默认为 1.0。
+        """
+        self.directory = directory
+        self.extract = get_extract_class(language)(directory)
+        self.call_graph = IncrementalCallGraph(self.extract)
+        self.graph_index = graph_index
+        self.graph_id = graph_id if graph_id is not None else watch_graph_id(directory, language)
+        self.index_store = index_store
+        self.interval = interval
+        # 相对路径 -> (大小, 修改时间, 内容, 语法树)
+        self.files = {}
+
+    @property
+    def graph(self):
+        return self.call_graph.graph
+
+    def _scan(self):
+        # 每次都重新扫描，不使用按仓库版本缓存的清单：未提交的修改同样需要被发现
+        manifest = build_manifest(self.directory)
+        return {entry.path: entry for entry in manifest.files([self.extract.file_extension])}
+
+    def _update_file(self, relative_path, entry):
+        """重新读取并增量解析一个文件，返回新的提取结果，内容没有变化时返回 None。"""
+        with open(entry.abs_path, "rb") as file:
+            source_code = file.read()
+        old = self.files.get(relative_path)
+        if old is not None and old[2] == source_code:
+            self.files[relative_path] = (entry.size, entry.mtime_ns, source_code, old[3])
+            return None
+        if old is None:
+            tree = parse_source(source_code, self.extract.language)
+        else:
+            old_tree = old[3]
+            old_tree.edit(**compute_edit(old[2], source_code))
+            tree = parse_source(source_code, self.extract.language, old_tree)
+        self.files[relative_path] = (entry.size, entry.mtime_ns, source_code, tree)
+        return self.extract.extract_tree(tree, source_code, relative_path)
+
+    def start(self):
+        """
+        解析仓库中的所有文件，建立初始的调用图。
+
+        Returns:
+            Graph: 调用图。
+        """
+        entries = self._scan()
+        self.call_graph.set_file_order(entries)
+        changes = {}
+        for relative_path, entry in entries.items():
+            result = self._update_file(relative_path, entry)
+            if result is not None:
+                changes[relative_path] = result
+        self.call_graph.update_files(changes)
+        self._save()
+        if self.index_store is not None:
+            # 补齐启动前发生的修改，未变化的文档块不会重新计算向量
+            for relative_path in self.files:
+                self.index_store.update_file(os.path.join(self.directory, relative_path))
+        return self.graph
+
+    def poll(self):
+        """
+        检查一次文件变化，并增量更新调用图和向量索引。
+
+        Returns:
+            tuple: (changed, removed)，内容发生变化（包括新增）的文件和被删除的文件的相对路径列表。
+        """
+        entries = self._scan()
+        # 先删除已经不存在的文件，再按新的遍历顺序更新变化的文件
+        removed = [relative_path for relative_path in self.files if relative_path not in entries]
+        for relative_path in removed:
+            del self.files[relative_path]
+            self.call_graph.remove_file(relative_path)
+        self.call_graph.set_file_order(entries)
+        changes = {}
+        for relative_path, entry in entries.items():
+            old = self.files.get(relative_path)
+            if old is not None and old[0] == entry.size and old[1] == entry.mtime_ns:
+                continue
+            result = self._update_file(relative_path, entry)
+            if result is not None:
+                changes[relative_path] = result
+        self.call_graph.update_files(changes)
+        changed = list(changes)
+        if changed or removed:
+            self._save()
+            if self.index_store is not None:
+                for relative_path in changed + removed:
+                    self.index_store.update_file(os.path.join(self.directory, relative_path))
+        return changed, removed
+
+    def _save(self):
+        if self.graph_index is not None:
+            self.graph_index.save_call_graph(self.graph, self.graph_id, visualize=False)
+
+    def run(self, stop_event=None):
+        """
+        持续轮询，直到 stop_event 被设置或收到 KeyboardInterrupt。
+
+        Args:
+            stop_event (threading.Event, optional): 停止信号。
+        """
+        self.start()
+        try:
+            while stop_event is None or not stop_event.is_set():
+                time.sleep(self.interval)
+                changed, removed = self.poll()
+                if changed or removed:
+                    print(
+                        f"updated {len(changed)} changed / {len(removed)} removed files: "
+                        f"{self.graph.number_of_nodes()} functions, {self.graph.number_of_edges()} calls"
+                    )
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="watch a repository and update its call graph incrementally")
+    parser.add_argument("directory")
+    parser.add_argument("--language", default="python")
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--graph-id", default=None)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--index", action="store_true", help="also update the .llamaindex vector index")
+    args = parser.parse_args()
+
+    index_store = None
+    if args.index:
+        from llamaindex.createindex import IndexStore
+
+        index_store = IndexStore(args.directory)
+    watcher = RepositoryWatcher(
+        args.directory,
+        args.language,
+        graph_index=GraphIndex(args.directory, args.output_dir),
+        graph_id=args.graph_id,
+        index_store=index_store,
+        interval=args.interval,
+    )
+    print(f"id:{watcher.graph_id}")
+    watcher.run()
+
+
+if __name__ == "__main__":
+    main()
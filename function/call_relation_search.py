@@ -1,10 +1,32 @@
+import os
+from typing import Optional
 from codebase.build_index import GraphIndex
+from codebase.graph_query import CallGraphQuery
 from function.utils import *
 
 class CallRelationSearch:
-    def __init__(self,file_dir:str,output_dir:str = 'output',language :str ='python'):
+    def __init__(self,file_dir:str,output_dir:str = 'output',language :str ='python',workers:Optional[int] = 1):
         self.output_dir =output_dir
-        gi= GraphIndex(file_dir,output_dir)
-        self.id = gi.analyze_directory(language)
+        # 复用单文件提取缓存，重复构造时只重新解析变化的文件
+        gi= GraphIndex(file_dir,output_dir,cache_dir=os.path.join(output_dir,'extract_cache'))
+        self.id = gi.analyze_directory(language,workers=workers)
+        self._query = None
     def call_relation_search(self):
-        return read_file(file_path=f'{self.output_dir}/{self.id}.csv',encoding='utf-8')
\ No newline at end of file
+        return read_file(file_path=f'{self.output_dir}/{self.id}.csv',encoding='utf-8')
+    @property
+    def query(self):
+        # 第一次查询时加载调用图并建立可达性索引，之后的查询都复用
+        if self._query is None:
+            self._query = CallGraphQuery.load(self.output_dir,self.id)
+        return self._query
+    def find_functions(self,name:str):
+        return self.query.find_functions(name)
+    def callers(self,function:str,transitive:bool = False):
+        return self.query.transitive_callers(function) if transitive else self.query.callers(function)
+    def callees(self,function:str,transitive:bool = False):
+        return self.query.transitive_callees(function) if transitive else self.query.callees(function)
+    def call_path(self,caller:str,callee:str):
+        return self.query.shortest_path(caller,callee)
+    def neighborhood(self,function:str,k:int = 1,direction:str = 'both'):
+        G = self.query.neighborhood(function,k,direction)
+        return {'nodes':[{'function':node,**attributes} for node,attributes in G.nodes(data=True)],'edges':[list(edge) for edge in G.edges()]}
@@ -4,7 +4,7 @@ from llamaindex.createindex import IndexStore
 
 
 class EmbeddingSearch:
-    def  __init__(self,project_path):
-        self.index = IndexStore(project_path)
+    def  __init__(self,project_path,centrality=None):
+        self.index = IndexStore(project_path,centrality=centrality)
     def search_embedding(self, query:str, k:int=10):
         return self.index.search(query=query,topk=k)
\ No newline at end of file
@@ -1,5 +1,6 @@
 
 
+import hashlib
 import os
 from dotenv import load_dotenv
 from llama_index.core import VectorStoreIndex,Document,StorageContext,load_index_from_storage
@@ -16,10 +17,28 @@ from llama_index.core.schema import BaseNode
 from llama_index.core import Settings
 from logger.logging_config import logger
 from utils.tools import filter_data
+from codebase.manifest import get_manifest
 FILE_DIR_BASE = ".llamaindex"
+# 扩展名到分块提取器的映射
+EXTRACTS = {
+    '.py': PyExtract,
+    '.js': JSExtract,
+    '.cpp': CppExtract,
+    '.java': JavaExtract,
+    '.md': MdExtract,
+}
+# 检索时文件中心性的加权系数：归一化的中心性（0~1）乘以该系数后加到相似度上，只在相似度相近时改变排序
+CENTRALITY_BOOST = 0.01
 class IndexStore:
-    def __init__(self,file_dir):
+    def __init__(self,file_dir,centrality=None):
+        """
+        Args:
+            file_dir (str): 项目目录。
+            centrality (dict, optional): 文件相对路径到中心性的映射，例如 codebase.centrality.load_file_centrality 的结果，
+                检索时作为相似度相近的结果之间的加权。默认为 None（不加权）。
+        """
         self.file_dir = file_dir
+        self.set_centrality(centrality)
         load_dotenv()
         
         Settings.embed_model = InstructorEmbeddings()
@@ -39,48 +58,105 @@ class IndexStore:
 
     def to_documents(self):
         document_list = []
-        for root, dirs, files in os.walk(self.file_dir):
-            for filename in files:
-                full_path = os.path.join(root, filename)  # 构建完整路径
-                normalized_path = os.path.normpath(full_path)  # 标准化路径
-                if filename.endswith('.py'):  # 只处理 .py 文件
-                    extract = PyExtract()
-                elif filename.endswith('.js'):
-                    extract = JSExtract()
-                elif filename.endswith('.cpp'):
-                    extract = CppExtract()
-                elif filename.endswith('.java'):
-                    extract = JavaExtract()
-                elif filename.endswith('.md'):
-                    extract = MdExtract()
-                else:
-                    continue
-                    # if filter_data(normalized_path):
-                    #     extract = MdExtract()
-                    # else:
-                    #     continue
-                result_list = extract.splitter_function(normalized_path)
-                for result in result_list:
-                    try:
-                        text = read_file(file_path=result['source_path'], begin_byte=result['begin_byte'], end_byte=result['end_byte'])
-                        if text is None:
-                            continue
-                        document = Document(
-                            text=text,
-                            metadata={"filepath": result['source_path'], "name": result['name']},
-                        )
-                        document_list.append(document)
-                    except Exception as e:
-                        print(f"Error reading file {result['source_path']}: {e}")
-                        continue
-                    
+        # 使用按仓库版本缓存的文件清单，已经跳过了 .gitignore 忽略的文件和第三方依赖目录
+        for entry in get_manifest(self.file_dir):
+            if entry.extension not in EXTRACTS:
+                continue
+                # if filter_data(normalized_path):
+                #     extract = MdExtract()
+                # else:
+                #     continue
+            full_path = os.path.join(self.file_dir, entry.path)  # 构建完整路径
+            normalized_path = os.path.normpath(full_path)  # 标准化路径
+            try:
+                document_list.extend(self.file_documents(normalized_path))
+            except FileNotFoundError:
+                # 列出之后被删除的文件
+                continue
+
+        return document_list
+
+    def file_documents(self, file_path):
+        """
+        将单个文件切分为文档块。
 
+        每个文档块的 id 由文件路径、名称和文本内容决定，内容不变的块在文件修改后 id 保持不变，
+        增量更新时无需重新计算向量。
+        """
+        extract = EXTRACTS[os.path.splitext(file_path)[1]]()
+        document_list = []
+        occurrences = {}
+        result_list = extract.splitter_function(file_path)
+        for result in result_list:
+            try:
+                text = read_file(file_path=result['source_path'], begin_byte=result['begin_byte'], end_byte=result['end_byte'])
+                if text is None:
+                    continue
+                # 同一文件中名称和内容完全相同的块，用出现次数区分
+                key = (result['name'], text)
+                occurrences[key] = occurrences.get(key, 0) + 1
+                doc_id = hashlib.sha1(f"{result['source_path']}\0{result['name']}\0{occurrences[key]}\0{text}".encode('utf-8')).hexdigest()
+                document = Document(
+                    text=text,
+                    metadata={"filepath": result['source_path'], "name": result['name']},
+                    id_=doc_id,
+                )
+                document_list.append(document)
+            except Exception as e:
+                print(f"Error reading file {result['source_path']}: {e}")
+                continue
         return document_list
-    
+
+    def update_file(self, file_path):
+        """
+        文件新增、修改或删除后，增量更新索引中该文件的文档块。
+
+        只删除内容已经变化或不存在的块、插入新的块，内容不变的块保持原样，然后持久化索引。
+
+        Args:
+            file_path (str): 文件路径，与构建索引时一样由 file_dir 和相对路径拼接而成。
+
+        Returns:
+            tuple: (删除的块数, 插入的块数)。
+        """
+        normalized_path = os.path.normpath(file_path)
+        documents = []
+        if os.path.exists(normalized_path) and os.path.splitext(normalized_path)[1] in EXTRACTS:
+            documents = self.file_documents(normalized_path)
+        new_ids = {document.id_ for document in documents}
+        old_ids = {doc_id for doc_id, info in self.index.ref_doc_info.items() if info.metadata.get("filepath") == normalized_path}
+        deleted = old_ids - new_ids
+        for doc_id in deleted:
+            self.index.delete_ref_doc(doc_id, delete_from_docstore=True)
+        inserted = [document for document in documents if document.id_ not in old_ids]
+        for document in inserted:
+            self.index.insert(document)
+        if deleted or inserted:
+            self.index.storage_context.persist(persist_dir=self.file_dir_index)
+        return len(deleted), len(inserted)
+
+    def set_centrality(self, centrality):
+        """设置文件的中心性，按最大值归一化到 0~1。"""
+        centrality = centrality or {}
+        highest = max(centrality.values(), default=0) or 1
+        self.centrality = {os.path.normpath(file_path): value / highest for file_path, value in centrality.items()}
+
+    def _centrality_boost(self, node):
+        file_path = node.metadata.get("filepath")
+        if not file_path or not self.centrality:
+            return 0.0
+        return CENTRALITY_BOOST * self.centrality.get(os.path.relpath(file_path, self.file_dir), 0.0)
+
     def search(self, query: str,topk:int):
-        retriever = self.index.as_retriever(verbose=True)
+        if self.centrality:
+            # 设置了中心性时多取一些候选结果，加权后重新排序
+            retriever = self.index.as_retriever(similarity_top_k=topk * 2, verbose=True)
+        else:
+            retriever = self.index.as_retriever(verbose=True)
         result = retriever.retrieve(query)
         # print(f'result:{result}')
+        if self.centrality:
+            result = sorted(result, key=lambda r: -((r.score or 0.0) + self._centrality_boost(r.node)))
         nodes: list["BaseNode"] = []
         for r in result[:topk]:
             nodes.append(r.node)
@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 from llm.functioncall.functionlist import *
 from llm.functioncall.openai_function_call import OpenaiClient
 import urllib.parse
+from codebase.manifest import get_manifest
 def clone_repo_with_token(repo_url, clone_to):
     """
     克隆一个需要认证的GitHub仓库。
@@ -48,24 +49,12 @@ def clone_repo_with_token(repo_url, clone_to):
 
 def run(url,message):
     repo_path = clone_repo_with_token(url,'gitrepo')
-    file_count = sum([len(files) for _, _, files in os.walk(repo_path)])
+    # 只扫描一次仓库，文件总数和支持的文件数都从同一份清单中统计
+    manifest = get_manifest(repo_path)
+    file_count = len(manifest)
     if file_count > 1000:
         return "项目太大了，请换小项目提问"
-    count_files = 0
-    for root, dirs, files in os.walk(repo_path):
-        for filename in files:
-            if filename.endswith('.py'):  # 只处理 .py 文件
-                count_files+=1
-            elif filename.endswith('.js'):
-                count_files+=1
-            elif filename.endswith('.cpp'):
-                count_files+=1
-            elif filename.endswith('.java'):
-                count_files+=1
-            elif filename.endswith('.md'):
-                count_files+=1
-            else:
-                continue
+    count_files = len(manifest.files(['.py', '.js', '.cpp', '.java', '.md']))
     logger.info(f"count_files: {count_files}")
     if count_files > 60:
         return "项目有些大，请联系作者让小geex需要学习一下才能回答你的问题"
@@ -1,18 +1,9 @@
-from tree_sitter import Language, Node, Parser
-import os
-import platform
+from tree_sitter import Node
+from codebase.parser_pool import get_language, get_parser, get_query
 class BaseExtract:
     def __init__(self,language:str):
-        # Determine the file extension based on the operating system
-        system = platform.system()
-        if system == "Windows":
-            extension = "dll"
-        elif system == "Darwin":
-            extension = "dylib"
-        else:  # Assume Linux if not Windows or macOS
-            extension = "so"
-        language_path = os.path.join(os.path.dirname(__file__), "../codebase/build", f"tree-sitter-{language}.{extension}")
-        self.treesitter = Language(language_path, language)
+        self.language = language
+        self.treesitter = get_language(language)
 
     def parse_file_with_treesitter(self, context:str):
         """
@@ -29,12 +20,11 @@ class BaseExtract:
             Node: AST 的根节点。
         """
         source_code = context.encode()
-        parser = Parser()
-        parser.set_language(self.treesitter)
+        parser = get_parser(self.language)
         tree = parser.parse(source_code)
         return tree.root_node
     
     def query_treesitter(self, query_context:str, node:Node):
-        query = self.treesitter.query(query_context)
+        query = get_query(self.language, query_context)
         captures = query.captures(node)
         return captures
\ No newline at end of file
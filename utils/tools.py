@@ -4,22 +4,29 @@ import json
 
 import os
 
+from codebase.manifest import get_manifest
+
 def get_directory_structure(directory_path):
     """
     获取指定目录下的文件结构并返回为字符串格式。
 
+    文件来自按仓库版本缓存的文件清单，.gitignore 忽略的文件和第三方依赖目录不会列出。
+
     :param directory_path: str, 目录路径
     :return: str, 文件结构
     """
-    structure = []
+    structure = [f"{os.path.basename(os.path.normpath(directory_path))}/"]
+    listed_dirs = {""}
 
-    for root, dirs, files in os.walk(directory_path):
-        level = root.replace(directory_path, '').count(os.sep)
-        indent = ' ' * 4 * level
-        structure.append(f"{indent}{os.path.basename(root)}/")
-        sub_indent = ' ' * 4 * (level + 1)
-        for file in files:
-            structure.append(f"{sub_indent}{file}")
+    for entry in get_manifest(directory_path):
+        parts = entry.path.split(os.sep)
+        # 清单按目录遍历顺序排列，遇到新目录时先补上尚未列出的各级目录
+        for level in range(1, len(parts)):
+            relative_dir = os.sep.join(parts[:level])
+            if relative_dir not in listed_dirs:
+                listed_dirs.add(relative_dir)
+                structure.append(f"{' ' * 4 * level}{parts[level - 1]}/")
+        structure.append(f"{' ' * 4 * len(parts)}{parts[-1]}")
 
     return "\n".join(structure)
 